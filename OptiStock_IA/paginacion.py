@@ -0,0 +1,50 @@
+"""
+Paginación por cursor (keyset) sobre (fecha, id), de más reciente a más antiguo.
+
+A diferencia de OFFSET, cada página se lee desde la posición del cursor con
+el índice de fecha, así el costo no crece con la profundidad. El cursor es
+la fecha e id del último registro de la página anterior.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def crear_cursor(fecha, pk):
+    return base64.urlsafe_b64encode(f'{fecha.isoformat()}|{pk}'.encode()).decode()
+
+
+def leer_cursor(cursor):
+    """Devuelve (fecha, pk) o None si el cursor falta o no es válido."""
+    if not cursor:
+        return None
+    try:
+        fecha, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def pagina_por_cursor(queryset, cursor, tamano, campo_fecha='fecha'):
+    """
+    Devuelve (registros, siguiente) con hasta `tamano` registros después del
+    cursor; siguiente es el cursor de la página que sigue o None si es la última.
+    """
+    pk = queryset.model._meta.pk.name
+    queryset = queryset.order_by(f'-{campo_fecha}', f'-{pk}')
+    posicion = leer_cursor(cursor)
+    if posicion is not None:
+        fecha, id_ultimo = posicion
+        # El límite fecha <= cursor va aparte para que sea un rango sobre el índice
+        queryset = queryset.filter(**{f'{campo_fecha}__lte': fecha}).filter(
+            Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{f'{pk}__lt': id_ultimo})
+        )
+
+    registros = list(queryset[:tamano + 1])
+    siguiente = None
+    if len(registros) > tamano:
+        registros = registros[:tamano]
+        ultimo = registros[-1]
+        siguiente = crear_cursor(getattr(ultimo, campo_fecha), ultimo.pk)
+    return registros, siguiente
@@ -0,0 +1,116 @@
+"""
+Rangos de fechas para filtrar por mes o año.
+
+Filtrar con fecha__year / fecha__month aplica una función a la columna y
+obliga a recorrer toda la tabla. Estos rangos semiabiertos [inicio, fin) en
+la zona horaria local (America/Santiago) permiten usar el índice de fecha.
+
+Los años con datos de cada listado se guardan en la caché de Django; solo se
+extienden cuando se registra un movimiento en un año nuevo (ver las señales
+de ventas y compras).
+"""
+from datetime import datetime
+
+from django.core.cache import cache
+from django.utils import timezone
+
+# Cada proceso con caché local la recalcula a lo más una vez por este plazo,
+# así también se enteran de años agregados desde otros procesos
+TIEMPO_CACHE_AÑOS = 60 * 60
+
+# Años que se aceptan en ?año= de los listados
+AÑO_MINIMO = 1900
+AÑO_MAXIMO = 2100
+
+
+def _inicio_de_mes(año, mes):
+    return timezone.make_aware(datetime(año, mes, 1))
+
+
+def rango_periodo(año, mes=None):
+    """
+    Devuelve (inicio, fin) del mes indicado, o del año completo si mes es None.
+    Se usa como filter(fecha__gte=inicio, fecha__lt=fin).
+    """
+    if mes is None:
+        return _inicio_de_mes(año, 1), _inicio_de_mes(año + 1, 1)
+    if mes == 12:
+        return _inicio_de_mes(año, 12), _inicio_de_mes(año + 1, 1)
+    return _inicio_de_mes(año, mes), _inicio_de_mes(año, mes + 1)
+
+
+def periodo_solicitado(parametros):
+    """
+    (año, mes) de los parámetros ?año= y ?mes= de un listado; mes es un
+    entero o 'todos'. Un valor ausente, que no es un número o fuera de rango
+    (mes 1 a 12, año AÑO_MINIMO a AÑO_MAXIMO) se reemplaza por el actual.
+    """
+    hoy = timezone.localdate()
+    try:
+        año = int(parametros.get('año', hoy.year))
+    except ValueError:
+        año = hoy.year
+    if not AÑO_MINIMO <= año <= AÑO_MAXIMO:
+        año = hoy.year
+
+    mes = parametros.get('mes', hoy.month)
+    if mes != 'todos':
+        try:
+            mes = int(mes)
+        except ValueError:
+            mes = hoy.month
+        if not 1 <= mes <= 12:
+            mes = hoy.month
+    return año, mes
+
+
+def años_con_datos(queryset, campo='fecha'):
+    """
+    Años (de mayor a menor, en hora local) con al menos un registro en el queryset.
+    Lee el primer y último registro por el índice y luego consulta cada año
+    intermedio con un EXISTS por rango, en vez de recorrer la tabla.
+    """
+    primero = queryset.order_by(campo).values_list(campo, flat=True).first()
+    if primero is None:
+        return []
+    ultimo = queryset.order_by(f'-{campo}').values_list(campo, flat=True).first()
+    desde = timezone.localtime(primero).year
+    hasta = timezone.localtime(ultimo).year
+
+    años = []
+    for año in range(hasta, desde - 1, -1):
+        if año in (desde, hasta):
+            años.append(año)
+            continue
+        inicio, fin = rango_periodo(año)
+        if queryset.filter(**{f'{campo}__gte': inicio, f'{campo}__lt': fin}).exists():
+            años.append(año)
+    return años
+
+
+def _clave_años(nombre):
+    return f'años_con_datos:{nombre}'
+
+
+def años_con_datos_en_cache(nombre, queryset, campo='fecha'):
+    """años_con_datos(queryset) guardado en caché bajo `nombre` ('ventas', 'compras')."""
+    años = cache.get(_clave_años(nombre))
+    if años is None:
+        años = años_con_datos(queryset, campo)
+        cache.set(_clave_años(nombre), años, TIEMPO_CACHE_AÑOS)
+    return años
+
+
+def registrar_año(nombre, fecha):
+    """Agrega el año de `fecha` a los años en caché si todavía no estaba."""
+    años = cache.get(_clave_años(nombre))
+    if años is None:
+        return
+    año = timezone.localtime(fecha).year
+    if año not in años:
+        cache.set(_clave_años(nombre), sorted(años + [año], reverse=True), TIEMPO_CACHE_AÑOS)
+
+
+def olvidar_años(nombre):
+    """Descarta los años en caché; se recalculan en la siguiente consulta."""
+    cache.delete(_clave_años(nombre))
@@ -0,0 +1,29 @@
+# Enrutador de bases de datos: los registros del sistema (logger) y de
+# mantenimiento van a la base 'logs', así su volumen de escritura no compite
+# con el de stock, ventas y compras en la base principal.
+
+APPS_LOGS = {'logger', 'maintenance'}
+
+
+class LogsRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in APPS_LOGS:
+            return 'logs'
+        # Explícito: si no, una relación leída desde un objeto de 'logs'
+        # (p. ej. SystemMessage.user) se buscaría en la base 'logs'
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in APPS_LOGS:
+            return 'logs'
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # SystemMessage.user apunta a usuario.Usuario en la otra base
+        # (la FK no tiene restricción en la base de datos)
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label in APPS_LOGS:
+            return db == 'logs'
+        return db == 'default'
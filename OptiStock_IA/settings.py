@@ -65,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'logger.context_processors.stream_logs',
             ],
         },
     },
@@ -80,9 +81,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Registros del sistema y mantenimiento (ver OptiStock_IA/routers.py).
+    # Se migra aparte: python manage.py migrate --database=logs
+    'logs': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'logs.sqlite3',
+    },
 }
 
+DATABASE_ROUTERS = ['OptiStock_IA.routers.LogsRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -123,7 +132,54 @@ STATICFILES_DIRS = [
     BASE_DIR / 'inventario/static',
 ]
 
+# Archivos generados (reportes en segundo plano)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Escritura de SystemMessage por lotes (ver logger/buffer.py).
+# 'peticion': un bulk_create al final de cada petición.
+# 'hilo': un hilo en segundo plano guarda por tamaño, tiempo o al cerrar.
+LOGGER_BUFFER = {
+    'MODO': 'peticion',
+    'TAMANO_MAXIMO': 100,
+    'INTERVALO': 2.0,
+}
+
+# Retención de SystemMessage (ver logger/retencion.py y el comando
+# purgar_mensajes). Los mensajes vencidos se resumen por hora y se eliminan.
+LOGGER_RETENCION = {
+    'DIAS_POR_DEFECTO': 30,
+    'DIAS_POR_NIVEL': {'error': 180, 'warning': 90, 'info': 14},
+    'DIAS_POR_APP': {},
+    'LOTE': 1000,
+}
+
+# Caché local por proceso (años disponibles de los listados, entre otros)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'optistock',
+    }
+}
+
+# Reportes en segundo plano (ver reportes/trabajos.py).
+# 'procesos': pool local de PROCESOS procesos; 'sincrono': en la misma petición.
+REPORTES_TRABAJOS = {
+    'MODO': 'procesos',
+    'PROCESOS': 2,
+    'DEDUPLICAR': True,
+    'TIEMPO_MAXIMO': 30 * 60,  # segundos en proceso antes de darlo por interrumpido
+}
+
+# Caché en disco de los archivos de reportes (ver reportes/cache_archivos.py).
+# DIRECTORIO None usa MEDIA_ROOT/cache_reportes.
+REPORTES_CACHE = {
+    'DIRECTORIO': None,
+    'MAXIMO_ARCHIVOS': 200,
+}
@@ -0,0 +1,79 @@
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from compras.views import registrar_compra
+from logger import buffer
+from inventario.models import Producto
+from usuario.models import Usuario
+
+
+class _Revertir(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y tiempo de registrar_compra para carritos de distinto tamaño (no deja datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lineas',
+            nargs='+',
+            type=int,
+            default=[10, 100, 1000],
+            help='Tamaños de carrito a medir (por defecto 10 100 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'Líneas':>8} {'Consultas':>10} {'Tiempo (ms)':>12}")
+        for lineas in options['lineas']:
+            consultas, milisegundos = self._medir(lineas)
+            self.stdout.write(f"{lineas:>8} {consultas:>10} {milisegundos:>12.1f}")
+
+    def _medir(self, lineas):
+        resultado = {}
+        # Los mensajes del sistema van a la base 'logs', fuera de la
+        # transacción que se revierte: se acumulan y se descartan al final
+        token = buffer.iniciar()
+        try:
+            # Todo se hace dentro de una transacción que se revierte al final
+            with transaction.atomic():
+                usuario = Usuario.objects.create(
+                    RutUsuua='benchmark-compras',
+                    Nombre='Benchmark',
+                    ApePa='Compras',
+                    Telefono='0'
+                )
+                productos = Producto.objects.bulk_create([
+                    Producto(nombre=f'Benchmark {i}', categoria='Otros', precio=Decimal('1000'), stock=0)
+                    for i in range(lineas)
+                ])
+                carrito = [
+                    {'id': str(producto.id), 'cantidad': 5, 'precio_uni': 1200}
+                    for producto in productos
+                ]
+
+                request = RequestFactory().post('/compras/registrar/', {
+                    'proveedor': 'Proveedor Benchmark',
+                    'carrito': json.dumps(carrito),
+                })
+                request.user = usuario
+
+                with CaptureQueriesContext(connection) as contexto:
+                    inicio = time.perf_counter()
+                    response = registrar_compra(request)
+                    resultado['milisegundos'] = (time.perf_counter() - inicio) * 1000
+                if response.status_code != 302:
+                    self.stderr.write(f'La compra de {lineas} líneas no se registró')
+                resultado['consultas'] = len(contexto)
+                raise _Revertir()
+        except _Revertir:
+            pass
+        finally:
+            buffer.descartar(token)
+        return resultado['consultas'], resultado['milisegundos']
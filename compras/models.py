@@ -9,6 +9,12 @@ class Compra(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)
     proveedor = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            # lista_compras filtra por un rango de fechas
+            models.Index(fields=['fecha'], name='compras_compra_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Compra {self.id_compra} - {self.fecha}"
 
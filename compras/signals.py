@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from OptiStock_IA.periodos import registrar_año, olvidar_años
+from .models import Compra
+
+
+@receiver(post_save, sender=Compra)
+def extender_años_compras(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: registrar_año('compras', instance.fecha))
+
+
+@receiver(post_delete, sender=Compra)
+def olvidar_años_compras(sender, instance, **kwargs):
+    # Puede haber sido el último movimiento de su año
+    transaction.on_commit(lambda: olvidar_años('compras'))
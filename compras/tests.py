@@ -1,12 +1,16 @@
 from django.test import TestCase, Client
 from django.urls import reverse
+from django.core.cache import cache
 from decimal import Decimal
+import json
 from .models import Compra, DetalleCompra
 from inventario.models import Producto
 from usuario.models import Usuario
 #esto hace pruebas de la creación de compras, la vista de detalle de una compra, 
 # la vista de lista de compras y la validación de datos de compra
 class CompraTests(TestCase):
+    databases = {'default', 'logs'}
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -24,6 +28,8 @@ class CompraTests(TestCase):
         return status_descriptions.get(status_code, f"Código {status_code} - No documentado")
 #setUpClass se ejecuta una vez antes de todos los tests y muestra un mensaje de configuración inicial
     def setUp(self):
+        # Los años disponibles de los listados quedan en caché entre tests
+        cache.clear()
         if not self.__class__._setup_message_shown:
             print("\n" + "="*65)
             print("="*65)
@@ -164,6 +170,23 @@ class CompraTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'compras/lista_compras.html')
         self.assertEqual(len(response.context['compras']), 3)
+#test_lista_compras_mes_o_año_invalidos prueba que un mes o año inválido muestre el periodo actual en vez de un error
+    def test_lista_compras_mes_o_año_invalidos(self):
+        from django.utils import timezone
+        print("\n" + "="*50)
+        print("TEST: LISTA DE COMPRAS CON MES O AÑO INVÁLIDOS")
+        print("="*50)
+        compra = Compra.objects.create(rut_usu=self.usuario, proveedor="Proveedor Test", total=Decimal("1000.00"))
+        hoy = timezone.localdate()
+        for parametros in ({'mes': 13}, {'mes': 'abc'}, {'año': 'x'}, {'año': -1}):
+            response = self.client.get(reverse('compras:lista_compras'), parametros)
+            print(f"• {parametros} → {self.get_status_description(response.status_code)}, "
+                  f"mes {response.context['mes_seleccionado']}, año {response.context['año_seleccionado']}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((response.context['mes_seleccionado'], response.context['año_seleccionado']),
+                             (hoy.month, hoy.year))
+            self.assertEqual([c.id_compra for c in response.context['compras']], [compra.id_compra])
+        print("-"*50)
 #test_validacion_compra prueba la validación de datos de compra
     def test_validacion_compra(self):
         print("\n" + "="*50)
@@ -189,7 +212,59 @@ class CompraTests(TestCase):
         # Verificaciones
         self.assertEqual(response.status_code, 200)  # Debería volver al formulario
         self.assertFalse(Compra.objects.exists())  # No debería crear la compra
+#test_compra_carrito_actualiza_stock_y_precio prueba el registro de una compra desde el carrito
+    def test_compra_carrito_actualiza_stock_y_precio(self):
+        print("\n" + "="*50)
+        print("TEST: COMPRA DESDE EL CARRITO")
+        print("="*50)
+        otro = Producto.objects.create(
+            nombre="Producto Secundario",
+            categoria="Planchas",
+            precio=Decimal("500"),
+            stock=0
+        )
+        carrito = [
+            {'id': str(self.producto.id), 'cantidad': 5, 'precio_uni': 1500},
+            {'id': str(otro.id), 'cantidad': 2, 'precio_uni': 800},
+            {'id': str(self.producto.id), 'cantidad': 1, 'precio_uni': 1600},
+        ]
+        response = self.client.post(reverse('compras:registrar_compra'), {
+            'proveedor': 'Proveedor Test',
+            'carrito': json.dumps(carrito)
+        })
+        self.producto.refresh_from_db()
+        otro.refresh_from_db()
+        print(f"• Status: {self.get_status_description(response.status_code)}")
+        print(f"• Stock / precio producto 1: {self.producto.stock} / ${self.producto.precio}")
+        print(f"• Stock / precio producto 2: {otro.stock} / ${otro.precio}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.producto.stock, 16)
+        self.assertEqual(self.producto.precio, Decimal('1600'))
+        self.assertEqual(otro.stock, 2)
+        self.assertEqual(otro.precio, Decimal('800'))
+        compra = Compra.objects.get()
+        self.assertEqual(compra.total, Decimal('10700'))
+        self.assertEqual(compra.detalles.count(), 3)
+        print("-"*50)
 #tearDownClass se ejecuta una vez después de todos los tests y muestra un mensaje de limpieza final
+#test_benchmark_compras_no_deja_datos prueba que el benchmark no deje compras ni mensajes del sistema
+    def test_benchmark_compras_no_deja_datos(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from logger.models import SystemMessage
+        print("\n" + "="*50)
+        print("TEST: BENCHMARK DE COMPRAS SIN DATOS RESIDUALES")
+        print("="*50)
+        mensajes_antes = SystemMessage.objects.count()
+        salida = StringIO()
+        call_command('benchmark_compras', '--lineas', '3', stdout=salida)
+        print(salida.getvalue().rstrip())
+        print(f"• Compras: {Compra.objects.count()}, mensajes nuevos: {SystemMessage.objects.count() - mensajes_antes}")
+        self.assertFalse(Compra.objects.exists())
+        self.assertFalse(Producto.objects.filter(nombre__startswith='Benchmark').exists())
+        self.assertEqual(SystemMessage.objects.count(), mensajes_antes)
+        print("-"*50)
+
     def tearDown(self):
         # Limpieza después de cada prueba
         Compra.objects.all().delete()
@@ -1,23 +1,22 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.db import transaction
-from django.forms import modelformset_factory
 from django.core.exceptions import ValidationError
-from .forms import CompraForm, DetalleCompraForm
+from django.utils import timezone
+from .forms import CompraForm
 from .models import Compra, DetalleCompra
 from inventario.models import Producto
-from logger.models import SystemMessage
-from datetime import datetime
+from reportes import hechos
+from logger import buffer
+from OptiStock_IA.periodos import periodo_solicitado, rango_periodo, años_con_datos_en_cache
+from OptiStock_IA.paginacion import pagina_por_cursor
 import json
 from urllib.parse import urlencode
 
 def registrar_compra(request):
     categoria = request.GET.get('categoria', '')
 
-    # Filtrar productos
-    if categoria:
-        productos_queryset = Producto.objects.filter(categoria=categoria).order_by('nombre')
-    else:
-        productos_queryset = Producto.objects.all().order_by('nombre')
+    # Los productos se cargan desde inventario:autocompletar_productos
 
     mostrar_mensaje = request.GET.get('ok') == '1'
     error = None
@@ -35,54 +34,69 @@ def registrar_compra(request):
                 error = 'Por favor completa los datos del proveedor'
                 raise ValidationError(error)
 
+            # Validar las líneas y agrupar por producto
+            lineas = []
+            cantidades = {}
+            precios = {}
+            for item in carrito:
+                try:
+                    producto_id = int(item['id'])
+                except (TypeError, ValueError):
+                    raise ValidationError(f"Producto con ID {item['id']} no encontrado")
+                cantidad = item['cantidad']
+                if not isinstance(cantidad, int) or cantidad <= 0:
+                    raise ValidationError(f"Cantidad inválida para el producto con ID {producto_id}")
+                lineas.append((producto_id, cantidad, item['precio_uni']))
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+                # Como al guardar línea por línea, el último precio es el que queda
+                precios[producto_id] = item['precio_uni']
+
+            # Mensajes de éxito: se registran solo si la transacción se confirma
+            mensajes = []
             with transaction.atomic():
                 compra = compra_form.save(commit=False)
                 compra.rut_usu = request.user
                 total = 0
                 detalles = []
 
-                for item in carrito:
-                    try:
-                        producto = Producto.objects.get(id=item['id'])
-                        cantidad = item['cantidad']
-                        precio_unitario = item['precio_uni']
-
-                        subtotal = precio_unitario * cantidad
-                        total += subtotal
-
-                        # Actualizar stock y precio del producto
-                        producto.stock += cantidad
-                        producto.precio = precio_unitario
-                        producto.save()
-
-                        SystemMessage.objects.create(
-                            message=f"Stock actualizado para {producto.nombre}. Nuevo stock: {producto.stock}",
-                            level='info',
-                            app='compras',
-                            user=request.user
-                        )
-
-                        detalle = DetalleCompra(
-                            id_compra=compra,
-                            id_prod=producto,
-                            cantidad=cantidad,
-                            precio_uni=precio_unitario
-                        )
-                        detalles.append(detalle)
-
-                    except Producto.DoesNotExist:
-                        raise ValidationError(f"Producto con ID {item['id']} no encontrado")
+                # Una sola consulta para todos los productos del carrito
+                productos = Producto.objects.in_bulk(list(cantidades))
+                for producto_id in cantidades:
+                    if producto_id not in productos:
+                        raise ValidationError(f"Producto con ID {producto_id} no encontrado")
+
+                # Actualizar stock y precio de todos los productos por lotes
+                Producto.objects.ingresar_stock(cantidades, precios)
+
+                nuevo_stock = dict(
+                    Producto.objects.filter(id__in=list(cantidades)).values_list('id', 'stock')
+                )
+
+                for producto_id, cantidad, precio_unitario in lineas:
+                    producto = productos[producto_id]
+
+                    subtotal = precio_unitario * cantidad
+                    total += subtotal
+
+                    mensajes.append(f"Stock actualizado para {producto.nombre}. Nuevo stock: {nuevo_stock[producto_id]}")
+
+                    detalle = DetalleCompra(
+                        id_compra=compra,
+                        id_prod=producto,
+                        cantidad=cantidad,
+                        precio_uni=precio_unitario
+                    )
+                    detalles.append(detalle)
 
                 compra.total = total
                 compra.save()
                 DetalleCompra.objects.bulk_create(detalles)
+                hechos.registrar_compra(compra, detalles)
 
-                SystemMessage.objects.create(
-                    message=f"Compra registrado exitosamente. Total: ${total:.2f}",
-                    level='info',
-                    app='compras',
-                    user=request.user
-                )
+                mensajes.append(f"Compra registrado exitosamente. Total: ${total:.2f}")
+
+            for mensaje in mensajes:
+                buffer.registrar(message=mensaje, level='info', app='compras', user=request.user)
 
             # PRG: redirigir después de un POST exitoso
             params = {'ok': '1'}
@@ -100,29 +114,44 @@ def registrar_compra(request):
         'compra_form': compra_form,
         'mostrar_mensaje': mostrar_mensaje,
         'categoria_seleccionada': categoria,
-        'productos_filtrados': productos_queryset,
         'error': error
     })
 
+# Compras por página en la lista (paginación por cursor)
+COMPRAS_POR_PAGINA = 50
+
 def lista_compras(request):
-    # Obtener mes y año actuales por defecto
-    today = datetime.now()
-    mes = request.GET.get('mes', str(today.month))
-    año = int(request.GET.get('año', today.year))
+    # Mes y año pedidos; los actuales por defecto o si no son válidos
+    today = timezone.localdate()
+    año, mes = periodo_solicitado(request.GET)
     
-    # Filtrar compras por mes y año
+    # Filtrar compras por mes y año con un rango de fechas (usa el índice)
     if mes == 'todos':
         # Mostrar todos los meses del año
-        compras = Compra.objects.filter(
-            fecha__year=año
-        ).order_by('-fecha')
+        inicio, fin = rango_periodo(año)
     else:
         # Mostrar solo el mes especificado
-        mes = int(mes)
-        compras = Compra.objects.filter(
-            fecha__month=mes,
-            fecha__year=año
-        ).order_by('-fecha')
+        inicio, fin = rango_periodo(año, mes)
+    compras = Compra.objects.filter(
+        fecha__gte=inicio,
+        fecha__lt=fin
+    )
+    compras, siguiente = pagina_por_cursor(compras, request.GET.get('cursor'), COMPRAS_POR_PAGINA)
+
+    # Variante JSON del mismo listado (?formato=json)
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'compras': [
+                {
+                    'id': compra.id_compra,
+                    'fecha': compra.fecha.isoformat(),
+                    'proveedor': compra.proveedor,
+                    'total': str(compra.total),
+                }
+                for compra in compras
+            ],
+            'siguiente': siguiente,
+        })
     
     # Verificar y limpiar la variable de sesión
     mostrar_mensaje = request.session.pop('mostrar_mensaje', False)
@@ -135,17 +164,16 @@ def lista_compras(request):
         (9, 'Septiembre'), (10, 'Octubre'), (11, 'Noviembre'), (12, 'Diciembre')
     ]
     
-    # Obtener años disponibles en la base de datos
-    años_disponibles = set()
-    for compra in Compra.objects.values_list('fecha__year', flat=True).distinct():
-        años_disponibles.add(compra)
-    años_disponibles = sorted(list(años_disponibles), reverse=True)
+    # Años con datos (desde la caché; se extiende al registrar en un año nuevo)
+    años_disponibles = años_con_datos_en_cache('compras', Compra.objects.all())
     # Si no hay años, agregar el año actual
     if not años_disponibles:
         años_disponibles = [today.year]
     
     return render(request, 'compras/lista_compras.html', {
         'compras': compras,
+        'siguiente': siguiente,
+        'cursor': request.GET.get('cursor', ''),
         'mostrar_mensaje': mostrar_mensaje,
         'mes_seleccionado': mes,
         'año_seleccionado': año,
@@ -156,7 +184,7 @@ def lista_compras(request):
 def detalle_compra(request, id_compra):
     compra = get_object_or_404(Compra, pk=id_compra)
     detalles = compra.detalles.all().select_related('id_prod')
-    SystemMessage.objects.create(
+    buffer.registrar(
         message=f"Usuario {request.user} consultó el detalle de la compra #{id_compra}",
         level='info',
         app='compras',
@@ -0,0 +1,84 @@
+# inventario/alertas.py
+from django.db import transaction
+
+from .models import Producto, StockAlerta, MESES_VERANO, MESES_INVIERNO, estacion_del_mes
+
+# Un mes representativo por estación para calcular ambos ratios
+MES_POR_ESTACION = {
+    'verano': MESES_VERANO[0],
+    'invierno': MESES_INVIERNO[0],
+}
+
+
+def _calcular_alertas(productos):
+    """
+    Calcula las filas de StockAlerta para los productos dados.
+    Devuelve un dict {producto_id: StockAlerta} solo con los que alertan
+    en al menos una estación.
+    """
+    filas = {}
+    for estacion, mes in MES_POR_ESTACION.items():
+        consulta = productos.alertas(mes).order_by().values_list('id', 'ratio', 'nivel')
+        for producto_id, ratio, nivel in consulta.iterator(chunk_size=2000):
+            fila = filas.setdefault(producto_id, StockAlerta(producto_id=producto_id))
+            setattr(fila, f'ratio_{estacion}', ratio)
+            setattr(fila, f'nivel_{estacion}', nivel)
+    return filas
+
+
+def sincronizar_alertas(producto_ids):
+    """
+    Recalcula las alertas de los productos indicados. Lo llaman las señales
+    de inventario.signals al confirmar cada escritura de stock o umbrales.
+    """
+    producto_ids = set(producto_ids)
+    if not producto_ids:
+        return
+    sincronizar_alertas_de(Producto.objects.filter(id__in=producto_ids))
+
+
+def sincronizar_alertas_de(productos):
+    """
+    Recalcula las alertas de todos los productos de una consulta (p. ej.
+    una categoría tras un cambio masivo de umbrales) sin cargar sus ids.
+    """
+    with transaction.atomic():
+        filas = _calcular_alertas(productos)
+        StockAlerta.objects.filter(producto__in=productos.values('id')).delete()
+        StockAlerta.objects.bulk_create(filas.values(), batch_size=1000)
+
+
+def reconstruir_alertas():
+    """Vacía y reconstruye la tabla completa. Devuelve el número de alertas."""
+    with transaction.atomic():
+        StockAlerta.objects.all().delete()
+        filas = _calcular_alertas(Producto.objects.all())
+        StockAlerta.objects.bulk_create(filas.values(), batch_size=1000)
+    return len(filas)
+
+
+def verificar_alertas():
+    """
+    Compara la tabla con los datos vivos. Devuelve una lista de
+    (producto_id, esperado, actual) para cada diferencia encontrada.
+    """
+    def resumen(fila):
+        if fila is None:
+            return None
+        return (
+            None if fila.ratio_verano is None else round(fila.ratio_verano, 6),
+            fila.nivel_verano,
+            None if fila.ratio_invierno is None else round(fila.ratio_invierno, 6),
+            fila.nivel_invierno,
+        )
+
+    esperadas = _calcular_alertas(Producto.objects.all())
+    actuales = {fila.producto_id: fila for fila in StockAlerta.objects.iterator(chunk_size=2000)}
+
+    diferencias = []
+    for producto_id in sorted(esperadas.keys() | actuales.keys()):
+        esperado = resumen(esperadas.get(producto_id))
+        actual = resumen(actuales.get(producto_id))
+        if esperado != actual:
+            diferencias.append((producto_id, esperado, actual))
+    return diferencias
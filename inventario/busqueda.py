@@ -0,0 +1,159 @@
+# inventario/busqueda.py
+"""
+Búsqueda de productos por nombre y categoría.
+
+En SQLite usa la tabla FTS5 inventario_producto_fts (contenido externo:
+lee las columnas de inventario_producto), que se mantiene con triggers en
+la misma base, así también la actualizan los update() y bulk_create que no
+envían señales. Cada palabra buscada es un prefijo y deben aparecer todas;
+los resultados se ordenan por relevancia (bm25, el nombre pesa más que la
+categoría). En otras bases se usa icontains por palabra.
+
+Las migraciones que reconstruyen la tabla de productos en SQLite (p. ej.
+un AlterField) borran sus triggers: al terminar cada migrate, la señal
+post_migrate (inventario.signals) llama a asegurar_indice, que los vuelve
+a crear y reindexa. El check inventario.W001 avisa si aun así faltan
+(`python manage.py check --database default`).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+TABLA_FTS = 'inventario_producto_fts'
+
+# Pesos de bm25 por columna: nombre, categoria
+PESOS_RANKING = (10.0, 1.0)
+
+SQL_CREAR = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        nombre, categoria,
+        content='inventario_producto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_insertar AFTER INSERT ON inventario_producto BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, nombre, categoria) VALUES (new.id, new.nombre, new.categoria);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_eliminar AFTER DELETE ON inventario_producto BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, nombre, categoria)
+        VALUES ('delete', old.id, old.nombre, old.categoria);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_actualizar AFTER UPDATE OF nombre, categoria ON inventario_producto BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, nombre, categoria)
+        VALUES ('delete', old.id, old.nombre, old.categoria);
+        INSERT INTO {TABLA_FTS}(rowid, nombre, categoria) VALUES (new.id, new.nombre, new.categoria);
+    END
+    """,
+]
+
+SQL_ELIMINAR = [
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_insertar",
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_eliminar",
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_actualizar",
+    f"DROP TABLE IF EXISTS {TABLA_FTS}",
+]
+
+
+def disponible(conexion=connection):
+    return conexion.vendor == 'sqlite'
+
+
+def crear_indice(conexion=connection):
+    """Crea (si falta) la tabla FTS5 y sus triggers, y la llena desde cero."""
+    if not disponible(conexion):
+        return
+    with conexion.cursor() as cursor:
+        for sql in SQL_CREAR:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+        pesos = ', '.join(str(peso) for peso in PESOS_RANKING)
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rank) VALUES ('rank', 'bm25({pesos})')")
+
+
+def faltantes(conexion=connection):
+    """Nombres de los triggers del índice que no existen en la base."""
+    if not disponible(conexion):
+        return []
+    esperados = [f'{TABLA_FTS}_insertar', f'{TABLA_FTS}_eliminar', f'{TABLA_FTS}_actualizar']
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'inventario_producto'"
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+    return [nombre for nombre in esperados if nombre not in existentes]
+
+
+def existe_indice(conexion=connection):
+    if not disponible(conexion):
+        return False
+    return TABLA_FTS in conexion.introspection.table_names()
+
+
+def asegurar_indice(conexion=connection):
+    """
+    Si el índice existe pero le faltan triggers, lo recrea y reindexa (las
+    escrituras hechas sin triggers no quedaron en el índice). Devuelve los
+    triggers que faltaban.
+    """
+    if not existe_indice(conexion):
+        return []
+    perdidos = faltantes(conexion)
+    if perdidos:
+        crear_indice(conexion)
+    return perdidos
+
+
+def eliminar_indice(conexion=connection):
+    if not disponible(conexion):
+        return
+    with conexion.cursor() as cursor:
+        for sql in SQL_ELIMINAR:
+            cursor.execute(sql)
+
+
+def verificar_indice(conexion=connection):
+    """Revisa que el índice coincida con la tabla de productos (lanza DatabaseError si no)."""
+    if not disponible(conexion):
+        return
+    with conexion.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rank) VALUES ('integrity-check', 1)")
+
+
+def palabras(texto):
+    return re.findall(r'\w+', texto or '')
+
+
+def consulta_fts(texto):
+    """
+    Convierte lo escrito por el usuario en una consulta FTS5: cada palabra
+    entre comillas (sin operadores) y como prefijo. None si no hay palabras.
+    """
+    terminos = [f'"{palabra}"*' for palabra in palabras(texto)]
+    return ' '.join(terminos) or None
+
+
+def buscar_productos(productos, texto):
+    """
+    Filtra el queryset de productos por el texto buscado y lo ordena por
+    relevancia. Sin texto devuelve el queryset sin cambios.
+    """
+    if not palabras(texto):
+        return productos
+
+    if disponible():
+        return productos.filter(
+            busqueda__coincidencia__coincide=consulta_fts(texto)
+        ).order_by('busqueda__rank', 'id')
+
+    condicion = Q()
+    for palabra in palabras(texto):
+        condicion &= Q(nombre__icontains=palabra) | Q(categoria__icontains=palabra)
+    return productos.filter(condicion)
+
@@ -0,0 +1,150 @@
+# inventario/catalogo.py
+"""
+Caché del catálogo de productos para las vistas de solo lectura.
+
+Guarda en la caché de Django los campos que no cambian con las ventas
+(CAMPOS_CACHE) de los productos de cada categoría, bajo la versión de esa
+categoría. El stock cambia con cada venta, así que no se guarda: en cada
+lectura se superpone con una consulta values_list('id', 'stock').
+
+Las versiones son contadores VersionDatos ('catalogo:<categoria>') en la
+base de datos, así todos los procesos ven el mismo valor. Guardar o
+eliminar un Producto incrementa solo su categoría, salvo un
+save(update_fields=['stock']); una compra (señal precios_actualizados) y la
+importación masiva incrementan las categorías de sus productos. Si los ids
+de la consulta de stock no coinciden con los de la copia (un producto
+cambió de categoría, o se escribió sin pasar por el ORM) la copia se
+descarta. Ver el comando benchmark_catalogo.
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from reportes.cache_archivos import incrementar_versiones
+from reportes.models import VersionDatos
+
+from .busqueda import buscar_productos, palabras
+from .models import Producto
+
+PREFIJO_VERSION = 'catalogo:'
+TIEMPO_CACHE_CATALOGO = 5 * 60
+
+# Lo que muestran las listas y pantallas de selección
+CAMPOS_CACHE = ('id', 'nombre', 'categoria', 'precio', 'largo', 'ancho', 'alto', 'cepillado', 'especial')
+CAMPOS_VIVOS = ('stock',)
+# Construir instancias de Producto cuesta más que la consulta misma: las
+# listas reciben tuplas con nombre, que las plantillas leen igual
+FilaCatalogo = namedtuple('FilaCatalogo', CAMPOS_CACHE + CAMPOS_VIVOS)
+
+# Autocompletado de las pantallas de venta y compra: resultados por defecto
+# y máximo que se puede pedir
+RESULTADOS_AUTOCOMPLETAR = 20
+MAXIMO_RESULTADOS_AUTOCOMPLETAR = 50
+
+
+def version(categoria=''):
+    """Versión de la categoría o, sin categoría, la suma de todas (una consulta)."""
+    versiones = VersionDatos.objects.filter(clave__startswith=PREFIJO_VERSION)
+    if categoria:
+        versiones = versiones.filter(clave=PREFIJO_VERSION + categoria)
+    return versiones.aggregate(total=Sum('version'))['total'] or 0
+
+
+def incrementar_version(categorias=None):
+    """Incrementa las categorías indicadas (None = todas) en la transacción actual."""
+    if categorias is None:
+        categorias = [clave for clave, _ in Producto.CATEGORIAS]
+    incrementar_versiones(PREFIJO_VERSION + categoria for categoria in categorias)
+
+
+def _filas_cache(categoria):
+    clave = f'catalogo_productos:{version(categoria)}:{categoria or "*"}'
+    filas = cache.get(clave)
+    if filas is None:
+        filas = list(_consulta(categoria).values_list(*CAMPOS_CACHE))
+        cache.set(clave, filas, TIEMPO_CACHE_CATALOGO)
+    return clave, filas
+
+
+def _consulta(categoria):
+    consulta = Producto.objects.order_by('id')
+    if categoria:
+        consulta = consulta.filter(categoria=categoria)
+    return consulta
+
+
+def productos(categoria=''):
+    """
+    Filas (FilaCatalogo) de los productos de la categoría (o todos),
+    ordenadas por id: los campos de la copia en caché más el stock actual.
+    """
+    clave, filas = _filas_cache(categoria)
+    vivos = dict(_consulta(categoria).values_list('id', 'stock'))
+    if len(vivos) != len(filas) or any(fila[0] not in vivos for fila in filas):
+        cache.delete(clave)
+        clave, filas = _filas_cache(categoria)
+    return [FilaCatalogo._make(fila + (vivos[fila[0]],)) for fila in filas if fila[0] in vivos]
+
+
+def listar(categoria='', nombre='', cepillado=''):
+    """
+    Filas para las listas y pantallas de selección con sus filtros
+    opcionales. Con texto de búsqueda se consulta el índice FTS (ordenado
+    por relevancia); sin texto se usa la copia en caché.
+    """
+    if nombre:
+        consulta = Producto.objects.all()
+        if categoria:
+            consulta = consulta.filter(categoria=categoria)
+        if cepillado:
+            consulta = consulta.filter(cepillado=(cepillado == 'true'))
+        return [FilaCatalogo._make(fila) for fila in buscar_productos(consulta, nombre).values_list(*FilaCatalogo._fields)]
+
+    lista = productos(categoria)
+    if cepillado:
+        lista = [producto for producto in lista if producto.cepillado == (cepillado == 'true')]
+    return lista
+
+def autocompletar(texto, categoria='', limite=RESULTADOS_AUTOCOMPLETAR):
+    """
+    Los primeros `limite` productos para lo escrito (por relevancia) o, sin
+    texto, en orden alfabético, como dicts listos para JSON. Los ids y
+    nombres de cada término se guardan en caché bajo la versión de la
+    categoría; precio y stock se leen al momento.
+    """
+    limite = max(1, min(limite, MAXIMO_RESULTADOS_AUTOCOMPLETAR))
+    termino = ' '.join(palabras(texto)).lower()
+    parametros = json.dumps([termino, categoria, limite])
+    clave = f'catalogo_productos:{version(categoria)}:autocompletar:' + hashlib.md5(parametros.encode()).hexdigest()
+
+    encontrados = cache.get(clave)
+    if encontrados is None:
+        consulta = Producto.objects.all()
+        if categoria:
+            consulta = consulta.filter(categoria=categoria)
+        if termino:
+            consulta = buscar_productos(consulta, termino)
+        else:
+            # Usa los índices (nombre) y (categoria, nombre)
+            consulta = consulta.order_by('nombre', 'id')
+        encontrados = list(consulta.values_list('id', 'nombre')[:limite])
+        cache.set(clave, encontrados, TIEMPO_CACHE_CATALOGO)
+
+    vivos = {
+        producto_id: (precio, stock)
+        for producto_id, precio, stock in Producto.objects.filter(
+            id__in=[producto_id for producto_id, _ in encontrados]
+        ).values_list('id', 'precio', 'stock')
+    }
+    return [
+        {
+            'id': producto_id,
+            'nombre': nombre,
+            'precio': str(vivos[producto_id][0]),
+            'stock': vivos[producto_id][1],
+        }
+        for producto_id, nombre in encontrados if producto_id in vivos
+    ]
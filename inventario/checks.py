@@ -0,0 +1,41 @@
+from django.core.checks import Tags, Warning, register
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@register(Tags.database)
+def indice_busqueda(app_configs, databases=None, **kwargs):
+    """El índice FTS de productos debe tener sus triggers (ver inventario.busqueda)."""
+    from .busqueda import existe_indice, faltantes
+    errores = []
+    for alias in databases or []:
+        conexion = connections[alias]
+        if not existe_indice(conexion):
+            continue
+        perdidos = faltantes(conexion)
+        if perdidos:
+            errores.append(Warning(
+                f"Faltan triggers del índice de búsqueda de productos: {', '.join(perdidos)}",
+                hint='Correr python manage.py reconstruir_busqueda_productos',
+                id='inventario.W001',
+            ))
+    return errores
+
+
+@register(Tags.database)
+def alertas_stock(app_configs, databases=None, **kwargs):
+    """StockAlerta debe coincidir con el stock y los umbrales (ver inventario.alertas)."""
+    from .alertas import verificar_alertas
+    from .models import StockAlerta
+    if DEFAULT_DB_ALIAS not in (databases or []):
+        return []
+    # migrate corre los checks antes de crear las tablas
+    if StockAlerta._meta.db_table not in connections[DEFAULT_DB_ALIAS].introspection.table_names():
+        return []
+    diferencias = verificar_alertas()
+    if not diferencias:
+        return []
+    return [Warning(
+        f"{len(diferencias)} producto(s) con la alerta de stock desactualizada",
+        hint='Correr python manage.py reconstruir_alertas_stock',
+        id='inventario.W002',
+    )]
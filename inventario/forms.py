@@ -64,5 +64,42 @@ class UmbralStockForm(forms.ModelForm):
         }
 
 
+# Solo se guardan las filas que cambiaron (ver editar_umbrales_stock)
+UmbralStockFormSet = forms.modelformset_factory(Producto, form=UmbralStockForm, extra=0)
 
 
+class UmbralesPorCategoriaForm(forms.Form):
+    categoria = forms.ChoiceField(
+        choices=[('', 'Todas las categorías')] + Producto.CATEGORIAS,
+        required=False,
+        label='Categoría',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    umbral_stock_invierno = forms.IntegerField(
+        min_value=0,
+        required=False,
+        label='Umbral Invierno',
+        help_text='En blanco: no se modifica',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 0})
+    )
+    umbral_stock_verano = forms.IntegerField(
+        min_value=0,
+        required=False,
+        label='Umbral Verano',
+        help_text='En blanco: no se modifica',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 0})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('umbral_stock_invierno') is None and cleaned_data.get('umbral_stock_verano') is None:
+            raise forms.ValidationError('Indique al menos un umbral.')
+        return cleaned_data
+
+
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo CSV o XLSX',
+        help_text='Columnas obligatorias: nombre, categoria, precio',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
@@ -0,0 +1,281 @@
+"""
+Importación masiva de productos desde CSV o XLSX.
+
+Las filas se leen en streaming (módulo csv / openpyxl en modo solo
+lectura) y se procesan por lotes de TAMANO_LOTE: cada fila se valida con
+ProductoForm, y el lote se guarda en su propia transacción con un
+bulk_create para los productos nuevos y otro con update_conflicts para los
+existentes. Una fila con errores se informa y se salta; no detiene la importación.
+
+La clave natural es (categoria, nombre). Solo se escriben las columnas que
+trae el archivo: en un producto existente las demás no se tocan y en uno
+nuevo toman VALORES_POR_DEFECTO (stock y umbrales 0, como en
+registrar_producto) o el valor por defecto del modelo.
+Cuando el archivo trae stock, el cambio queda en MovimientoStock como al
+setear el stock a mano: la diferencia en los existentes y el stock inicial
+en los nuevos.
+
+bulk_create / bulk_update no disparan post_save: el índice de búsqueda se
+mantiene por sus triggers, las alertas y la caché de reportes por lote con
+la señal stock_actualizado, y la caché del catálogo incrementando la
+versión de las categorías del lote.
+"""
+import csv
+import io
+import time
+import unicodedata
+from itertools import islice
+
+import openpyxl
+from django.db import transaction
+
+from . import catalogo
+from .forms import ProductoForm
+from .models import MovimientoStock, Producto
+from .signals import stock_actualizado
+
+TAMANO_LOTE = 2000
+# Errores de fila que se guardan con detalle; el resto solo se cuenta
+MAXIMO_ERRORES = 1000
+
+COLUMNAS_OBLIGATORIAS = ('nombre', 'categoria', 'precio')
+COLUMNAS = COLUMNAS_OBLIGATORIAS + (
+    'stock',
+    'umbral_stock_invierno',
+    'umbral_stock_verano',
+    'largo',
+    'ancho',
+    'alto',
+    'especial',
+)
+# Valores de un producto nuevo cuando el archivo no trae la columna, los
+# mismos que fija registrar_producto (no los del modelo, umbrales 10/5)
+VALORES_POR_DEFECTO = {'stock': 0, 'umbral_stock_invierno': 0, 'umbral_stock_verano': 0}
+
+CATEGORIAS = {clave.lower(): clave for clave, _ in Producto.CATEGORIAS}
+VALORES_FALSOS = {'', '0', 'no', 'n', 'false', 'falso'}
+FORMATOS = ('csv', 'xlsx')
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar (formato o encabezados inválidos)."""
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.leidas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.con_error = 0
+        self.errores = []  # [(numero_fila, mensaje)], hasta MAXIMO_ERRORES
+        self.columnas_ignoradas = []
+        self.inicio = time.monotonic()
+        self.segundos = 0.0
+
+    def agregar_error(self, numero_fila, mensaje):
+        self.con_error += 1
+        if len(self.errores) < MAXIMO_ERRORES:
+            self.errores.append((numero_fila, mensaje))
+
+    @property
+    def filas_por_segundo(self):
+        return self.leidas / self.segundos if self.segundos else 0.0
+
+
+def normalizar_columna(nombre):
+    """'Categoría ' -> 'categoria', 'Umbral Stock Verano' -> 'umbral_stock_verano'."""
+    nombre = unicodedata.normalize('NFKD', str(nombre or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(nombre.strip().lower().split())
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _validar_columnas(encabezados):
+    columnas = [normalizar_columna(encabezado) for encabezado in encabezados]
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in columnas]
+    if faltantes:
+        raise ErrorImportacion(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+    return columnas
+
+
+def leer_csv(archivo):
+    """
+    Abre un CSV (binario o texto) y devuelve (columnas, filas); filas es un
+    iterador de (numero_fila, {columna: texto}). Detecta ',' ';' o tabulador.
+    """
+    if isinstance(archivo, io.TextIOBase):
+        texto = archivo
+    else:
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.readline()
+    except UnicodeDecodeError:
+        raise ErrorImportacion('El archivo CSV debe estar en UTF-8')
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(texto, dialecto)
+    columnas = _validar_columnas(next(csv.reader([muestra], dialecto), []))
+
+    def filas():
+        try:
+            for numero, valores in enumerate(lector, start=2):
+                if any(valor.strip() for valor in valores):
+                    yield numero, dict(zip(columnas, valores))
+        except UnicodeDecodeError:
+            raise ErrorImportacion(f'El archivo CSV debe estar en UTF-8 (cerca de la fila {lector.line_num + 1})')
+        except csv.Error as error:
+            raise ErrorImportacion(f'CSV inválido cerca de la fila {lector.line_num + 1}: {error}')
+
+    return columnas, filas()
+
+
+def leer_xlsx(archivo):
+    """Como leer_csv, para la primera hoja de un XLSX."""
+    try:
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as error:
+        raise ErrorImportacion(f'No se pudo leer el archivo XLSX: {error}')
+    hoja = libro.worksheets[0]
+    filas_hoja = hoja.iter_rows(values_only=True)
+    columnas = _validar_columnas(next(filas_hoja, ()))
+
+    def filas():
+        try:
+            for numero, valores in enumerate(filas_hoja, start=2):
+                valores = [_texto(valor) for valor in valores]
+                if any(valores):
+                    yield numero, dict(zip(columnas, valores))
+        finally:
+            libro.close()
+
+    return columnas, filas()
+
+
+def abrir_archivo(archivo, nombre):
+    """Elige el lector por la extensión del nombre del archivo."""
+    formato = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if formato == 'csv':
+        return leer_csv(archivo)
+    if formato == 'xlsx':
+        return leer_xlsx(archivo)
+    raise ErrorImportacion(f"Formato no soportado: '{formato}' (use {' o '.join(FORMATOS)})")
+
+
+def _datos_formulario(fila, columnas):
+    datos = dict(VALORES_POR_DEFECTO)
+    for columna in columnas:
+        valor = _texto(fila.get(columna))
+        if columna == 'categoria':
+            valor = CATEGORIAS.get(valor.lower(), valor)
+        elif columna == 'especial':
+            # CheckboxInput toma cualquier texto no vacío como verdadero
+            if valor.lower() in VALORES_FALSOS:
+                continue
+        datos[columna] = valor
+    return datos
+
+
+def _errores_formulario(form):
+    return '; '.join(
+        f"{campo}: {' '.join(mensajes)}" if campo != '__all__' else ' '.join(mensajes)
+        for campo, mensajes in form.errors.items()
+    )
+
+
+def _importar_lote(lote, columnas, campos, resultado):
+    validos = {}
+    for numero, fila in lote:
+        resultado.leidas += 1
+        form = ProductoForm(_datos_formulario(fila, columnas))
+        if not form.is_valid():
+            resultado.agregar_error(numero, _errores_formulario(form))
+            continue
+        producto = form.save(commit=False)
+        # Una clave repetida dentro del lote: gana la última fila
+        validos[(producto.categoria, producto.nombre)] = (numero, producto)
+
+    if not validos:
+        return
+
+    with transaction.atomic():
+        # La búsqueda de existentes va en la transacción: el stock leído es
+        # el que se reemplaza y su diferencia queda como movimiento
+        existentes = {}
+        duplicados = set()
+        consulta = Producto.objects.filter(
+            nombre__in={nombre for _, nombre in validos}
+        ).values_list('categoria', 'nombre', 'id', 'stock')
+        for categoria, nombre, producto_id, stock in consulta:
+            clave = (categoria, nombre)
+            if clave in validos:
+                if clave in existentes:
+                    duplicados.add(clave)
+                existentes[clave] = (producto_id, stock)
+
+        nuevos, actualizar, movimientos = [], [], []
+        for clave, (numero, producto) in validos.items():
+            if clave in duplicados:
+                resultado.agregar_error(
+                    numero, f"'{clave[1]}' ({clave[0]}) está repetido en la base; no se sabe cuál actualizar"
+                )
+            elif clave in existentes:
+                producto.pk, stock_anterior = existentes[clave]
+                actualizar.append(producto)
+                if 'stock' in campos and producto.stock != stock_anterior:
+                    movimientos.append(MovimientoStock(producto=producto, cantidad=producto.stock - stock_anterior))
+            else:
+                nuevos.append(producto)
+
+        Producto.objects.bulk_create(nuevos, batch_size=TAMANO_LOTE)
+        # INSERT ... ON CONFLICT(id) DO UPDATE: un UPDATE por lote mucho más
+        # barato que los CASE WHEN de bulk_update
+        Producto.objects.bulk_create(
+            actualizar,
+            batch_size=TAMANO_LOTE,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=campos
+        )
+        # bulk_create ya asignó los ids de los nuevos
+        movimientos.extend(
+            MovimientoStock(producto=producto, cantidad=producto.stock) for producto in nuevos if producto.stock
+        )
+        MovimientoStock.objects.bulk_create(movimientos, batch_size=TAMANO_LOTE)
+        ids = [producto.pk for producto in nuevos + actualizar]
+        stock_actualizado.send(sender=Producto, producto_ids=ids)
+        catalogo.incrementar_version({producto.categoria for producto in nuevos + actualizar})
+    resultado.creados += len(nuevos)
+    resultado.actualizados += len(actualizar)
+
+
+def importar_productos(columnas, filas, tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Importa las filas de abrir_archivo / leer_csv / leer_xlsx. Cada lote se
+    confirma por separado; progreso(resultado) se llama después de cada uno.
+    Devuelve un ResultadoImportacion.
+    """
+    resultado = ResultadoImportacion()
+    resultado.columnas_ignoradas = [columna for columna in columnas if columna not in COLUMNAS]
+    columnas = [columna for columna in columnas if columna in COLUMNAS]
+    # En los existentes solo se escriben las columnas del archivo
+    campos = [columna for columna in columnas if columna not in ('nombre', 'categoria')]
+
+    filas = iter(filas)
+    while True:
+        lote = list(islice(filas, tamano_lote))
+        if not lote:
+            break
+        _importar_lote(lote, columnas, campos, resultado)
+        resultado.segundos = time.monotonic() - resultado.inicio
+        if progreso:
+            progreso(resultado)
+    resultado.segundos = time.monotonic() - resultado.inicio
+    return resultado
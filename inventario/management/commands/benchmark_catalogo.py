@@ -0,0 +1,82 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventario import catalogo
+from inventario.models import Producto
+
+CATEGORIA = 'Especial'
+REPETICIONES = 5
+
+
+class _Revertir(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la lista de productos de una categoría sin caché y con la caché del catálogo '
+        '(acierto y fallo) para catálogos de distinto tamaño (no deja datos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--productos',
+            nargs='+',
+            type=int,
+            default=[1000, 10000, 50000],
+            help='Tamaños de la categoría a medir, en orden creciente (por defecto 1000 10000 50000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Categoría: {CATEGORIA}. Tiempos en ms (mediana de {REPETICIONES}). Instancias: lista de "
+            "Producto; Sin caché: las mismas filas que catalogo.productos leídas de la base"
+        )
+        self.stdout.write(
+            f"{'Productos':>10} {'Instancias':>10} {'Sin caché':>10} {'Acierto':>10} {'Fallo':>10}"
+        )
+        try:
+            # Todo se hace dentro de una transacción que se revierte al final
+            with transaction.atomic():
+                insertados = 0
+                for cantidad in sorted(options['productos']):
+                    Producto.objects.bulk_create([
+                        Producto(nombre=f'Benchmark {i}', categoria=CATEGORIA, precio=Decimal('1000'),
+                                 stock=i % 50, largo=3.2, ancho=2, alto=4, especial=True)
+                        for i in range(insertados, cantidad)
+                    ], batch_size=2000)
+                    insertados = cantidad
+                    total = Producto.objects.filter(categoria=CATEGORIA).count()
+                    consulta = Producto.objects.filter(categoria=CATEGORIA).order_by('id')
+                    tiempos = [
+                        self._medir(lambda: list(consulta.all())),
+                        self._medir(lambda: [
+                            catalogo.FilaCatalogo._make(fila)
+                            for fila in consulta.values_list(*catalogo.FilaCatalogo._fields)
+                        ]),
+                        self._medir(lambda: catalogo.productos(CATEGORIA)),
+                        self._medir(lambda: catalogo.productos(CATEGORIA), antes=self._invalidar),
+                    ]
+                    self.stdout.write(f"{total:>10} " + ' '.join(f"{tiempo:>10.1f}" for tiempo in tiempos))
+                raise _Revertir()
+        except _Revertir:
+            pass
+
+    def _invalidar(self):
+        catalogo.incrementar_version([CATEGORIA])
+
+    def _medir(self, funcion, antes=None):
+        # Una llamada previa deja la copia en caché para medir los aciertos
+        funcion()
+        tiempos = []
+        for _ in range(REPETICIONES):
+            if antes:
+                antes()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
@@ -0,0 +1,94 @@
+import csv
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventario.alertas import sincronizar_alertas
+from inventario.importacion import TAMANO_LOTE, abrir_archivo, importar_productos
+from inventario.models import Producto
+
+# Meta de la importación: filas por minuto en SQLite
+FILAS_POR_MINUTO = 100000
+
+
+class _Revertir(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un CSV de productos y mide importar_productos creando y luego actualizando '
+        'todas las filas (no deja datos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=FILAS_POR_MINUTO,
+            help=f'Filas del CSV generado (por defecto {FILAS_POR_MINUTO})',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas por lote (por defecto {TAMANO_LOTE})',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8', newline='') as archivo:
+            self._generar(archivo, options['filas'])
+        self.stdout.write(
+            'Segundos por pasada. Importar: leer, validar y guardar; Alertas: la sincronización de '
+            'StockAlerta que la importación deja para después del commit'
+        )
+        self.stdout.write(f"{'Pasada':>13} {'Importar':>10} {'Alertas':>10} {'Total':>10} {'Filas/min':>10}")
+        try:
+            # Todo se hace dentro de una transacción que se revierte al final
+            with transaction.atomic():
+                for pasada in ('creación', 'actualización'):
+                    self._medir(pasada, archivo.name, options['lote'])
+                raise _Revertir()
+        except _Revertir:
+            pass
+        finally:
+            os.unlink(archivo.name)
+
+    def _generar(self, archivo, filas):
+        escritor = csv.writer(archivo, delimiter=';')
+        escritor.writerow([
+            'Nombre', 'Categoría', 'Precio', 'Stock', 'Umbral Stock Invierno',
+            'Umbral Stock Verano', 'Largo', 'Ancho', 'Alto', 'Especial',
+        ])
+        categorias = [clave for clave, _ in Producto.CATEGORIAS]
+        for i in range(filas):
+            escritor.writerow([
+                f'Benchmark importación {i}', categorias[i % len(categorias)], 1000 + i % 9000,
+                i % 300, 10, 5, 3.2, 2, 4, 'no',
+            ])
+
+    def _medir(self, pasada, ruta, lote):
+        with open(ruta, 'rb') as archivo:
+            columnas, filas = abrir_archivo(archivo, ruta)
+            resultado = importar_productos(columnas, filas, lote)
+        if resultado.con_error:
+            self.stderr.write(f'{resultado.con_error} fila(s) con error en la {pasada}')
+
+        # Dentro de la transacción del benchmark on_commit nunca se ejecuta:
+        # la sincronización de alertas se mide aparte, por lotes como la importación
+        ids = list(Producto.objects.filter(nombre__startswith='Benchmark importación ').values_list('id', flat=True))
+        inicio = time.monotonic()
+        for desde in range(0, len(ids), lote):
+            sincronizar_alertas(ids[desde:desde + lote])
+        alertas = time.monotonic() - inicio
+
+        total = resultado.segundos + alertas
+        filas_por_minuto = resultado.leidas / total * 60 if total else 0
+        self.stdout.write(
+            f"{pasada:>13} {resultado.segundos:>10.1f} {alertas:>10.1f} {total:>10.1f} {filas_por_minuto:>10.0f}"
+        )
+        meta = 'cumple' if filas_por_minuto >= FILAS_POR_MINUTO else 'no cumple'
+        self.stdout.write(f"{'':>13} {resultado.leidas} filas; meta de {FILAS_POR_MINUTO} filas/min: {meta}")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.importacion import (
+    ErrorImportacion, TAMANO_LOTE, abrir_archivo, importar_productos,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa productos desde un CSV o XLSX: valida cada fila con ProductoForm y '
+        'crea o actualiza por (categoria, nombre) en lotes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas por lote y transacción (por defecto {TAMANO_LOTE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        def progreso(resultado):
+            if options['verbosity'] >= 2:
+                self.stdout.write(
+                    f'  {resultado.leidas} fila(s) leídas, '
+                    f'{resultado.filas_por_segundo:.0f} filas/s'
+                )
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                columnas, filas = abrir_archivo(archivo, options['archivo'])
+                resultado = importar_productos(columnas, filas, options['lote'], progreso)
+        except OSError as error:
+            raise CommandError(f'No se pudo abrir el archivo: {error}')
+        except ErrorImportacion as error:
+            raise CommandError(str(error))
+
+        if resultado.columnas_ignoradas:
+            self.stdout.write(f"Columnas ignoradas: {', '.join(resultado.columnas_ignoradas)}")
+        for numero, mensaje in resultado.errores:
+            self.stderr.write(f'Fila {numero}: {mensaje}')
+        if resultado.con_error > len(resultado.errores):
+            self.stderr.write(f'... y {resultado.con_error - len(resultado.errores)} error(es) más')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.leidas} fila(s) en {resultado.segundos:.1f} s '
+            f'({resultado.filas_por_segundo:.0f} filas/s): '
+            f'{resultado.creados} creado(s), {resultado.actualizados} actualizado(s), '
+            f'{resultado.con_error} con error'
+        ))
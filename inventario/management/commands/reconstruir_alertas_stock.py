@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.alertas import reconstruir_alertas, verificar_alertas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla StockAlerta desde cero y la verifica contra los productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='No reconstruye; solo informa las diferencias con los datos vivos',
+        )
+
+    def handle(self, *args, **options):
+        if not options['solo_verificar']:
+            total = reconstruir_alertas()
+            self.stdout.write(f'Tabla de alertas reconstruida: {total} producto(s) en alerta')
+
+        diferencias = verificar_alertas()
+        if diferencias:
+            for producto_id, esperado, actual in diferencias:
+                self.stderr.write(f'Producto {producto_id}: esperado {esperado}, actual {actual}')
+            raise CommandError(f'{len(diferencias)} diferencia(s) entre StockAlerta y los productos')
+
+        self.stdout.write(self.style.SUCCESS('StockAlerta coincide con los datos vivos'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from inventario.busqueda import crear_indice, verificar_indice, disponible, faltantes
+
+
+class Command(BaseCommand):
+    help = 'Recrea el índice de búsqueda de productos (FTS5) y sus triggers, y lo verifica'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='No reconstruye; solo revisa que el índice coincida con los productos',
+        )
+
+    def handle(self, *args, **options):
+        if not disponible():
+            raise CommandError('El índice de búsqueda de productos solo existe en SQLite')
+
+        if not options['solo_verificar']:
+            with transaction.atomic():
+                crear_indice()
+            self.stdout.write('Índice de búsqueda de productos reconstruido')
+
+        perdidos = faltantes()
+        if perdidos:
+            raise CommandError(f"Faltan triggers del índice de búsqueda: {', '.join(perdidos)}")
+
+        try:
+            verificar_indice()
+        except DatabaseError as e:
+            raise CommandError(f'El índice de búsqueda no coincide con los productos: {e}')
+
+        self.stdout.write(self.style.SUCCESS('El índice de búsqueda coincide con los productos'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _nivel(ratio):
+    if ratio > 0.75:
+        return 'normal'
+    if ratio > 0.5:
+        return 'advertencia'
+    if ratio > 0.25:
+        return 'bajo'
+    return 'critico'
+
+
+def poblar_alertas(apps, schema_editor):
+    # Carga inicial; luego la tabla se mantiene desde inventario.alertas
+    Producto = apps.get_model('inventario', 'Producto')
+    StockAlerta = apps.get_model('inventario', 'StockAlerta')
+    filas = []
+    productos = Producto.objects.values_list('id', 'stock', 'umbral_stock_verano', 'umbral_stock_invierno')
+    for producto_id, stock, umbral_verano, umbral_invierno in productos.iterator(chunk_size=2000):
+        fila = StockAlerta(producto_id=producto_id)
+        for estacion, umbral in (('verano', umbral_verano), ('invierno', umbral_invierno)):
+            if umbral and stock / umbral <= 1.05:
+                setattr(fila, f'ratio_{estacion}', stock / umbral)
+                setattr(fila, f'nivel_{estacion}', _nivel(stock / umbral))
+        if fila.ratio_verano is not None or fila.ratio_invierno is not None:
+            filas.append(fila)
+    StockAlerta.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_alter_producto_umbral_stock_invierno_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlerta',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='alerta', serialize=False, to='inventario.producto')),
+                ('ratio_verano', models.FloatField(blank=True, null=True)),
+                ('nivel_verano', models.CharField(blank=True, max_length=20, null=True)),
+                ('ratio_invierno', models.FloatField(blank=True, null=True)),
+                ('nivel_invierno', models.CharField(blank=True, max_length=20, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ratio_verano'], name='inventario__ratio_v_d96316_idx'), models.Index(fields=['ratio_invierno'], name='inventario__ratio_i_e1cc80_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_alertas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-17 23:16
+
+import django.db.models.deletion
+import inventario.models
+from django.db import migrations, models
+
+
+def crear_indice(apps, schema_editor):
+    from inventario.busqueda import crear_indice
+    crear_indice(schema_editor.connection)
+
+
+def eliminar_indice(apps, schema_editor):
+    from inventario.busqueda import eliminar_indice
+    eliminar_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_stockalerta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('producto', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='inventario.producto')),
+                ('nombre', models.TextField()),
+                ('categoria', models.TextField()),
+                ('coincidencia', inventario.models.CampoBusqueda(db_column='inventario_producto_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'inventario_producto_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
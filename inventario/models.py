@@ -1,5 +1,178 @@
 from django.db import models
+from django.db.models import Case, When, F, Q, Value, FloatField, CharField, ExpressionWrapper
+from django.db.models.functions import Cast
+from django.db.models.lookups import In, Lookup
 from django.utils.timezone import now
+from .signals import precios_actualizados, stock_actualizado
+
+# Chile, simplificado a 2 estaciones:
+# Verano = dic–may   (verano + otoño)
+# Invierno = jun–nov (invierno + primavera)
+MESES_VERANO = [12, 1, 2, 3, 4, 5]
+MESES_INVIERNO = [6, 7, 8, 9, 10, 11]
+
+
+def estacion_del_mes(mes):
+    return 'verano' if mes in MESES_VERANO else 'invierno'
+
+
+def umbral_del_mes(mes):
+    """
+    Expresión SQL del umbral de stock vigente en el mes dado. El mes puede
+    ser un número o una expresión (p. ej. ExtractMonth('fecha')); es la
+    misma regla de estacion_del_mes, evaluada en la base de datos.
+    """
+    if not hasattr(mes, 'resolve_expression'):
+        mes = Value(mes)
+    return Case(
+        When(In(mes, MESES_VERANO), then=F('umbral_stock_verano')),
+        default=F('umbral_stock_invierno'),
+    )
+
+# Solo se alerta cuando el stock está en o por debajo del 105% del umbral
+# (pre-alerta para avisar que se está acercando).
+RATIO_PREALERTA = 1.05
+
+# Productos por sentencia en las actualizaciones masivas de stock
+# (mantiene el número de parámetros bajo el límite de SQLite)
+LOTE_ACTUALIZACION = 200
+
+
+class ProductoQuerySet(models.QuerySet):
+    def con_umbral(self, mes):
+        """Anota el umbral de la estación del mes dado (ver umbral_del_mes)."""
+        return self.annotate(umbral=umbral_del_mes(mes))
+
+    def con_alerta(self, mes):
+        """
+        Anota umbral, ratio (stock / umbral) y nivel de alerta según la
+        estación del mes dado. Todo se calcula en la base de datos; los
+        productos sin umbral configurado quedan fuera.
+        """
+        ratio = ExpressionWrapper(
+            Cast('stock', FloatField()) / F('umbral'),
+            output_field=FloatField()
+        )
+        return self.con_umbral(mes).filter(
+            umbral__gt=0
+        ).annotate(
+            ratio=ratio
+        ).annotate(
+            # 4 niveles:
+            #  > 75% a 105%  → normal
+            #  > 50% a 75%   → advertencia
+            #  > 25% a 50%   → bajo
+            #  ≤ 25%         → critico
+            nivel=Case(
+                When(ratio__gt=0.75, then=Value('normal')),
+                When(ratio__gt=0.5, then=Value('advertencia')),
+                When(ratio__gt=0.25, then=Value('bajo')),
+                default=Value('critico'),
+                output_field=CharField(),
+            )
+        )
+
+    def sin_umbral(self, mes):
+        """
+        Productos con umbral 0 en la estación del mes dado (p. ej. los
+        creados con registrar_producto). con_alerta y bajo_umbral los dejan
+        fuera; los reportes informan cuántos son.
+        """
+        return self.con_umbral(mes).filter(umbral=0)
+
+    def alertas(self, mes):
+        """Productos en alerta para el mes dado, del más crítico al menos crítico."""
+        return self.con_alerta(mes).filter(
+            ratio__lte=RATIO_PREALERTA
+        ).order_by('ratio', 'id')
+
+    def bajo_umbral(self, mes):
+        """
+        Productos con stock en o bajo el umbral de la estación del mes dado.
+        Solo se revisan los que están en el índice StockAlerta, que incluye
+        a todo producto en alerta en alguna estación.
+        """
+        return self.filter(alerta__isnull=False).con_alerta(mes).filter(ratio__lte=1)
+
+    def descontar_stock(self, cantidades):
+        """
+        Descuenta {producto_id: cantidad} con un UPDATE condicional por lote:
+        solo se modifican las filas que todavía tienen stock suficiente.
+        Devuelve el número de filas afectadas; si es menor que la cantidad
+        de productos, a alguno le faltó stock y quien llama debe revertir.
+        """
+        afectados = 0
+        ids = list(cantidades)
+        for inicio in range(0, len(ids), LOTE_ACTUALIZACION):
+            lote = ids[inicio:inicio + LOTE_ACTUALIZACION]
+            condicion = Q()
+            for producto_id in lote:
+                condicion |= Q(id=producto_id, stock__gte=cantidades[producto_id])
+            afectados += self.filter(condicion).update(stock=Case(
+                *[When(id=producto_id, then=F('stock') - cantidades[producto_id]) for producto_id in lote],
+                default=F('stock'),
+                output_field=models.PositiveIntegerField(),
+            ))
+        stock_actualizado.send(sender=self.model, producto_ids=ids)
+        return afectados
+
+    def ingresar_stock(self, cantidades, precios):
+        """
+        Suma {producto_id: cantidad} al stock y fija {producto_id: precio}
+        con un UPDATE por lote. El stock se incrementa con F() en la base de
+        datos, así dos recepciones simultáneas no se pisan.
+        """
+        campo_precio = self.model._meta.get_field('precio')
+        ids = list(cantidades)
+        for inicio in range(0, len(ids), LOTE_ACTUALIZACION):
+            lote = ids[inicio:inicio + LOTE_ACTUALIZACION]
+            self.filter(id__in=lote).update(
+                stock=Case(
+                    *[When(id=producto_id, then=F('stock') + cantidades[producto_id]) for producto_id in lote],
+                    default=F('stock'),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                precio=Case(
+                    *[When(id=producto_id, then=Value(campo_precio.to_python(precios[producto_id]),
+                                                      output_field=campo_precio))
+                      for producto_id in lote],
+                    default=F('precio'),
+                    output_field=campo_precio,
+                ),
+            )
+        stock_actualizado.send(sender=self.model, producto_ids=ids)
+        precios_actualizados.send(sender=self.model, producto_ids=ids)
+
+    def actualizar_umbrales(self, productos):
+        """
+        Guarda los umbrales de las instancias dadas con bulk_update (un
+        UPDATE por lote, no uno por producto).
+        """
+        productos = list(productos)
+        self.bulk_update(
+            productos,
+            ['umbral_stock_invierno', 'umbral_stock_verano'],
+            batch_size=LOTE_ACTUALIZACION
+        )
+        stock_actualizado.send(sender=self.model, producto_ids=[producto.id for producto in productos])
+
+    def fijar_umbrales(self, invierno=None, verano=None):
+        """
+        Fija los umbrales indicados (None = sin cambio) en todos los
+        productos de la consulta con un solo UPDATE. Devuelve cuántos
+        productos se actualizaron.
+        """
+        campos = {}
+        if invierno is not None:
+            campos['umbral_stock_invierno'] = invierno
+        if verano is not None:
+            campos['umbral_stock_verano'] = verano
+        if not campos:
+            return 0
+        afectados = self.update(**campos)
+        stock_actualizado.send(sender=self.model, producto_ids=None, productos=self)
+        return afectados
+
 
 class Producto(models.Model):
     CATEGORIAS = [
@@ -29,24 +202,23 @@ class Producto(models.Model):
     cepillado = models.BooleanField(default=False)
     especial = models.BooleanField(default=False)
 
+    objects = ProductoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Autocompletado sin texto: primeros productos por nombre
+            models.Index(fields=['nombre', 'id'], name='inventario_prod_nombre_idx'),
+            models.Index(fields=['categoria', 'nombre', 'id'], name='inventario_prod_cat_nom_idx'),
+        ]
+
     def get_umbral_actual(self):
         """
         Determina el umbral de stock según la estación actual
+        (la misma regla que umbral_del_mes)
         """
         from django.utils import timezone
-        mes_actual = timezone.now().month
-        
-        # Define los meses de invierno y verano (hemisferio sur)
-        meses_invierno = [6, 7, 8]  # Junio, Julio, Agosto
-        meses_verano = [12, 1, 2]   # Diciembre, Enero, Febrero
-        
-        if mes_actual in meses_invierno:
-            return self.umbral_stock_invierno
-        elif mes_actual in meses_verano:
-            return self.umbral_stock_verano
-        else:
-            # Para meses intermedios, usar un umbral intermedio
-            return (self.umbral_stock_invierno + self.umbral_stock_verano) // 2
+        estacion = estacion_del_mes(timezone.localtime().month)
+        return getattr(self, f'umbral_stock_{estacion}')
 
     def esta_bajo_minimo(self):
         """
@@ -64,3 +236,68 @@ class MovimientoStock(models.Model):
 
     def __str__(self):
         return f"{self.producto.nombre} - {self.cantidad} unidades"
+
+
+class StockAlerta(models.Model):
+    """
+    Índice materializado de los productos en alerta de stock. Guarda ratio y
+    nivel para ambas estaciones, así el cambio de estación no lo deja obsoleto.
+    Se mantiene desde inventario.alertas en cada escritura de stock o umbrales.
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='alerta'
+    )
+    ratio_verano = models.FloatField(null=True, blank=True)
+    nivel_verano = models.CharField(max_length=20, null=True, blank=True)
+    ratio_invierno = models.FloatField(null=True, blank=True)
+    nivel_invierno = models.CharField(max_length=20, null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ratio_verano']),
+            models.Index(fields=['ratio_invierno']),
+        ]
+
+    def __str__(self):
+        return f"Alerta {self.producto_id}"
+
+
+class CampoBusqueda(models.TextField):
+    """Columna oculta de una tabla FTS5 con el mismo nombre que la tabla."""
+
+
+@CampoBusqueda.register_lookup
+class Coincide(Lookup):
+    lookup_name = 'coincide'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class ProductoBusqueda(models.Model):
+    """
+    Índice de texto completo (SQLite FTS5) de nombre y categoría de los
+    productos. La tabla y los triggers que la sincronizan los crea
+    inventario.busqueda; acá solo se declara para poder consultarla.
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='busqueda'
+    )
+    nombre = models.TextField()
+    categoria = models.TextField()
+    coincidencia = CampoBusqueda(db_column='inventario_producto_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventario_producto_fts'
@@ -0,0 +1,67 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.dispatch import Signal, receiver
+
+# Se envía tras descontar_stock / ingresar_stock y tras los cambios masivos
+# de umbrales, que actualizan con UPDATE y no disparan post_save.
+# Argumentos: producto_ids (lista de ids afectados) o, si la actualización
+# fue por consulta (p. ej. una categoría completa), producto_ids=None y
+# productos (la consulta). Uno de los dos es obligatorio. Las escrituras que
+# no envían la señal (QuerySet.update, acciones masivas del admin) dejan
+# StockAlerta desactualizada: lo detecta el check inventario.W002 y lo
+# corrige el comando reconstruir_alertas_stock.
+stock_actualizado = Signal()
+
+# Se envía tras ingresar_stock, que además fija el precio de compra.
+# Argumentos: producto_ids.
+precios_actualizados = Signal()
+
+
+# Invalidación de la caché del catálogo (inventario.catalogo), en la misma
+# transacción que la escritura. El stock no está en la copia: un
+# save(update_fields=['stock']) o la señal stock_actualizado no la invalidan.
+@receiver(post_save, sender='inventario.Producto')
+@receiver(post_delete, sender='inventario.Producto')
+def catalogo_modificado(sender, instance, update_fields=None, **kwargs):
+    from .catalogo import CAMPOS_VIVOS, incrementar_version
+    if update_fields and set(update_fields) <= set(CAMPOS_VIVOS):
+        return
+    incrementar_version([instance.categoria])
+
+
+@receiver(precios_actualizados)
+def catalogo_precios_modificados(sender, producto_ids, **kwargs):
+    from .catalogo import incrementar_version
+    categorias = sender.objects.filter(id__in=list(producto_ids)).values_list('categoria', flat=True)
+    incrementar_version(set(categorias))
+
+
+# Sincronización de StockAlerta (inventario.alertas) al confirmar la
+# transacción, para cualquier save() o escritura masiva del modelo
+@receiver(post_save, sender='inventario.Producto')
+def alertas_producto_guardado(sender, instance, **kwargs):
+    from .alertas import sincronizar_alertas
+    transaction.on_commit(partial(sincronizar_alertas, [instance.pk]))
+
+
+@receiver(stock_actualizado)
+def alertas_stock_actualizado(sender, producto_ids=None, productos=None, **kwargs):
+    from .alertas import sincronizar_alertas, sincronizar_alertas_de
+    if producto_ids is not None:
+        transaction.on_commit(partial(sincronizar_alertas, list(producto_ids)))
+    elif productos is not None:
+        transaction.on_commit(partial(sincronizar_alertas_de, productos.all()))
+    else:
+        raise ValueError('stock_actualizado requiere producto_ids o productos')
+
+
+# Las migraciones que reconstruyen inventario_producto en SQLite borran los
+# triggers del índice de búsqueda: se recrean al terminar cada migrate
+@receiver(post_migrate)
+def indice_busqueda_tras_migrar(sender, using='default', **kwargs):
+    if sender.name != 'inventario':
+        return
+    from .busqueda import asegurar_indice
+    asegurar_indice(connections[using])
@@ -0,0 +1,53 @@
+/*
+ * Autocompletado de productos para las pantallas de venta y compra.
+ * Llena el <select> con los resultados de inventario:autocompletar_productos
+ * (data-url) a medida que se escribe en el campo de búsqueda, así la página
+ * no trae el catálogo completo.
+ */
+function iniciarAutocompletarProductos(campoBusqueda, select) {
+    const url = select.dataset.url;
+    const categoria = select.dataset.categoria || '';
+    let temporizador = null;
+    let ultimaConsulta = 0;
+
+    function mostrar(productos) {
+        select.innerHTML = '';
+        if (productos.length === 0) {
+            select.add(new Option('--- No hay productos disponibles ---', ''));
+            return;
+        }
+        productos.forEach(function(producto) {
+            const opcion = new Option(`${producto.nombre} (Stock: ${producto.stock})`, producto.id);
+            opcion.dataset.nombre = producto.nombre;
+            opcion.dataset.precio = producto.precio;
+            opcion.dataset.stock = producto.stock;
+            select.add(opcion);
+        });
+        select.selectedIndex = 0;
+    }
+
+    function buscar() {
+        const consulta = ++ultimaConsulta;
+        const parametros = new URLSearchParams({q: campoBusqueda.value, categoria: categoria});
+        fetch(`${url}?${parametros}`, {headers: {'Accept': 'application/json'}})
+            .then(respuesta => respuesta.json())
+            .then(datos => {
+                // Se descartan las respuestas de búsquedas ya reemplazadas
+                if (consulta === ultimaConsulta) {
+                    mostrar(datos.productos);
+                }
+            })
+            .catch(() => {
+                if (consulta === ultimaConsulta) {
+                    select.innerHTML = '';
+                    select.add(new Option('--- Error al buscar productos ---', ''));
+                }
+            });
+    }
+
+    campoBusqueda.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        temporizador = setTimeout(buscar, 250);
+    });
+    buscar();
+}
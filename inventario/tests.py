@@ -1,7 +1,15 @@
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls import reverse
 from decimal import Decimal
-from .models import Producto, MovimientoStock
+from .models import Producto, MovimientoStock, StockAlerta, estacion_del_mes
+from .alertas import reconstruir_alertas, verificar_alertas
+from .busqueda import buscar_productos
+from .signals import stock_actualizado
+from django.core import checks
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import BytesIO, StringIO
 from usuario.models import Usuario
 from django.utils import timezone
 from datetime import datetime
@@ -9,6 +17,8 @@ from datetime import datetime
 # Tests para el módulo de inventario: creación de productos, actualización de stock,
 # alertas de stock bajo, procesos de cepillado y gestión de productos especiales
 class InventarioTests(TestCase):
+    databases = {'default', 'logs'}
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -25,6 +35,8 @@ class InventarioTests(TestCase):
         return status_descriptions.get(status_code, f"Código {status_code} - No documentado")
 
     def setUp(self):
+        # Caché del catálogo y del autocompletado limpia en cada prueba
+        cache.clear()
         if not self.__class__._setup_message_shown:
             print("\n" + "="*65)
             print("="*65)
@@ -120,19 +132,13 @@ class InventarioTests(TestCase):
         umbral = producto.get_umbral_actual()
         print(f"\n• Umbral actual según mes: {umbral}")
         
-        # El umbral debe ser uno de los definidos o un valor intermedio
-        mes_actual = timezone.now().month
-        meses_invierno = [6, 7, 8]
-        meses_verano = [12, 1, 2]
-        
-        if mes_actual in meses_invierno:
-            print(f"  → Estación: Invierno")
-            self.assertEqual(umbral, producto.umbral_stock_invierno)
-        elif mes_actual in meses_verano:
+        # Regla de 2 estaciones: verano dic–may, invierno jun–nov
+        if timezone.localtime().month in [12, 1, 2, 3, 4, 5]:
             print(f"  → Estación: Verano")
             self.assertEqual(umbral, producto.umbral_stock_verano)
         else:
-            print(f"  → Estación: Intermedia")
+            print(f"  → Estación: Invierno")
+            self.assertEqual(umbral, producto.umbral_stock_invierno)
         
         print("-"*50)
 
@@ -353,6 +359,216 @@ class InventarioTests(TestCase):
         self.assertTemplateUsed(response, 'inventario/alerta_stock.html')
         print("-"*50)
 
+    def test_alertas_clasificadas_en_consulta(self):
+        print("\n" + "="*50)
+        print("TEST: CLASIFICACIÓN DE ALERTAS EN LA BASE DE DATOS")
+        print("="*50)
+        # Umbral de verano 20, de invierno 10
+        for nombre, stock in [("Normal", 20), ("Advertencia", 14), ("Bajo", 8),
+                              ("Critico", 2), ("Suficiente", 30)]:
+            Producto.objects.create(
+                nombre=nombre,
+                categoria="Madera",
+                precio=Decimal("1000"),
+                stock=stock,
+                umbral_stock_invierno=10,
+                umbral_stock_verano=20
+            )
+        Producto.objects.create(
+            nombre="Sin Umbral",
+            categoria="Madera",
+            precio=Decimal("1000"),
+            stock=0,
+            umbral_stock_invierno=0,
+            umbral_stock_verano=0
+        )
+
+        print("• Consultando alertas de enero (verano)...")
+        alertas = list(Producto.objects.alertas(1))
+        for producto in alertas:
+            print(f"  → {producto.nombre}: {producto.ratio:.2f} ({producto.nivel})")
+
+        self.assertEqual(
+            [p.nombre for p in alertas],
+            ["Critico", "Bajo", "Advertencia", "Normal"]
+        )
+        self.assertEqual(
+            [p.nivel for p in alertas],
+            ["critico", "bajo", "advertencia", "normal"]
+        )
+
+        print("\n• Consultando alertas de julio (invierno)...")
+        alertas_invierno = list(Producto.objects.alertas(7))
+        print(f"  → Alertas: {[p.nombre for p in alertas_invierno]}")
+        self.assertEqual([p.nombre for p in alertas_invierno], ["Critico", "Bajo"])
+        self.assertEqual(alertas_invierno[0].umbral, 10)
+        print("-"*50)
+
+    def test_umbral_por_estacion_en_la_base(self):
+        print("\n" + "="*50)
+        print("TEST: UMBRAL POR ESTACIÓN EN LA BASE DE DATOS")
+        print("="*50)
+        # Bajo el umbral de verano (20) pero no el de invierno (10)
+        producto = Producto.objects.create(
+            nombre="Producto Estacional",
+            categoria="Madera",
+            precio=Decimal("1000"),
+            stock=15,
+            umbral_stock_invierno=10,
+            umbral_stock_verano=20
+        )
+        reconstruir_alertas()
+
+        for mes in range(1, 13):
+            umbral = Producto.objects.con_umbral(mes).get(pk=producto.pk).umbral
+            bajo = Producto.objects.bajo_umbral(mes).filter(pk=producto.pk).exists()
+            estacion = estacion_del_mes(mes)
+            print(f"  → Mes {mes:>2} ({estacion}): umbral {umbral}, bajo umbral: {bajo}")
+            self.assertEqual(umbral, getattr(producto, f'umbral_stock_{estacion}'))
+            self.assertEqual(bajo, estacion == 'verano')
+
+        print("\n• Comparando con el umbral del modelo...")
+        mes_actual = timezone.localtime().month
+        print(f"  → get_umbral_actual(): {producto.get_umbral_actual()}")
+        self.assertEqual(producto.get_umbral_actual(), Producto.objects.con_umbral(mes_actual).get(pk=producto.pk).umbral)
+        self.assertEqual(
+            producto.esta_bajo_minimo(),
+            Producto.objects.bajo_umbral(mes_actual).filter(pk=producto.pk).exists()
+        )
+        print("-"*50)
+
+    def test_busqueda_de_productos_por_texto(self):
+        print("\n" + "="*50)
+        print("TEST: BÚSQUEDA DE PRODUCTOS POR TEXTO")
+        print("="*50)
+        pino = Producto.objects.create(nombre="Pino Cepillado 2x4", categoria="Madera", precio=Decimal("1000"), stock=5)
+        Producto.objects.create(nombre="Pino Impregnado", categoria="Madera", precio=Decimal("1200"), stock=5)
+        Producto.objects.create(nombre="Tablero Melamina", categoria="Planchas", precio=Decimal("9000"), stock=5)
+        Producto.objects.create(nombre="Raulí Nativo", categoria="Especial", precio=Decimal("15000"), stock=5)
+
+        def nombres(texto):
+            return [producto.nombre for producto in buscar_productos(Producto.objects.all(), texto)]
+
+        print("• Buscando por prefijo y varias palabras...")
+        print(f"  → 'pin': {nombres('pin')}")
+        print(f"  → 'pino cep': {nombres('pino cep')}")
+        print(f"  → 'rauli' (sin tilde): {nombres('rauli')}")
+        self.assertEqual(set(nombres('pin')), {"Pino Cepillado 2x4", "Pino Impregnado"})
+        self.assertEqual(nombres('pino cep'), ["Pino Cepillado 2x4"])
+        self.assertEqual(nombres('rauli'), ["Raulí Nativo"])
+        self.assertEqual(nombres('planchas'), ["Tablero Melamina"])
+        # Los caracteres especiales de FTS5 se tratan como texto
+        self.assertEqual(nombres('"pino* ('), nombres('pino'))
+
+        print("\n• El nombre pesa más que la categoría...")
+        Producto.objects.create(nombre="Listón Madera Seca", categoria="Otros", precio=Decimal("800"), stock=5)
+        print(f"  → 'madera': {nombres('madera')}")
+        self.assertEqual(nombres('madera')[0], "Listón Madera Seca")
+
+        print("\n• El índice sigue los cambios de nombre y las eliminaciones...")
+        Producto.objects.filter(pk=pino.pk).update(nombre="Roble Cepillado")
+        self.assertEqual(nombres('pino cep'), [])
+        self.assertEqual(nombres('roble'), ["Roble Cepillado"])
+        Producto.objects.filter(nombre="Pino Impregnado").delete()
+        self.assertEqual(nombres('pino'), [])
+        call_command('reconstruir_busqueda_productos', '--solo-verificar', stdout=StringIO())
+
+        print("\n• Buscando desde la lista de productos...")
+        response = self.client.get(reverse('inventario:lista_productos'), {'nombre': 'tabl'})
+        print(f"  → Resultados: {[p.nombre for p in response.context['productos']]}")
+        self.assertEqual([p.nombre for p in response.context['productos']], ["Tablero Melamina"])
+        print("-"*50)
+
+    def test_indice_alertas_actualizado_al_escribir_stock(self):
+        print("\n" + "="*50)
+        print("TEST: ÍNDICE DE ALERTAS AL ACTUALIZAR STOCK")
+        print("="*50)
+        producto = Producto.objects.create(
+            nombre="Producto Indexado",
+            categoria="Madera",
+            precio=Decimal("1000"),
+            stock=50,
+            umbral_stock_invierno=10,
+            umbral_stock_verano=20
+        )
+        print("• Bajando el stock a 4 desde la vista...")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('inventario:actualizar_stock', args=[producto.id]),
+                {'nuevo_stock': 4}
+            )
+        self.assertEqual(response.status_code, 302)
+
+        alerta = StockAlerta.objects.get(producto=producto)
+        print(f"  → Verano: {alerta.ratio_verano} ({alerta.nivel_verano})")
+        print(f"  → Invierno: {alerta.ratio_invierno} ({alerta.nivel_invierno})")
+        self.assertAlmostEqual(alerta.ratio_verano, 0.2)
+        self.assertEqual(alerta.nivel_verano, 'critico')
+        self.assertAlmostEqual(alerta.ratio_invierno, 0.4)
+        self.assertEqual(alerta.nivel_invierno, 'bajo')
+
+        print("\n• Reponiendo stock a 100...")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('inventario:actualizar_stock', args=[producto.id]),
+                {'nuevo_stock': 100}
+            )
+        self.assertFalse(StockAlerta.objects.filter(producto=producto).exists())
+        self.assertEqual(verificar_alertas(), [])
+
+        print("\n• Guardando fuera de las vistas (admin, shell)...")
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.stock = 1
+            producto.save()
+        mes = timezone.localtime().month
+        print(f"  → Alerta creada: {StockAlerta.objects.filter(producto=producto).exists()}")
+        self.assertTrue(StockAlerta.objects.filter(producto=producto).exists())
+        self.assertTrue(Producto.objects.bajo_umbral(mes).filter(pk=producto.pk).exists())
+
+        print("\n• Cambio masivo de umbrales por consulta...")
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.filter(categoria="Madera").fijar_umbrales(invierno=0, verano=0)
+        self.assertFalse(StockAlerta.objects.filter(producto=producto).exists())
+        self.assertEqual(verificar_alertas(), [])
+        print("-"*50)
+
+    def test_comando_reconstruir_alertas(self):
+        print("\n" + "="*50)
+        print("TEST: COMANDO RECONSTRUIR ALERTAS")
+        print("="*50)
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(
+                nombre="Producto Sin Indexar",
+                categoria="Planchas",
+                precio=Decimal("1000"),
+                stock=50,
+                umbral_stock_invierno=10,
+                umbral_stock_verano=10
+            )
+        # Un UPDATE directo no envía señales: el índice queda desactualizado
+        Producto.objects.filter(pk=producto.pk).update(stock=1)
+        print("• Stock cambiado con un UPDATE directo (índice desactualizado)")
+        self.assertEqual(len(verificar_alertas()), 1)
+        avisos = checks.run_checks(tags=[checks.Tags.database], databases=['default'])
+        print(f"  → Checks: {[aviso.id for aviso in avisos]}")
+        self.assertIn('inventario.W002', [aviso.id for aviso in avisos])
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_alertas_stock', '--solo-verificar', stdout=StringIO(), stderr=StringIO())
+
+        salida = StringIO()
+        call_command('reconstruir_alertas_stock', stdout=salida)
+        print(f"  → {salida.getvalue().strip()}")
+        self.assertTrue(StockAlerta.objects.filter(producto=producto).exists())
+        avisos = checks.run_checks(tags=[checks.Tags.database], databases=['default'])
+        self.assertNotIn('inventario.W002', [aviso.id for aviso in avisos])
+        self.assertEqual(reconstruir_alertas(), 1)
+
+        print("\n• stock_actualizado sin producto_ids ni productos...")
+        with self.assertRaises(ValueError):
+            stock_actualizado.send(sender=Producto)
+        print("  → Rechazada")
+        print("-"*50)
+
     def test_filtro_por_categoria(self):
         print("\n" + "="*50)
         print("TEST: FILTRO DE PRODUCTOS POR CATEGORÍA")
@@ -384,6 +600,365 @@ class InventarioTests(TestCase):
         self.assertEqual(response.status_code, 200)
         print("-"*50)
 
+    def test_cache_del_catalogo(self):
+        from django.db import connection
+        from django.db.models import F
+        from django.test.utils import CaptureQueriesContext
+        from reportes.models import VersionDatos
+        print("\n" + "="*50)
+        print("TEST: CACHÉ DEL CATÁLOGO DE PRODUCTOS")
+        print("="*50)
+        producto = Producto.objects.create(nombre="Pino Catálogo", categoria="Madera", precio=Decimal("1000"), stock=10)
+        Producto.objects.create(nombre="Plancha Catálogo", categoria="Planchas", precio=Decimal("5000"), stock=3)
+        url = reverse('inventario:lista_productos')
+
+        def consultas_productos(parametros=None):
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url, parametros or {})
+            return response, [c for c in consultas if 'FROM "inventario_producto"' in c['sql']]
+
+        def version(categoria):
+            return VersionDatos.objects.filter(clave=f'catalogo:{categoria}').values_list('version', flat=True).first()
+
+        print("• Primera visita y repetición...")
+        self.client.get(url, {'categoria': 'Madera'})
+        response, consultas = consultas_productos({'categoria': 'Madera'})
+        print(f"  → Consultas a productos en la repetición: {len(consultas)} ({consultas[0]['sql'][:60]}...)")
+        # Solo la consulta de stock y precio, sin los demás campos
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('"nombre"', consultas[0]['sql'])
+        self.assertEqual([p.nombre for p in response.context['productos']], ["Pino Catálogo"])
+
+        print("\n• Una venta no invalida la copia, pero el stock mostrado es el actual...")
+        version_madera = version('Madera')
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.descontar_stock({producto.id: 4})
+        response, consultas = consultas_productos({'categoria': 'Madera'})
+        mostrado = response.context['productos'][0]
+        print(f"  → Stock mostrado: {mostrado.stock}, consultas: {len(consultas)}")
+        self.assertEqual(mostrado.stock, 6)
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(version('Madera'), version_madera)
+
+        print("\n• Una compra fija el precio e invalida solo su categoría...")
+        version_planchas = version('Planchas')
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.ingresar_stock({producto.id: 2}, {producto.id: Decimal("1100")})
+        response, _ = consultas_productos({'categoria': 'Madera'})
+        mostrado = response.context['productos'][0]
+        print(f"  → Stock mostrado: {mostrado.stock}, precio: {mostrado.precio}")
+        self.assertEqual((mostrado.stock, mostrado.precio), (8, Decimal("1100")))
+        self.assertGreater(version('Madera'), version_madera)
+        self.assertEqual(version('Planchas'), version_planchas)
+        version_madera = version('Madera')
+
+        print("\n• Guardar solo el stock tampoco, y otra categoría no se toca...")
+        self.client.get(url, {'categoria': 'Planchas'})
+        version_planchas = version('Planchas')
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.refresh_from_db()
+            producto.stock = 5
+            producto.save(update_fields=['stock'])
+            producto.largo = 3.2
+            producto.save()
+        self.assertEqual(version('Planchas'), version_planchas)
+        self.assertGreater(version('Madera'), version_madera)
+        _, consultas = consultas_productos({'categoria': 'Planchas'})
+        self.assertEqual(len(consultas), 1)
+
+        print("\n• La versión está en la base, compartida entre procesos...")
+        # Otro proceso que renombra incrementa el mismo contador
+        Producto.objects.filter(id=producto.id).update(nombre="Pino Otro Proceso")
+        VersionDatos.objects.filter(clave='catalogo:Madera').update(version=F('version') + 1)
+        response, _ = consultas_productos({'categoria': 'Madera'})
+        print(f"  → Nombre mostrado: {response.context['productos'][0].nombre}")
+        self.assertEqual(response.context['productos'][0].nombre, "Pino Otro Proceso")
+
+        print("\n• Un producto que cambia de categoría sin señal descarta la copia...")
+        Producto.objects.filter(id=producto.id).update(categoria="Otros")
+        response, _ = consultas_productos({'categoria': 'Madera'})
+        self.assertEqual(list(response.context['productos']), [])
+
+        print("\n• Editar un producto también invalida la copia...")
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.refresh_from_db()
+            producto.nombre = "Pino Renombrado"
+            producto.save()
+        response, _ = consultas_productos({'categoria': 'Otros', 'cepillado': 'false'})
+        self.assertEqual([p.nombre for p in response.context['productos']], ["Pino Renombrado"])
+        print("-"*50)
+
+    def test_autocompletar_productos(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        print("\n" + "="*50)
+        print("TEST: AUTOCOMPLETAR PRODUCTOS")
+        print("="*50)
+        for i in range(30):
+            Producto.objects.create(nombre=f"Pino {i:02d}", categoria="Madera", precio=Decimal("1000"), stock=i)
+        Producto.objects.create(nombre="Plancha OSB", categoria="Planchas", precio=Decimal("9000"), stock=4)
+        url = reverse('inventario:autocompletar_productos')
+
+        print("• Sin texto: primeros por nombre...")
+        productos = self.client.get(url).json()['productos']
+        print(f"  → Resultados: {len(productos)}, primero: {productos[0]}")
+        self.assertEqual(len(productos), 20)
+        self.assertEqual(productos[0], {'id': productos[0]['id'], 'nombre': 'Pino 00', 'precio': '1000', 'stock': 0})
+
+        print("\n• Con texto, categoría y límite...")
+        productos = self.client.get(url, {'q': 'osb'}).json()['productos']
+        self.assertEqual([p['nombre'] for p in productos], ["Plancha OSB"])
+        productos = self.client.get(url, {'q': 'p', 'categoria': 'Planchas'}).json()['productos']
+        self.assertEqual([p['nombre'] for p in productos], ["Plancha OSB"])
+        productos = self.client.get(url, {'q': 'pino', 'limite': '5'}).json()['productos']
+        print(f"  → 'pino' con límite 5: {[p['nombre'] for p in productos]}")
+        self.assertEqual(len(productos), 5)
+
+        print("\n• El mismo término se responde desde la caché...")
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(url, {'q': 'Pino', 'limite': '5'})
+        consultas_producto = [c for c in consultas if 'inventario_producto' in c['sql']]
+        print(f"  → Consultas a productos: {len(consultas_producto)}")
+        # Solo precio y stock actuales de los ids guardados, sin la búsqueda
+        self.assertEqual(len(consultas_producto), 1)
+        self.assertNotIn('MATCH', consultas_producto[0]['sql'])
+
+        print("\n• La pantalla de venta ya no trae el catálogo...")
+        response = self.client.get(reverse('ventas:registrar_venta'))
+        self.assertNotContains(response, "Pino 00")
+        self.assertContains(response, url)
+        print("-"*50)
+
+    def test_editar_umbrales_con_formset_y_regla(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        print("\n" + "="*50)
+        print("TEST: EDITAR UMBRALES CON FORMSET Y REGLA POR CATEGORÍA")
+        print("="*50)
+        for i in range(3):
+            Producto.objects.create(
+                nombre=f"Pino {i}", categoria="Madera", precio=Decimal("1000"), stock=5,
+                umbral_stock_invierno=1, umbral_stock_verano=1
+            )
+        plancha = Producto.objects.create(
+            nombre="Plancha OSB", categoria="Planchas", precio=Decimal("9000"), stock=5,
+            umbral_stock_invierno=1, umbral_stock_verano=1
+        )
+        url = reverse('inventario:editar-umbrales-de-stock')
+
+        print("• Cargando la página del formset...")
+        response = self.client.get(url)
+        formset = response.context['formset']
+        print(f"  → Formularios en la página: {len(formset.forms)}")
+        self.assertEqual(len(formset.forms), 4)
+        self.assertContains(response, 'name="form-TOTAL_FORMS"')
+
+        print("\n• Cambiando solo una fila...")
+        datos = {
+            'form-TOTAL_FORMS': '4',
+            'form-INITIAL_FORMS': '4',
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+        }
+        for i, form in enumerate(formset.forms):
+            producto = form.instance
+            datos[f'form-{i}-id'] = producto.id
+            datos[f'form-{i}-umbral_stock_invierno'] = 10 if producto == plancha else 1
+            datos[f'form-{i}-umbral_stock_verano'] = 10 if producto == plancha else 1
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, datos)
+        updates = [c['sql'] for c in consultas if c['sql'].startswith('UPDATE "inventario_producto"')]
+        print(f"  → Respuesta: {response.status_code}, UPDATE a productos: {len(updates)}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(updates), 1)
+        plancha.refresh_from_db()
+        self.assertEqual((plancha.umbral_stock_invierno, plancha.umbral_stock_verano), (10, 10))
+        self.assertTrue(StockAlerta.objects.filter(producto=plancha).exists())
+        self.assertFalse(StockAlerta.objects.filter(producto__categoria="Madera").exists())
+
+        print("\n• Aplicando la regla a la categoría Madera...")
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {
+                'aplicar_regla': '1',
+                'categoria': 'Madera',
+                'umbral_stock_invierno': '20',
+                'umbral_stock_verano': '20',
+            })
+        updates = [c['sql'] for c in consultas if c['sql'].startswith('UPDATE "inventario_producto"')]
+        print(f"  → Respuesta: {response.status_code}, UPDATE a productos: {len(updates)}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            set(Producto.objects.filter(categoria="Madera").values_list('umbral_stock_invierno', 'umbral_stock_verano')),
+            {(20, 20)}
+        )
+        plancha.refresh_from_db()
+        self.assertEqual(plancha.umbral_stock_invierno, 10)
+        print(f"  → Alertas de Madera: {StockAlerta.objects.filter(producto__categoria='Madera').count()}")
+        self.assertEqual(StockAlerta.objects.filter(producto__categoria="Madera").count(), 3)
+
+        print("\n• La regla exige al menos un umbral...")
+        response = self.client.post(url, {'aplicar_regla': '1', 'categoria': 'Madera'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['regla_form'].errors)
+        print("-"*50)
+
+    def test_importar_productos_csv(self):
+        import os
+        import tempfile
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from . import catalogo
+        print("\n" + "="*50)
+        print("TEST: IMPORTAR PRODUCTOS DESDE CSV")
+        print("="*50)
+        existente = Producto.objects.create(
+            nombre="Pino 2x4", categoria="Madera", precio=Decimal("1000"), stock=50,
+            umbral_stock_invierno=10, umbral_stock_verano=10, largo=3.2
+        )
+        contenido = (
+            "Nombre;Categoría;Precio;Stock;Umbral Stock Invierno;Umbral Stock Verano;Proveedor\n"
+            "Pino 2x4;madera;1200;3;10;10;Aserradero Sur\n"
+            "Plancha OSB;Planchas;9000;40;5;5;Aserradero Sur\n"
+            ";Madera;500;1;1;1;\n"
+            "Tornillo;Otros;abc;10;1;1;\n"
+            "Clavo;Ferreteria;100;10;1;1;\n"
+            "\n"
+            "Plancha OSB;Planchas;9500;40;5;5;Aserradero Sur\n"
+        )
+
+        print("• Importando por comando...")
+        version = catalogo.version()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        salida, errores = StringIO(), StringIO()
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('importar_productos', archivo.name, '--lote', '2', stdout=salida, stderr=errores)
+        finally:
+            os.unlink(archivo.name)
+        print(f"  → {salida.getvalue().strip()}")
+        print(f"  → Errores:\n{errores.getvalue().rstrip()}")
+        self.assertIn("6 fila(s)", salida.getvalue())
+        self.assertIn("1 creado(s), 2 actualizado(s), 3 con error", salida.getvalue())
+        self.assertIn("Columnas ignoradas: proveedor", salida.getvalue())
+        self.assertIn("Fila 4: nombre:", errores.getvalue())
+        self.assertIn("Fila 5: precio:", errores.getvalue())
+        self.assertIn("Fila 6: categoria:", errores.getvalue())
+
+        print("\n• Verificando productos...")
+        existente.refresh_from_db()
+        print(f"  → {existente.nombre}: precio {existente.precio}, stock {existente.stock}, largo {existente.largo}")
+        self.assertEqual((existente.precio, existente.stock, existente.largo), (Decimal("1200"), 3, 3.2))
+        plancha = Producto.objects.get(nombre="Plancha OSB")
+        self.assertEqual(plancha.precio, Decimal("9500"))
+        self.assertEqual(Producto.objects.count(), 2)
+
+        print("\n• El stock importado queda como movimiento...")
+        movimientos = {m.producto_id: m.cantidad for m in MovimientoStock.objects.all()}
+        print(f"  → Movimientos: {movimientos}")
+        self.assertEqual(movimientos, {existente.id: -47, plancha.id: 40})
+
+        print("\n• Alertas, búsqueda y caché al día sin post_save...")
+        self.assertTrue(StockAlerta.objects.filter(producto=existente).exists())
+        self.assertFalse(StockAlerta.objects.filter(producto=plancha).exists())
+        self.assertEqual(list(buscar_productos(Producto.objects.all(), "osb")), [plancha])
+        self.assertGreater(catalogo.version(), version)
+
+        print("\n• Encabezados incompletos...")
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write("nombre,stock\nPino,1\n")
+        try:
+            with self.assertRaisesMessage(CommandError, "Faltan columnas obligatorias: categoria, precio"):
+                call_command('importar_productos', archivo.name, stdout=StringIO())
+        finally:
+            os.unlink(archivo.name)
+
+        print("\n• Importando desde la vista...")
+        url = reverse('inventario:importar_productos')
+        subido = SimpleUploadedFile("catalogo.csv", "nombre,categoria,precio\nListón,Madera,800\n".encode())
+        response = self.client.post(url, {'archivo': subido})
+        resultado = response.context['resultado']
+        print(f"  → Status: {response.status_code}, creados: {resultado.creados}, {resultado.filas_por_segundo:.0f} filas/s")
+        self.assertEqual(resultado.creados, 1)
+        liston = Producto.objects.get(nombre="Listón")
+        print(f"  → Sin columnas de umbral: {liston.umbral_stock_invierno}/{liston.umbral_stock_verano}, como en registrar_producto")
+        self.assertEqual((liston.stock, liston.umbral_stock_invierno, liston.umbral_stock_verano), (0, 0, 0))
+        subido = SimpleUploadedFile("catalogo.txt", b"nombre,categoria,precio\n")
+        response = self.client.post(url, {'archivo': subido})
+        self.assertIsNone(response.context['resultado'])
+        self.assertContains(response, "Formato no soportado")
+        print("-"*50)
+
+    def test_importar_productos_xlsx(self):
+        import openpyxl
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        print("\n" + "="*50)
+        print("TEST: IMPORTAR PRODUCTOS DESDE XLSX")
+        print("="*50)
+        existente = Producto.objects.create(nombre="Pino 2x4", categoria="Madera", precio=Decimal("1000"), stock=50)
+
+        print("• Generando el archivo con celdas numéricas y vacías...")
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(["Nombre", "Categoría", "Precio", "Largo", "Especial"])
+        hoja.append(["Pino 2x4", "madera", 1200.0, 3.2, None])
+        hoja.append(["Plancha OSB", "Planchas", 9000, None, "sí"])
+        hoja.append([None, None, None, None, None])
+        hoja.append(["Tornillo", "Otros", "abc", None, None])
+        contenido = BytesIO()
+        libro.save(contenido)
+
+        print("\n• Importando desde la vista...")
+        subido = SimpleUploadedFile("catalogo.xlsx", contenido.getvalue())
+        response = self.client.post(reverse('inventario:importar_productos'), {'archivo': subido})
+        resultado = response.context['resultado']
+        print(f"  → Leídas: {resultado.leidas}, creados: {resultado.creados}, "
+              f"actualizados: {resultado.actualizados}, errores: {resultado.errores}")
+        self.assertEqual((resultado.leidas, resultado.creados, resultado.actualizados), (3, 1, 1))
+        self.assertEqual([numero for numero, _ in resultado.errores], [5])
+
+        existente.refresh_from_db()
+        self.assertEqual((existente.precio, existente.largo), (Decimal("1200"), 3.2))
+        plancha = Producto.objects.get(nombre="Plancha OSB")
+        print(f"  → {plancha.nombre}: precio {plancha.precio}, especial {plancha.especial}")
+        self.assertEqual(plancha.precio, Decimal("9000"))
+        self.assertTrue(plancha.especial)
+
+        print("\n• Un archivo que no es XLSX...")
+        subido = SimpleUploadedFile("catalogo.xlsx", b"nombre,categoria,precio\n")
+        response = self.client.post(reverse('inventario:importar_productos'), {'archivo': subido})
+        self.assertContains(response, "No se pudo leer el archivo XLSX")
+        print("-"*50)
+
+    def test_triggers_de_busqueda_se_recrean_al_migrar(self):
+        from django.db import connection
+        from .busqueda import TABLA_FTS, faltantes
+        print("\n" + "="*50)
+        print("TEST: TRIGGERS DE BÚSQUEDA TRAS UNA MIGRACIÓN")
+        print("="*50)
+        print("• Simulando una migración que reconstruye la tabla (sin triggers)...")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {TABLA_FTS}_insertar")
+        Producto.objects.create(nombre="Pino Sin Indexar", categoria="Madera", precio=Decimal("1000"), stock=1)
+        print(f"  → Triggers faltantes: {faltantes()}")
+        self.assertEqual(faltantes(), [f'{TABLA_FTS}_insertar'])
+        self.assertEqual(list(buscar_productos(Producto.objects.all(), "pino")), [])
+
+        avisos = checks.run_checks(tags=[checks.Tags.database], databases=['default'])
+        print(f"  → Checks: {[aviso.id for aviso in avisos]}")
+        self.assertIn('inventario.W001', [aviso.id for aviso in avisos])
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_busqueda_productos', '--solo-verificar', stdout=StringIO())
+
+        print("\n• Al terminar migrate se recrean y se reindexa...")
+        call_command('migrate', verbosity=0)
+        self.assertEqual(faltantes(), [])
+        self.assertEqual(
+            [p.nombre for p in buscar_productos(Producto.objects.all(), "pino")], ["Pino Sin Indexar"]
+        )
+        call_command('reconstruir_busqueda_productos', '--solo-verificar', stdout=StringIO())
+        print("-"*50)
+
     def tearDown(self):
         # Limpieza después de cada prueba
         Producto.objects.all().delete()
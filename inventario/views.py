@@ -1,16 +1,27 @@
 # inventario/views.py
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.http import JsonResponse
+from django.core.paginator import Paginator
 from django.db import transaction  # Añade esta importación
 from django.utils.timezone import now  # Añade esta importación
-from .models import Producto, MovimientoStock
-from .forms import ProductoForm, MovimientoStockForm, SeteoStockForm  # Añade SeteoStockForm aquí
-from .forms import UmbralStockForm
-from django.forms import modelformset_factory
+from django.utils import timezone
+from datetime import timedelta
+from .models import Producto, MovimientoStock, StockAlerta
+from .alertas import estacion_del_mes
+from .busqueda import buscar_productos
+from . import catalogo
+from .forms import ProductoForm, SeteoStockForm
+from .forms import UmbralStockFormSet, UmbralesPorCategoriaForm, ImportarProductosForm
+from . import importacion
+from reportes.hechos import resumen_periodo
 
 
 def base_view(request):
-    return render(request, 'inventario/index.html')
+    # Resumen de los últimos 30 días desde los hechos diarios de reportes
+    hoy = timezone.localdate()
+    resumen = resumen_periodo(hoy - timedelta(days=29), hoy)
+    return render(request, 'inventario/index.html', {'resumen': resumen})
 
 # 1. Registrar un producto
 def registrar_producto(request):
@@ -42,19 +53,12 @@ def registrar_producto(request):
 
 # 2. Actualizar stock
 def seleccionar_producto_actualizar(request):
-    productos = Producto.objects.all()
-
-    # Filtros opcionales
-    categoria = request.GET.get('categoria')
-    nombre = request.GET.get('nombre')
-    cepillado = request.GET.get('cepillado')
-
-    if categoria:
-        productos = productos.filter(categoria=categoria)
-    if nombre:
-        productos = productos.filter(nombre__icontains=nombre)
-    if cepillado:
-        productos = productos.filter(cepillado=(cepillado == 'true'))
+    # Filtros opcionales (sin texto de búsqueda se lee la caché del catálogo)
+    productos = catalogo.listar(
+        request.GET.get('categoria'),
+        request.GET.get('nombre'),
+        request.GET.get('cepillado')
+    )
 
     return render(request, 'inventario/seleccionar_producto_actualizar.html', {'productos': productos})
 
@@ -81,7 +85,7 @@ def actualizar_stock(request, producto_id):
                     
                     # Actualizamos el stock
                     producto.stock = nuevo_stock
-                    producto.save()
+                    producto.save(update_fields=['stock'])
                     
                     messages.success(
                         request, 
@@ -117,89 +121,66 @@ def actualizar_stock(request, producto_id):
 
 
 # 3. Generar alerta de stock.
+ALERTAS_POR_PAGINA = 50
+
+CSS_POR_NIVEL = {
+    'normal': 'row-normal',        # gris
+    'advertencia': 'row-warning',  # naranjo
+    'bajo': 'row-low',             # rojo
+    'critico': 'row-critical',     # rojo fuerte
+}
+
 def generar_alerta_stock(request):
     from django.utils import timezone
 
     # Determinar el mes actual
-    mes_actual = timezone.now().month
+    mes_actual = timezone.localtime().month
 
-    # Chile, simplificado a 2 estaciones:
-    # Verano = dic–may   (verano + otoño)
-    # Invierno = jun–nov (invierno + primavera)
-    meses_verano = [12, 1, 2, 3, 4, 5]     # Diciembre → Mayo
-    meses_invierno = [6, 7, 8, 9, 10, 11]  # Junio → Noviembre
+    estacion = estacion_del_mes(mes_actual)
 
     # Estación actual como texto
-    if mes_actual in meses_verano:
-        estacion_actual = 'Verano'
-    else:
-        estacion_actual = 'Invierno'
-
-    productos_bajo_stock = []
-
-    for producto in Producto.objects.all():
-        # Elegir el umbral correcto según la estación
-        if mes_actual in meses_verano:
-            umbral = producto.umbral_stock_verano
-        else:
-            umbral = producto.umbral_stock_invierno
-
-        # Si no hay umbral configurado, se ignora ese producto
-        if not umbral or umbral <= 0:
-            continue
-
-        # Porcentaje de stock respecto al umbral
-        #   ratio = 1.0  → 100% del umbral
-        #   ratio = 0.5  →  50% del umbral
-        ratio = producto.stock / umbral
-
-        # Solo mostramos productos cuyo stock está en o por debajo de 105% del umbral
-        # (pre-alerta para avisar que se está acercando).
-        if ratio <= 1.05:
-            # 4 niveles:
-            #  > 75% a 105%  → gris       (row-normal)
-            #  > 50% a 75%   → naranjo    (row-warning)
-            #  > 25% a 50%   → rojo       (row-low)
-            #  ≤ 25%         → rojo fuerte(row-critical)
-            if ratio > 0.75:
-                nivel = 'normal'
-                css_class = 'row-normal'
-            elif ratio > 0.5:
-                nivel = 'advertencia'
-                css_class = 'row-warning'
-            elif ratio > 0.25:
-                nivel = 'bajo'
-                css_class = 'row-low'
-            else:
-                nivel = 'critico'
-                css_class = 'row-critical'
-
-            productos_bajo_stock.append({
-                'producto': producto,
-                'stock_actual': producto.stock,
-                'umbral': umbral,
-                'umbral_invierno': producto.umbral_stock_invierno,
-                'umbral_verano': producto.umbral_stock_verano,
-                'ratio': round(ratio * 100, 1),  # porcentaje para mostrar si quieres
-                'nivel': nivel,
-                'css_class': css_class,
-            })
+    estacion_actual = estacion.capitalize()
 
-    # Ordenar por % del umbral (más crítico primero)
-    productos_bajo_stock.sort(key=lambda x: x['ratio'])
+    # Se lee del índice materializado StockAlerta (solo contiene productos
+    # en alerta), ya ordenado por el ratio de la estación actual.
+    campo_ratio = f'ratio_{estacion}'
+    alertas = StockAlerta.objects.filter(
+        **{f'{campo_ratio}__isnull': False}
+    ).select_related('producto').order_by(campo_ratio, 'producto_id')
+    paginator = Paginator(alertas, ALERTAS_POR_PAGINA)
+    page_obj = paginator.get_page(request.GET.get('page'))
 
+    productos_bajo_stock = []
+    for alerta in page_obj:
+        producto = alerta.producto
+        nivel = getattr(alerta, f'nivel_{estacion}')
+        productos_bajo_stock.append({
+            'producto': producto,
+            'stock_actual': producto.stock,
+            'umbral': getattr(producto, f'umbral_stock_{estacion}'),
+            'umbral_invierno': producto.umbral_stock_invierno,
+            'umbral_verano': producto.umbral_stock_verano,
+            'ratio': round(getattr(alerta, campo_ratio) * 100, 1),  # porcentaje para mostrar
+            'nivel': nivel,
+            'css_class': CSS_POR_NIVEL[nivel],
+        })
 
     context = {
         'productos_bajo_stock': productos_bajo_stock,
-        'total_alertas': len(productos_bajo_stock),
+        'total_alertas': paginator.count,
+        # Con umbral 0 no hay alerta posible: se informa cuántos son
+        'productos_sin_umbral': Producto.objects.sin_umbral(mes_actual).count(),
         'estacion_actual': estacion_actual,
+        'page_obj': page_obj,
     }
 
     return render(request, 'inventario/alerta_stock.html', context)
 
 # 4. Editar umbrales de stock.
+UMBRALES_POR_PAGINA = 50
+
 def editar_umbrales_stock(request):
-    productos = Producto.objects.all()
+    productos = Producto.objects.order_by('id')
     
     # Filtros
     categoria = request.GET.get('categoria')
@@ -208,47 +189,60 @@ def editar_umbrales_stock(request):
     if categoria:
         productos = productos.filter(categoria=categoria)
     if nombre:
-        productos = productos.filter(nombre__icontains=nombre)
-    
+        productos = buscar_productos(productos, nombre)
+
+    paginator = Paginator(productos, UMBRALES_POR_PAGINA)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    formset = UmbralStockFormSet(queryset=page_obj.object_list)
+    regla_form = UmbralesPorCategoriaForm(initial={'categoria': categoria or ''})
+
     if request.method == 'POST':
-        alguno_guardado = False
-        for producto in productos:
-            form = UmbralStockForm(request.POST, instance=producto, prefix=str(producto.id))
-            if form.is_valid():
-                form.save()
-                alguno_guardado = True
-            else:
-                messages.error(request, "Error al guardar los umbrales")
-                return redirect('inventario:editar-umbrales-de-stock')
-        
-        if alguno_guardado:
-            # Usar variable de sesión
-            request.session['mostrar_mensaje'] = True
-        
-        return redirect('inventario:editar-umbrales-de-stock')
+        if 'aplicar_regla' in request.POST:
+            # Acción masiva: un solo UPDATE para toda la categoría
+            regla_form = UmbralesPorCategoriaForm(request.POST)
+            if regla_form.is_valid():
+                afectados = Producto.objects.all()
+                if regla_form.cleaned_data['categoria']:
+                    afectados = afectados.filter(categoria=regla_form.cleaned_data['categoria'])
+                afectados.fijar_umbrales(
+                    invierno=regla_form.cleaned_data['umbral_stock_invierno'],
+                    verano=regla_form.cleaned_data['umbral_stock_verano']
+                )
+                request.session['mostrar_mensaje'] = True
+                return redirect(request.get_full_path())
+        else:
+            # Solo se escriben las filas de la página que cambiaron
+            formset = UmbralStockFormSet(request.POST, queryset=page_obj.object_list)
+            if formset.is_valid():
+                cambiados = formset.save(commit=False)
+                if cambiados:
+                    Producto.objects.actualizar_umbrales(cambiados)
+                    # Usar variable de sesión
+                    request.session['mostrar_mensaje'] = True
+                return redirect(request.get_full_path())
+            messages.error(request, "Error al guardar los umbrales")
     
     # Verificar y limpiar la variable de sesión
     mostrar_mensaje = request.session.pop('mostrar_mensaje', False)
     
-    formset = [UmbralStockForm(instance=producto, prefix=str(producto.id)) for producto in productos]
-    
     return render(request, 'inventario/editar_umbrales_stock.html', {
         'formset': formset,
-        'productos': productos,
+        'regla_form': regla_form,
+        'page_obj': page_obj,
         'mostrar_mensaje': mostrar_mensaje
     })
 
 
 # 4. Registrar procesos adicionales (cepillado).
 def seleccionar_producto_para_cepillar(request):
-    productos = Producto.objects.filter(categoria='Madera')
     categoria = request.GET.get('categoria', '')
     nombre = request.GET.get('nombre', '')
 
-    if categoria:
-        productos = productos.filter(categoria=categoria)
-    if nombre:
-        productos = productos.filter(nombre__icontains=nombre)
+    # Solo se cepilla madera
+    productos = catalogo.listar('Madera', nombre)
+    if categoria and categoria != 'Madera':
+        productos = []
 
     # Obtener mensaje de la sesión
     mensaje_exito = request.session.pop('mensaje_exito', None)
@@ -277,8 +271,9 @@ def registrar_proceso_cepillado(request, producto_id):
             
             if nuevo_stock_original == 0:
                 producto.cepillado = True
-            
-            producto.save()
+                producto.save()
+            else:
+                producto.save(update_fields=['stock'])
             
             nombre_cepillado = f"{producto.nombre} CEPI"
             
@@ -296,7 +291,7 @@ def registrar_proceso_cepillado(request, producto_id):
             )
             
             producto_cepillado.stock += cantidad_cepillar
-            producto_cepillado.save()
+            producto_cepillado.save(update_fields=['stock'])
             
             request.session['mensaje_exito'] = f'Se han cepillado {cantidad_cepillar} unidades exitosamente'
             messages.success(request, f'Se han cepillado {cantidad_cepillar} unidades exitosamente')
@@ -310,24 +305,17 @@ def registrar_proceso_cepillado(request, producto_id):
 # 5. Visualizar y filtrar productos.
 
 def lista_productos(request):
-    productos = Producto.objects.all()
-    
     # Recuperar mensaje de la sesión
     mensaje_exito = request.session.pop('mensaje_exito', None)
     if mensaje_exito:
         messages.success(request, mensaje_exito)
     
-    # Filtros
-    categoria = request.GET.get('categoria')
-    nombre = request.GET.get('nombre')
-    cepillado = request.GET.get('cepillado')
-
-    if categoria:
-        productos = productos.filter(categoria=categoria)
-    if nombre:
-        productos = productos.filter(nombre__icontains=nombre)
-    if cepillado:
-        productos = productos.filter(cepillado=(cepillado == 'true'))
+    # Filtros (sin texto de búsqueda se lee la caché del catálogo)
+    productos = catalogo.listar(
+        request.GET.get('categoria'),
+        request.GET.get('nombre'),
+        request.GET.get('cepillado')
+    )
 
     return render(request, 'inventario/lista_productos.html', {'productos': productos})
 
@@ -352,3 +340,41 @@ def registrar_producto_especial(request):
 
 
 
+
+
+# 7. Autocompletar productos (pantallas de venta y compra).
+def autocompletar_productos(request):
+    try:
+        limite = int(request.GET.get('limite', catalogo.RESULTADOS_AUTOCOMPLETAR))
+    except ValueError:
+        limite = catalogo.RESULTADOS_AUTOCOMPLETAR
+    return JsonResponse({
+        'productos': catalogo.autocompletar(request.GET.get('q', ''), request.GET.get('categoria', ''), limite)
+    })
+
+
+# 8. Importar productos desde CSV o XLSX.
+def importar_productos(request):
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarProductosForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                # Se lee en streaming desde el archivo subido, por lotes
+                columnas, filas = importacion.abrir_archivo(archivo.file, archivo.name)
+                resultado = importacion.importar_productos(columnas, filas)
+            except importacion.ErrorImportacion as error:
+                messages.error(request, str(error))
+            else:
+                if resultado.con_error:
+                    messages.warning(request, f'{resultado.con_error} fila(s) no se importaron')
+                else:
+                    messages.success(request, 'Productos importados con éxito')
+    else:
+        form = ImportarProductosForm()
+
+    return render(request, 'inventario/importar_productos.html', {
+        'form': form,
+        'resultado': resultado,
+    })
@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import SystemMessage
+from .models import SystemMessage, ResumenMensajes
 
 @admin.register(SystemMessage)
 class SystemMessageAdmin(admin.ModelAdmin):
     list_display = ['timestamp', 'app', 'colored_message', 'level', 'user', 'ip_address', 'viewed']
     list_filter = ['app', 'level', 'viewed', 'timestamp']
-    search_fields = ['message', 'user__username']
+    # Usuario está en otra base de datos: no se puede buscar por sus campos
+    search_fields = ['message']
     readonly_fields = ['timestamp', 'ip_address']
     
     def has_add_permission(self, request):
@@ -17,4 +18,15 @@ class SystemMessageAdmin(admin.ModelAdmin):
     def changelist_view(self, request, extra_context=None):
         if not request.GET.get('unread'):
             SystemMessage.objects.filter(viewed=False).update(viewed=True)
-        return super().changelist_view(request, extra_context)
\ No newline at end of file
+        return super().changelist_view(request, extra_context)
+
+@admin.register(ResumenMensajes)
+class ResumenMensajesAdmin(admin.ModelAdmin):
+    list_display = ['hora', 'app', 'level', 'cantidad']
+    list_filter = ['app', 'level']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,163 @@
+"""
+Escritura agrupada de SystemMessage.
+
+Durante una petición los mensajes se acumulan en memoria y se guardan con un
+solo bulk_create al terminar (lo hace SystemMessageMiddleware). Fuera de una
+petición se guardan de inmediato.
+
+Con settings.LOGGER_BUFFER['MODO'] = 'hilo' los mensajes se entregan a un
+hilo en segundo plano, que los guarda al juntar TAMANO_MAXIMO mensajes, al
+pasar INTERVALO segundos o al cerrar el proceso.
+
+El timestamp se fija al registrar el mensaje, no al guardarlo, y el orden
+de inserción es el orden de registro.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import SystemMessage
+from . import stream
+
+log = logging.getLogger(__name__)
+
+CONFIGURACION_POR_DEFECTO = {
+    'MODO': 'peticion',     # 'peticion' o 'hilo'
+    'TAMANO_MAXIMO': 100,   # mensajes por bulk_create en modo hilo
+    'INTERVALO': 2.0,       # segundos máximos de espera en modo hilo
+}
+
+_pendientes = contextvars.ContextVar('logger_mensajes_pendientes', default=None)
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'LOGGER_BUFFER', {})}
+
+
+def registrar(message, level='info', app='sistema', user=None, ip_address=None):
+    """Registra un SystemMessage; se guarda al vaciar el buffer."""
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    mensaje = SystemMessage(
+        message=message,
+        level=level,
+        app=app,
+        user=user,
+        ip_address=ip_address,
+        timestamp=timezone.now(),
+    )
+    pendientes = _pendientes.get()
+    if pendientes is not None:
+        pendientes.append(mensaje)
+    else:
+        _guardar([mensaje])
+    return mensaje
+
+
+def iniciar():
+    """Empieza a acumular los mensajes del contexto actual (una petición)."""
+    return _pendientes.set([])
+
+
+def vaciar(token=None):
+    """Guarda los mensajes acumulados y, si se pasa el token, termina el contexto."""
+    pendientes = _pendientes.get()
+    if token is not None:
+        _pendientes.reset(token)
+    elif pendientes is not None:
+        _pendientes.set([])
+    if pendientes:
+        _guardar(pendientes)
+
+
+def descartar(token):
+    """Termina el contexto de iniciar() sin guardar sus mensajes (benchmarks)."""
+    _pendientes.reset(token)
+
+
+def _guardar(mensajes):
+    if configuracion()['MODO'] == 'hilo':
+        _escritor().encolar(mensajes)
+    else:
+        SystemMessage.objects.bulk_create(mensajes)
+        stream.notificar()
+
+
+class EscritorEnSegundoPlano:
+    """Hilo que guarda los mensajes por lotes según tamaño y tiempo."""
+
+    def __init__(self, tamano_maximo, intervalo):
+        self.tamano_maximo = tamano_maximo
+        self.intervalo = intervalo
+        self.cola = queue.Queue()
+        self.hilo = threading.Thread(target=self._ejecutar, name='logger-escritor', daemon=True)
+        self.hilo.start()
+
+    def encolar(self, mensajes):
+        for mensaje in mensajes:
+            self.cola.put(mensaje)
+
+    def detener(self):
+        """Guarda lo pendiente y termina el hilo."""
+        self.cola.put(None)
+        self.hilo.join()
+
+    def _ejecutar(self):
+        lote = []
+        limite = None
+        activo = True
+        while activo:
+            espera = self.intervalo if limite is None else max(0, limite - time.monotonic())
+            try:
+                mensaje = self.cola.get(timeout=espera)
+                if mensaje is None:
+                    activo = False
+                else:
+                    if not lote:
+                        limite = time.monotonic() + self.intervalo
+                    lote.append(mensaje)
+                    if len(lote) < self.tamano_maximo and time.monotonic() < limite:
+                        continue
+            except queue.Empty:
+                pass
+            if lote:
+                try:
+                    SystemMessage.objects.bulk_create(lote)
+                    stream.notificar()
+                except Exception:
+                    # Un fallo al guardar no debe detener el hilo
+                    log.exception('No se pudieron guardar %d mensajes del sistema', len(lote))
+                finally:
+                    lote = []
+                    limite = None
+                    close_old_connections()
+
+
+_escritor_actual = None
+_bloqueo_escritor = threading.Lock()
+
+
+def _escritor():
+    global _escritor_actual
+    with _bloqueo_escritor:
+        if _escritor_actual is None:
+            config = configuracion()
+            _escritor_actual = EscritorEnSegundoPlano(config['TAMANO_MAXIMO'], config['INTERVALO'])
+            atexit.register(detener_escritor)
+        return _escritor_actual
+
+
+def detener_escritor():
+    """Vacía y detiene el hilo en segundo plano, si está corriendo."""
+    global _escritor_actual
+    with _bloqueo_escritor:
+        escritor, _escritor_actual = _escritor_actual, None
+    if escritor is not None:
+        escritor.detener()
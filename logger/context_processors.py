@@ -0,0 +1,9 @@
+from django.core.handlers.asgi import ASGIRequest
+
+
+def stream_logs(request):
+    """
+    stream_logs_disponible: el stream SSE (views.stream_logs) solo funciona
+    bajo ASGI; con WSGI las plantillas usan solo la consulta a get_logs.
+    """
+    return {'stream_logs_disponible': isinstance(request, ASGIRequest)}
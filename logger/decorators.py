@@ -1,5 +1,5 @@
 from functools import wraps
-from .models import SystemMessage
+from . import buffer
 
 def log_action(app_name):
     def decorator(view_func):
@@ -10,7 +10,7 @@ def log_action(app_name):
                 
                 # Capturar la acción realizada
                 action_message = f"Acción realizada en {app_name}: {request.method} {request.path}"
-                SystemMessage.objects.create(
+                buffer.registrar(
                     message=action_message,
                     level='info',
                     app=app_name,
@@ -23,7 +23,7 @@ def log_action(app_name):
             except Exception as e:
                 # Registrar errores
                 error_message = f"Error en {app_name}: {str(e)}"
-                SystemMessage.objects.create(
+                buffer.registrar(
                     message=error_message,
                     level='error',
                     app=app_name,
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from logger import buffer
+from logger.retencion import purgar
+
+
+class Command(BaseCommand):
+    help = 'Resume por hora y elimina los mensajes del sistema que superan su plazo de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Mensajes eliminados por transacción')
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo cuenta los mensajes que se eliminarían',
+        )
+
+    def handle(self, *args, **options):
+        if options['simular']:
+            resultado = purgar(simular=True)
+            self.stdout.write(f"{resultado['eliminados']} mensaje(s) vencido(s)")
+            return
+
+        def al_avanzar(eliminados, segundos):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {eliminados} eliminados ({segundos:.1f} s)')
+
+        resultado = purgar(lote=options['lote'], al_avanzar=al_avanzar)
+        segundos = resultado['segundos']
+        por_segundo = resultado['eliminados'] / segundos if segundos else 0
+        resumen = (
+            f"Purga de mensajes: {resultado['eliminados']} eliminados en {resultado['lotes']} lote(s), "
+            f"{segundos:.2f} s ({por_segundo:.0f} mensajes/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(resumen))
+        if resultado['eliminados']:
+            buffer.registrar(resumen, level='info', app='sistema')
@@ -1,28 +1,33 @@
 from django.contrib import messages
-from .models import SystemMessage
+from . import buffer
 
 class SystemMessageMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Capturar mensajes de Django
-        storage = messages.get_messages(request)
-        for message in storage:
-            level = message.tags if message.tags else 'info'
-            SystemMessage.objects.create(
-                message=str(message),
-                level=level
-            )
-        
+        # Los mensajes de la petición se acumulan y se guardan juntos al final
+        token = buffer.iniciar()
+        try:
+            response = self.get_response(request)
+
+            # Capturar mensajes de Django
+            storage = messages.get_messages(request)
+            for message in storage:
+                level = message.tags if message.tags else 'info'
+                buffer.registrar(
+                    message=str(message),
+                    level=level
+                )
+        finally:
+            buffer.vaciar(token)
+
         return response
 
     def process_exception(self, request, exception):
         # Capturar excepciones no manejadas
-        SystemMessage.objects.create(
+        buffer.registrar(
             message=str(exception),
             level='error'
         )
-        return None
\ No newline at end of file
+        return None
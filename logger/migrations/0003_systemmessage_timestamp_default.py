@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0002_systemmessage_app_systemmessage_ip_address_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='systemmessage',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Fecha'),
+        ),
+    ]
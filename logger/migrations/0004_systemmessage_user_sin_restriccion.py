@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import connections, migrations, models
+
+
+def copiar_mensajes_existentes(apps, schema_editor):
+    # Al crear la base 'logs' se traen los mensajes que ya estaban en 'default'
+    if schema_editor.connection.alias == 'default':
+        return
+    if 'logger_systemmessage' not in connections['default'].introspection.table_names():
+        return
+    SystemMessage = apps.get_model('logger', 'SystemMessage')
+    lote = []
+    for mensaje in SystemMessage.objects.using('default').order_by('id').iterator(chunk_size=2000):
+        lote.append(mensaje)
+        if len(lote) == 2000:
+            SystemMessage.objects.using(schema_editor.connection.alias).bulk_create(lote)
+            lote = []
+    SystemMessage.objects.using(schema_editor.connection.alias).bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0003_systemmessage_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='systemmessage',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.RunPython(copiar_mensajes_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0004_systemmessage_user_sin_restriccion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemmessage',
+            index=models.Index(fields=['timestamp', 'id'], name='logger_sysmsg_ts_id_idx'),
+        ),
+    ]
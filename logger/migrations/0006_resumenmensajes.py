@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0005_systemmessage_indice_timestamp_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensajes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(verbose_name='Hora')),
+                ('app', models.CharField(max_length=20, verbose_name='Aplicación')),
+                ('level', models.CharField(max_length=20, verbose_name='Nivel')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+            ],
+            options={
+                'verbose_name': 'Resumen de mensajes',
+                'verbose_name_plural': 'Resúmenes de mensajes',
+                'ordering': ['-hora'],
+                'constraints': [models.UniqueConstraint(fields=('hora', 'app', 'level'), name='logger_resumen_hora_app_level_uniq')],
+            },
+        ),
+    ]
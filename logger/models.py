@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.html import format_html
 
 class SystemMessage(models.Model):
@@ -30,14 +31,19 @@ class SystemMessage(models.Model):
         default='sistema',
         verbose_name="Aplicación"
     )
+    # Usuario vive en la base 'default' y este modelo en 'logs': la FK no
+    # lleva restricción y el SET_NULL lo hace la señal de logger.signals
     user = models.ForeignKey(
         'usuario.Usuario',
-        on_delete=models.SET_NULL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         null=True,
         blank=True,
         verbose_name="Usuario"
     )
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+    # Se fija al registrar el mensaje (no al guardarlo) para que los
+    # mensajes guardados por lotes conserven su hora real
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, verbose_name="Fecha")
     viewed = models.BooleanField(default=False, verbose_name="Visto")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
@@ -45,6 +51,10 @@ class SystemMessage(models.Model):
         verbose_name = "Mensaje del Sistema"
         verbose_name_plural = "Mensajes del Sistema"
         ordering = ['-timestamp']
+        indexes = [
+            # Cursor de get_logs: ventana por timestamp y desempate por id
+            models.Index(fields=['timestamp', 'id'], name='logger_sysmsg_ts_id_idx'),
+        ]
 
     def colored_message(self):
         colors = {
@@ -58,4 +68,23 @@ class SystemMessage(models.Model):
             colors[self.level],
             self.message
         )
-    colored_message.short_description = "Mensaje"
\ No newline at end of file
+    colored_message.short_description = "Mensaje"
+
+
+class ResumenMensajes(models.Model):
+    """Conteo por hora, app y nivel de los mensajes ya purgados (ver logger.retencion)."""
+    hora = models.DateTimeField(verbose_name="Hora")
+    app = models.CharField(max_length=20, verbose_name="Aplicación")
+    level = models.CharField(max_length=20, verbose_name="Nivel")
+    cantidad = models.PositiveIntegerField(default=0, verbose_name="Cantidad")
+
+    class Meta:
+        verbose_name = "Resumen de mensajes"
+        verbose_name_plural = "Resúmenes de mensajes"
+        ordering = ['-hora']
+        constraints = [
+            models.UniqueConstraint(fields=['hora', 'app', 'level'], name='logger_resumen_hora_app_level_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.hora:%d/%m/%Y %H:00} {self.app}/{self.level}: {self.cantidad}"
@@ -0,0 +1,119 @@
+"""
+Retención de SystemMessage.
+
+Los mensajes que superan el plazo de su app/nivel se resumen en conteos por
+hora (ResumenMensajes) y se eliminan en lotes. Cada lote es una transacción
+corta, así la base de logs nunca queda bloqueada mucho tiempo.
+
+El plazo se configura en settings.LOGGER_RETENCION. Si un mensaje tiene
+plazo por nivel y por app, se conserva el mayor de los dos.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import SystemMessage, ResumenMensajes
+
+CONFIGURACION_POR_DEFECTO = {
+    'DIAS_POR_DEFECTO': 30,
+    'DIAS_POR_NIVEL': {},
+    'DIAS_POR_APP': {},
+    'LOTE': 1000,
+}
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'LOGGER_RETENCION', {})}
+
+
+def dias_de_retencion(app, level, config=None):
+    config = config or configuracion()
+    plazos = [config['DIAS_POR_DEFECTO']]
+    plazos_especificos = [
+        dias for dias in (config['DIAS_POR_NIVEL'].get(level), config['DIAS_POR_APP'].get(app))
+        if dias is not None
+    ]
+    return max(plazos_especificos or plazos)
+
+
+def condicion_vencidos(ahora=None, config=None):
+    """Q que selecciona los mensajes vencidos según la política."""
+    config = config or configuracion()
+    ahora = ahora or timezone.now()
+    apps = [app for app, _ in SystemMessage.APP_CHOICES]
+    niveles = [level for level, _ in SystemMessage.LEVEL_CHOICES]
+
+    condicion = Q()
+    for app in apps:
+        for level in niveles:
+            limite = ahora - timedelta(days=dias_de_retencion(app, level, config))
+            condicion |= Q(app=app, level=level, timestamp__lt=limite)
+    # Valores fuera de las opciones conocidas usan el plazo por defecto
+    limite = ahora - timedelta(days=config['DIAS_POR_DEFECTO'])
+    condicion |= (~Q(app__in=apps) | ~Q(level__in=niveles)) & Q(timestamp__lt=limite)
+    return condicion
+
+
+def _resumir_y_eliminar(ids):
+    conteos = SystemMessage.objects.filter(id__in=ids).annotate(
+        hora=TruncHour('timestamp')
+    ).values('hora', 'app', 'level').annotate(cantidad=Count('id'))
+
+    existentes = {
+        (resumen.hora, resumen.app, resumen.level): resumen
+        for resumen in ResumenMensajes.objects.filter(
+            hora__in={conteo['hora'] for conteo in conteos}
+        )
+    }
+    nuevos = []
+    actualizados = []
+    for conteo in conteos:
+        clave = (conteo['hora'], conteo['app'], conteo['level'])
+        resumen = existentes.get(clave)
+        if resumen is None:
+            nuevos.append(ResumenMensajes(
+                hora=conteo['hora'], app=conteo['app'], level=conteo['level'], cantidad=conteo['cantidad']
+            ))
+        else:
+            resumen.cantidad += conteo['cantidad']
+            actualizados.append(resumen)
+
+    ResumenMensajes.objects.bulk_create(nuevos)
+    ResumenMensajes.objects.bulk_update(actualizados, ['cantidad'])
+    SystemMessage.objects.filter(id__in=ids).delete()
+
+
+def purgar(lote=None, ahora=None, simular=False, al_avanzar=None):
+    """
+    Resume y elimina los mensajes vencidos en lotes de `lote` filas.
+    Devuelve un dict con 'eliminados', 'lotes' y 'segundos'.
+    Con simular=True solo cuenta lo que se eliminaría.
+    """
+    config = configuracion()
+    lote = lote or config['LOTE']
+    vencidos = SystemMessage.objects.filter(condicion_vencidos(ahora, config))
+
+    inicio = time.monotonic()
+    if simular:
+        return {'eliminados': vencidos.count(), 'lotes': 0, 'segundos': time.monotonic() - inicio}
+
+    base = router.db_for_write(SystemMessage)
+    eliminados = 0
+    lotes = 0
+    while True:
+        with transaction.atomic(using=base):
+            ids = list(vencidos.order_by('timestamp', 'id').values_list('id', flat=True)[:lote])
+            if not ids:
+                break
+            _resumir_y_eliminar(ids)
+        eliminados += len(ids)
+        lotes += 1
+        if al_avanzar:
+            al_avanzar(eliminados, time.monotonic() - inicio)
+
+    return {'eliminados': eliminados, 'lotes': lotes, 'segundos': time.monotonic() - inicio}
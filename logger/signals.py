@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from usuario.models import Usuario
+from .models import SystemMessage
+
+
+@receiver(pre_delete, sender=Usuario)
+def desvincular_mensajes(sender, instance, **kwargs):
+    # Equivale al antiguo on_delete=SET_NULL, que no funciona entre bases
+    SystemMessage.objects.filter(user_id=instance.pk).update(user=None)
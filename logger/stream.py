@@ -0,0 +1,97 @@
+"""
+Difusión de SystemMessage nuevos para el stream SSE (views.stream_logs).
+
+Un solo sondeo por proceso consulta los mensajes con id mayor al último
+visto y los reparte a las conexiones abiertas; el buffer lo despierta en
+cuanto guarda mensajes, así no se espera al siguiente intervalo. Cada
+conexión extra cuesta una cola en memoria, no consultas adicionales.
+"""
+import asyncio
+import threading
+
+from .models import SystemMessage
+
+# Segundos entre sondeos cuando nadie avisa de mensajes nuevos
+INTERVALO_SONDEO = 2.0
+# Mensajes pendientes por conexión antes de cortarla (cliente muy lento)
+MAXIMO_PENDIENTES = 1000
+# Mensajes por consulta de sondeo
+LOTE_SONDEO = 500
+
+_difusores = {}
+_bloqueo = threading.Lock()
+
+
+class Difusor:
+    def __init__(self, loop):
+        self.loop = loop
+        self.suscriptores = set()
+        self.despertar = asyncio.Event()
+        self.tarea = None
+        self.ultimo_id = None
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=MAXIMO_PENDIENTES)
+        self.suscriptores.add(cola)
+        if self.tarea is None or self.tarea.done():
+            self.ultimo_id = None
+            self.tarea = asyncio.ensure_future(self._sondear())
+        return cola
+
+    def desuscribir(self, cola):
+        self.suscriptores.discard(cola)
+
+    def activa(self, cola):
+        return cola in self.suscriptores
+
+    async def _ultimo_id(self):
+        ultimo = await SystemMessage.objects.order_by('-id').values_list('id', flat=True).afirst()
+        return ultimo or 0
+
+    async def _sondear(self):
+        if self.ultimo_id is None:
+            self.ultimo_id = await self._ultimo_id()
+        while self.suscriptores:
+            try:
+                await asyncio.wait_for(self.despertar.wait(), timeout=INTERVALO_SONDEO)
+            except asyncio.TimeoutError:
+                pass
+            self.despertar.clear()
+
+            nuevos = [
+                mensaje async for mensaje in
+                SystemMessage.objects.filter(id__gt=self.ultimo_id).order_by('id')[:LOTE_SONDEO]
+            ]
+            for mensaje in nuevos:
+                self.ultimo_id = mensaje.id
+                for cola in list(self.suscriptores):
+                    try:
+                        cola.put_nowait(mensaje)
+                    except asyncio.QueueFull:
+                        # El cliente no alcanza a leer: deja de recibir y la
+                        # conexión se cierra; al reconectar retoma desde su
+                        # Last-Event-ID
+                        self.suscriptores.discard(cola)
+            if len(nuevos) == LOTE_SONDEO:
+                self.despertar.set()
+
+
+def obtener_difusor():
+    """Difusor del event loop actual (uno por proceso bajo ASGI)."""
+    loop = asyncio.get_running_loop()
+    with _bloqueo:
+        difusor = _difusores.get(loop)
+        if difusor is None:
+            difusor = _difusores[loop] = Difusor(loop)
+        return difusor
+
+
+def notificar():
+    """Avisa a los difusores que hay mensajes nuevos. Se puede llamar desde cualquier hilo."""
+    with _bloqueo:
+        for loop in [loop for loop in _difusores if loop.is_closed()]:
+            del _difusores[loop]
+        difusores = list(_difusores.values())
+    for difusor in difusores:
+        if difusor.suscriptores:
+            difusor.loop.call_soon_threadsafe(difusor.despertar.set)
@@ -1,14 +1,20 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import SystemMessage
+from .models import SystemMessage, ResumenMensajes
+from . import buffer
+from .retencion import purgar
 from usuario.models import Usuario
+import asyncio
 import json
+import time
 
 # Tests para el módulo logger: registro de mensajes del sistema, 
 # captura de errores, niveles de severidad y filtrado de logs
 class LoggerTests(TestCase):
+    databases = {'default', 'logs'}
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -322,6 +328,153 @@ class LoggerTests(TestCase):
         self.assertEqual(response.status_code, 200)
         print("-"*50)
 
+    def test_get_logs_cursor_y_304(self):
+        print("\n" + "="*50)
+        print("TEST: GET_LOGS INCREMENTAL Y RESPUESTA 304")
+        print("="*50)
+        for i in range(3):
+            SystemMessage.objects.create(message=f"Log {i+1}", level='info')
+
+        response = self.client.get(reverse('logger:get_logs'))
+        data = json.loads(response.content)
+        etag = response['ETag']
+        print(f"• Primera consulta: {len(data['logs'])} logs, cursor {data['cursor']}, ETag {etag}")
+        self.assertEqual(len(data['logs']), 3)
+        self.assertIn('Last-Modified', response)
+
+        print("• Repitiendo la consulta con If-None-Match...")
+        response = self.client.get(reverse('logger:get_logs'), HTTP_IF_NONE_MATCH=etag)
+        print(f"  → Status: {response.status_code}")
+        self.assertEqual(response.status_code, 304)
+
+        nuevo = SystemMessage.objects.create(message="Log nuevo", level='warning')
+        print("• Consultando solo lo nuevo desde el cursor...")
+        response = self.client.get(
+            reverse('logger:get_logs') + f"?since={data['cursor']}",
+            HTTP_IF_NONE_MATCH=etag
+        )
+        nuevos = json.loads(response.content)
+        print(f"  → Logs nuevos: {[log['message'] for log in nuevos['logs']]}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([log['message'] for log in nuevos['logs']], ["Log nuevo"])
+        self.assertEqual(nuevos['cursor'], nuevo.id)
+        print("-"*50)
+
+    def test_get_logs_etag_por_cursor_y_last_modified(self):
+        print("\n" + "="*50)
+        print("TEST: GET_LOGS ETAG POR CURSOR Y LAST-MODIFIED")
+        print("="*50)
+        primero = SystemMessage.objects.create(message="Log 1", level='info')
+        SystemMessage.objects.create(message="Log 2", level='info')
+
+        completo = self.client.get(reverse('logger:get_logs'))
+        desde = self.client.get(reverse('logger:get_logs'), {'since': primero.id})
+        print(f"• ETag sin cursor: {completo['ETag']}; con ?since={primero.id}: {desde['ETag']}")
+        self.assertNotEqual(completo['ETag'], desde['ETag'])
+        response = self.client.get(
+            reverse('logger:get_logs'), {'since': primero.id}, HTTP_IF_NONE_MATCH=completo['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['logs']), 1)
+
+        print("• Un mensaje escrito en lote con id mayor pero fecha anterior...")
+        modificado = completo['Last-Modified']
+        SystemMessage.objects.create(
+            message="Log atrasado", level='info', timestamp=timezone.now() - timedelta(minutes=5)
+        )
+        response = self.client.get(reverse('logger:get_logs'))
+        print(f"  → Last-Modified: {modificado} → {response['Last-Modified']}")
+        self.assertEqual(response['Last-Modified'], modificado)
+        self.assertNotEqual(response['ETag'], completo['ETag'])
+        print("-"*50)
+
+    def test_get_logs_pagina_sin_perder_mensajes(self):
+        from .views import MAXIMO_LOGS
+        print("\n" + "="*50)
+        print("TEST: GET_LOGS AVANZA POR PÁGINAS SIN PERDER MENSAJES")
+        print("="*50)
+        inicial = SystemMessage.objects.create(message="Log inicial", level='info')
+        esperados = [
+            SystemMessage.objects.create(message=f"Log {i}", level='info').id
+            for i in range(MAXIMO_LOGS * 2 + 10)
+        ]
+        print(f"• {len(esperados)} mensajes nuevos desde el cursor {inicial.id}")
+
+        recibidos = []
+        cursor = inicial.id
+        paginas = 0
+        while True:
+            data = json.loads(self.client.get(reverse('logger:get_logs'), {'since': cursor}).content)
+            paginas += 1
+            print(f"  → Página {paginas}: {len(data['logs'])} logs, cursor {data['cursor']}, más: {data['mas']}")
+            recibidos += [log['id'] for log in data['logs']]
+            cursor = data['cursor']
+            if not data['mas']:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(recibidos, esperados)
+        print("-"*50)
+
+    def test_stream_solo_bajo_asgi(self):
+        from django.test import RequestFactory, AsyncRequestFactory
+        from .context_processors import stream_logs
+        print("\n" + "="*50)
+        print("TEST: EVENTSOURCE SOLO BAJO ASGI")
+        print("="*50)
+        wsgi = stream_logs(RequestFactory().get('/'))
+        asgi = stream_logs(AsyncRequestFactory().get('/'))
+        print(f"• WSGI: {wsgi}, ASGI: {asgi}")
+        self.assertFalse(wsgi['stream_logs_disponible'])
+        self.assertTrue(asgi['stream_logs_disponible'])
+
+        print("• Página servida con WSGI (cliente de pruebas)...")
+        response = self.client.get(reverse('inventario:lista_productos'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "new EventSource")
+        self.assertContains(response, "/logger/get-logs/")
+        print("-"*50)
+
+    async def test_stream_logs_reanuda_y_filtra(self):
+        from asgiref.sync import sync_to_async
+        print("\n" + "="*50)
+        print("TEST: STREAM SSE DE MENSAJES")
+        print("="*50)
+        primero = await SystemMessage.objects.acreate(message="Venta 1", app='ventas')
+        await SystemMessage.objects.acreate(message="Compra 1", app='compras')
+        await SystemMessage.objects.acreate(message="Venta 2", app='ventas')
+
+        await self.async_client.aforce_login(self.usuario)
+        response = await self.async_client.get(
+            reverse('logger:stream_logs') + '?app=ventas',
+            headers={'Last-Event-ID': str(primero.id)}
+        )
+        print(f"• Status: {response.status_code} ({response['Content-Type']})")
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        eventos = aiter(response.streaming_content)
+        self.assertEqual(await anext(eventos), b'retry: 5000\n\n')
+        reanudado = (await anext(eventos)).decode()
+        print(f"• Evento al reanudar: {reanudado.strip()}")
+        self.assertIn('"Venta 2"', reanudado)
+
+        print("• Registrando mensajes nuevos...")
+        await sync_to_async(buffer.registrar)("Compra 2", app='compras')
+        await sync_to_async(buffer.registrar)("Venta 3", app='ventas')
+        en_vivo = (await asyncio.wait_for(anext(eventos), timeout=5)).decode()
+        print(f"• Evento en vivo: {en_vivo.strip()}")
+        self.assertIn('"Venta 3"', en_vivo)
+        await eventos.aclose()
+        print("-"*50)
+
+    def test_stream_logs_requiere_asgi(self):
+        print("\n" + "="*50)
+        print("TEST: STREAM SSE BAJO WSGI")
+        print("="*50)
+        response = self.client.get(reverse('logger:stream_logs'))
+        print(f"• Status: {response.status_code}")
+        self.assertEqual(response.status_code, 503)
+        print("-"*50)
+
     def test_colored_message(self):
         print("\n" + "="*50)
         print("TEST: MÉTODO COLORED_MESSAGE")
@@ -345,7 +498,129 @@ class LoggerTests(TestCase):
         self.assertIn('Mensaje coloreado', colored_str)
         print("-"*50)
 
+    def test_buffer_guarda_al_vaciar(self):
+        print("\n" + "="*50)
+        print("TEST: BUFFER DE MENSAJES POR PETICIÓN")
+        print("="*50)
+        token = buffer.iniciar()
+        try:
+            primero = buffer.registrar("Primero", app='ventas', user=self.usuario)
+            segundo = buffer.registrar("Segundo", level='warning', app='ventas')
+            print(f"• Mensajes en la tabla antes de vaciar: {SystemMessage.objects.count()}")
+            self.assertEqual(SystemMessage.objects.count(), 0)
+        finally:
+            with self.assertNumQueries(1, using='logs'):
+                buffer.vaciar(token)
+
+        guardados = list(SystemMessage.objects.order_by('id'))
+        print(f"• Mensajes guardados con un INSERT: {[m.message for m in guardados]}")
+        self.assertEqual([m.message for m in guardados], ["Primero", "Segundo"])
+        self.assertEqual(guardados[0].timestamp, primero.timestamp)
+        self.assertEqual(guardados[1].timestamp, segundo.timestamp)
+        self.assertEqual(guardados[0].user, self.usuario)
+        print("-"*50)
+
+    def test_buffer_sin_peticion_guarda_inmediatamente(self):
+        print("\n" + "="*50)
+        print("TEST: BUFFER FUERA DE UNA PETICIÓN")
+        print("="*50)
+        buffer.registrar("Mensaje directo", level='info')
+        print(f"• Mensajes guardados: {SystemMessage.objects.count()}")
+        self.assertEqual(SystemMessage.objects.count(), 1)
+        print("-"*50)
+
+    def test_mensajes_en_base_de_logs(self):
+        print("\n" + "="*50)
+        print("TEST: MENSAJES EN LA BASE DE DATOS DE LOGS")
+        print("="*50)
+        mensaje = SystemMessage.objects.create(
+            message="Mensaje enrutado",
+            level='info',
+            user=self.usuario
+        )
+        print(f"• Base de datos del mensaje: {mensaje._state.db}")
+        self.assertEqual(mensaje._state.db, 'logs')
+        self.assertEqual(SystemMessage.objects.get(pk=mensaje.pk).user, self.usuario)
+
+        print("• Eliminando el usuario del mensaje...")
+        Usuario.objects.filter(pk=self.usuario.pk).delete()
+        mensaje.refresh_from_db()
+        print(f"  → Usuario del mensaje: {mensaje.user}")
+        self.assertIsNone(mensaje.user)
+        print("-"*50)
+
+    @override_settings(LOGGER_RETENCION={
+        'DIAS_POR_DEFECTO': 30,
+        'DIAS_POR_NIVEL': {'error': 90},
+        'DIAS_POR_APP': {'ventas': 60},
+        'LOTE': 2,
+    })
+    def test_purgar_mensajes_vencidos(self):
+        print("\n" + "="*50)
+        print("TEST: RETENCIÓN Y PURGA DE MENSAJES")
+        print("="*50)
+        ahora = timezone.now().replace(minute=30, second=0, microsecond=0)
+        hace_40_dias = ahora - timedelta(days=40)
+        SystemMessage.objects.bulk_create(
+            [SystemMessage(message=f"Info {i}", level='info', app='inventario', timestamp=hace_40_dias)
+             for i in range(3)]
+            + [
+                SystemMessage(message="Error", level='error', app='inventario', timestamp=hace_40_dias),
+                SystemMessage(message="Venta", level='info', app='ventas', timestamp=hace_40_dias),
+                SystemMessage(message="Reciente", level='info', app='inventario', timestamp=ahora),
+            ]
+        )
+        print("• Mensajes creados: 4 vencidos, 1 error y 1 de ventas con plazo mayor, 1 reciente")
+
+        resultado = purgar(ahora=ahora)
+        print(f"  → Eliminados: {resultado['eliminados']} en {resultado['lotes']} lote(s)")
+        self.assertEqual(resultado['eliminados'], 3)
+        self.assertEqual(resultado['lotes'], 2)
+
+        restantes = set(SystemMessage.objects.values_list('message', flat=True))
+        print(f"  → Mensajes conservados: {sorted(restantes)}")
+        self.assertEqual(restantes, {"Error", "Venta", "Reciente"})
+
+        resumen = ResumenMensajes.objects.get()
+        print(f"  → Resumen por hora: {resumen}")
+        self.assertEqual((resumen.app, resumen.level, resumen.cantidad), ('inventario', 'info', 3))
+        self.assertEqual(resumen.hora, hace_40_dias.replace(minute=0))
+
+        print("• Purgando de nuevo sin mensajes vencidos...")
+        self.assertEqual(purgar(ahora=ahora)['eliminados'], 0)
+        self.assertEqual(ResumenMensajes.objects.get().cantidad, 3)
+        print("-"*50)
+
     def tearDown(self):
         # Limpieza después de cada prueba
         SystemMessage.objects.all().delete()
         Usuario.objects.all().delete()
+
+
+# Tests del modo en segundo plano del buffer: el hilo usa su propia conexión,
+# por eso no pueden correr dentro de la transacción de TestCase
+@override_settings(LOGGER_BUFFER={'MODO': 'hilo', 'TAMANO_MAXIMO': 3, 'INTERVALO': 60})
+class BufferEnSegundoPlanoTests(TransactionTestCase):
+    databases = {'default', 'logs'}
+
+    def test_hilo_guarda_por_tamano_y_al_detener(self):
+        print("\n" + "="*50)
+        print("TEST: BUFFER EN SEGUNDO PLANO")
+        print("="*50)
+        try:
+            for i in range(4):
+                buffer.registrar(f"Mensaje {i}", app='sistema')
+            # Tres mensajes completan un lote; el cuarto espera al cierre
+            for _ in range(50):
+                if SystemMessage.objects.count() >= 3:
+                    break
+                time.sleep(0.05)
+            print(f"• Guardados antes de detener: {SystemMessage.objects.count()}")
+            self.assertEqual(SystemMessage.objects.count(), 3)
+        finally:
+            buffer.detener_escritor()
+
+        mensajes = list(SystemMessage.objects.order_by('id').values_list('message', flat=True))
+        print(f"• Guardados al detener: {mensajes}")
+        self.assertEqual(mensajes, [f"Mensaje {i}" for i in range(4)])
+        print("-"*50)
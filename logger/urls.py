@@ -5,4 +5,5 @@ app_name = 'logger'
 
 urlpatterns = [
     path('get-logs/', views.get_logs, name='get_logs'),
+    path('stream/', views.stream_logs, name='stream_logs'),
 ] 
\ No newline at end of file
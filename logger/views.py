@@ -1,24 +1,164 @@
-from django.shortcuts import render
-from django.http import JsonResponse
+import asyncio
+import json
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import condition
 from datetime import timedelta
 from .models import SystemMessage
+from .stream import obtener_difusor
+
+# Ventana y tamaño de la actividad reciente
+VENTANA_LOGS = timedelta(hours=24)
+MAXIMO_LOGS = 50
+
+
+def _serializar(log):
+    return {
+        'id': log.id,
+        'message': log.message,
+        'timestamp': log.timestamp.strftime('%d/%m/%Y %H:%M:%S'),
+        'level': log.level,
+        'app': log.app
+    }
+
+
+def _estado_logs(request):
+    """
+    Estado del feed: límite de la ventana, id del mensaje más antiguo dentro
+    de ella, id del último mensaje y la fecha más reciente. Son búsquedas
+    por índice; se calcula una vez por petición y lo comparten ETag,
+    Last-Modified y la vista.
+    """
+    if not hasattr(request, '_estado_logs'):
+        limite = timezone.now() - VENTANA_LOGS
+        primero = SystemMessage.objects.filter(
+            timestamp__gte=limite
+        ).order_by('timestamp', 'id').values_list('id', flat=True).first()
+        ultimo = SystemMessage.objects.order_by('-id').values_list('id', flat=True).first()
+        # Con la escritura en lotes el último id no siempre es el más
+        # reciente: Last-Modified usa la fecha máxima para no retroceder
+        reciente = SystemMessage.objects.order_by('-timestamp', '-id').values_list('timestamp', flat=True).first()
+        request._estado_logs = (limite, primero, ultimo, reciente)
+    return request._estado_logs
+
 
-# Create your views here.
+def _cursor(request):
+    try:
+        return int(request.GET.get('since', 0))
+    except ValueError:
+        return 0
 
+
+def _etag_logs(request):
+    _, primero, ultimo, _ = _estado_logs(request)
+    # Cambia cuando entra un mensaje nuevo o uno sale de la ventana; el
+    # cursor va incluido porque cada ?since= devuelve otro cuerpo
+    return f"{primero}-{ultimo or 0}-{_cursor(request)}"
+
+
+def _ultima_modificacion_logs(request):
+    return _estado_logs(request)[3]
+
+
+@condition(etag_func=_etag_logs, last_modified_func=_ultima_modificacion_logs)
 def get_logs(request):
-    # Obtener logs de las últimas 24 horas
-    recent_logs = SystemMessage.objects.filter(
-        timestamp__gte=timezone.now() - timedelta(hours=24)
-    ).order_by('-timestamp')[:50]  # Limitamos a los últimos 50 registros
-    
-    logs = []
-    for log in recent_logs:
-        logs.append({
-            'message': log.message,
-            'timestamp': log.timestamp.strftime('%d/%m/%Y %H:%M:%S'),
-            'level': log.level,
-            'app': log.app
-        })
-    
-    return JsonResponse({'logs': logs})
+    # Logs de las últimas 24 horas en orden cronológico. Sin ?since= son los
+    # MAXIMO_LOGS más recientes; con ?since=<id> (el cursor de la respuesta
+    # anterior) los MAXIMO_LOGS siguientes a ese id, y 'mas' indica que
+    # quedan otros: el cliente avanza el cursor sin saltarse ninguno.
+    limite, _, _, _ = _estado_logs(request)
+    recent_logs = SystemMessage.objects.filter(timestamp__gte=limite)
+    since = _cursor(request)
+
+    if since:
+        recent_logs = list(recent_logs.filter(id__gt=since).order_by('id')[:MAXIMO_LOGS + 1])
+        mas = len(recent_logs) > MAXIMO_LOGS
+        recent_logs = recent_logs[:MAXIMO_LOGS]
+    else:
+        recent_logs = list(recent_logs.order_by('-id')[:MAXIMO_LOGS])[::-1]
+        mas = False
+
+    cursor = recent_logs[-1].id if recent_logs else since
+    return JsonResponse({
+        'logs': [_serializar(log) for log in recent_logs],
+        'cursor': cursor,
+        'mas': mas,
+    })
+
+
+# Stream SSE de mensajes nuevos
+HEARTBEAT_STREAM = 15       # segundos entre comentarios de keep-alive
+MAXIMO_REANUDACION = 500    # mensajes reenviados al reconectar
+
+
+def _valores(request, parametro):
+    # ?app=ventas&app=compras o ?app=ventas,compras
+    return {valor for valor in ','.join(request.GET.getlist(parametro)).split(',') if valor}
+
+
+def _evento(log):
+    return f"id: {log.id}\ndata: {json.dumps(_serializar(log))}\n\n"
+
+
+async def _eventos(apps, niveles, ultimo_id):
+    difusor = obtener_difusor()
+    # Suscribirse antes de leer lo pendiente: lo que llegue entretanto
+    # queda en la cola y los repetidos se descartan por id
+    cola = difusor.suscribir()
+    try:
+        yield 'retry: 5000\n\n'
+
+        if ultimo_id is not None:
+            pendientes = SystemMessage.objects.filter(id__gt=ultimo_id)
+            if apps:
+                pendientes = pendientes.filter(app__in=apps)
+            if niveles:
+                pendientes = pendientes.filter(level__in=niveles)
+            async for log in pendientes.order_by('id')[:MAXIMO_REANUDACION]:
+                ultimo_id = log.id
+                yield _evento(log)
+
+        while True:
+            try:
+                log = await asyncio.wait_for(cola.get(), timeout=HEARTBEAT_STREAM)
+            except asyncio.TimeoutError:
+                if not difusor.activa(cola) and cola.empty():
+                    # Cortado por lento; el navegador reconecta solo
+                    return
+                yield ': ping\n\n'
+                continue
+            if ultimo_id is not None and log.id <= ultimo_id:
+                continue
+            if (apps and log.app not in apps) or (niveles and log.level not in niveles):
+                continue
+            ultimo_id = log.id
+            yield _evento(log)
+    finally:
+        difusor.desuscribir(cola)
+
+
+async def stream_logs(request):
+    # Una conexión abierta por cliente; solo tiene sentido bajo ASGI
+    # (con WSGI ocuparía un worker indefinidamente)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            'El stream de mensajes requiere servir la aplicación con ASGI',
+            status=503,
+            content_type='text/plain'
+        )
+
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError:
+        ultimo_id = None
+
+    response = StreamingHttpResponse(
+        _eventos(_valores(request, 'app'), _valores(request, 'level'), ultimo_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
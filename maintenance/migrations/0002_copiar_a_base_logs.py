@@ -0,0 +1,25 @@
+from django.db import connections, migrations
+
+
+def copiar_mantenimientos_existentes(apps, schema_editor):
+    # Al crear la base 'logs' se traen los registros que ya estaban en 'default'
+    if schema_editor.connection.alias == 'default':
+        return
+    if 'maintenance_mantenimiento' not in connections['default'].introspection.table_names():
+        return
+    Mantenimiento = apps.get_model('maintenance', 'Mantenimiento')
+    Mantenimiento.objects.using(schema_editor.connection.alias).bulk_create(
+        Mantenimiento.objects.using('default').order_by('id'),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(copiar_mantenimientos_existentes, migrations.RunPython.noop),
+    ]
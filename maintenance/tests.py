@@ -7,6 +7,8 @@ from .models import Mantenimiento
 # Tests para el módulo maintenance: registro de mantenimientos, tipos de mantenimiento,
 # estados de mantenimiento y filtrado de registros de mantenimiento
 class MantenimientoTests(TestCase):
+    databases = {'default', 'logs'}
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -0,0 +1,161 @@
+"""
+Caché en disco de los archivos de reportes.
+
+La clave es (tipo_reporte, formato, rango de fechas normalizado a días) más
+un sello de datos: la suma de los contadores VersionDatos de los días del
+rango y del catálogo/stock, según lo que muestre el reporte. Toda escritura
+de Movimiento, Compra o Producto incrementa su contador (ver
+reportes.signals), así una repetición sin cambios se sirve desde el disco y
+un reporte nunca queda desactualizado.
+
+Los archivos con sellos viejos quedan huérfanos y se eliminan por
+antigüedad al superar MAXIMO_ARCHIVOS.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from inventario.models import estacion_del_mes
+from .models import VersionDatos
+
+CONFIGURACION_POR_DEFECTO = {
+    'DIRECTORIO': None,      # por defecto MEDIA_ROOT/cache_reportes
+    'MAXIMO_ARCHIVOS': 200,
+}
+
+# Qué contadores afectan a cada tipo de reporte
+DEPENDENCIAS = {
+    'completo': {'dias': True, 'catalogo': True, 'stock': True},
+    'ventas': {'dias': True, 'catalogo': True, 'stock': False},
+    'compras': {'dias': True, 'catalogo': True, 'stock': False},
+    'productos_bajo_stock': {'dias': False, 'catalogo': True, 'stock': True},
+}
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+}
+EXTENSIONES = {'pdf': 'pdf', 'excel': 'xlsx', 'csv': 'csv'}
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'REPORTES_CACHE', {})}
+
+
+def directorio():
+    ruta = configuracion()['DIRECTORIO'] or Path(settings.MEDIA_ROOT) / 'cache_reportes'
+    ruta = Path(ruta)
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def incrementar_versiones(claves):
+    """Incrementa los contadores indicados (dos consultas, en la transacción actual)."""
+    claves = sorted(set(claves))
+    if not claves:
+        return
+    with transaction.atomic():
+        VersionDatos.objects.bulk_create([VersionDatos(clave=clave) for clave in claves], ignore_conflicts=True)
+        VersionDatos.objects.filter(clave__in=claves).update(version=F('version') + 1)
+
+
+def clave_dia(fecha_hora):
+    return timezone.localdate(fecha_hora).isoformat()
+
+
+def sello_datos(tipo_reporte, desde, hasta):
+    dependencias = DEPENDENCIAS.get(tipo_reporte, DEPENDENCIAS['completo'])
+    partes = []
+    if dependencias['dias']:
+        # Las claves de día son fechas ISO, que se ordenan igual como texto
+        partes.append(VersionDatos.objects.filter(
+            clave__gte=desde.isoformat(), clave__lte=hasta.isoformat()
+        ).aggregate(total=Sum('version'))['total'] or 0)
+    otras = [clave for clave in ('catalogo', 'stock') if dependencias[clave]]
+    versiones = dict(VersionDatos.objects.filter(clave__in=otras).values_list('clave', 'version'))
+    partes.extend(versiones.get(clave, 0) for clave in otras)
+    return partes
+
+
+def _clave_archivo(tipo_reporte, formato, desde, hasta):
+    if not DEPENDENCIAS.get(tipo_reporte, DEPENDENCIAS['completo'])['dias']:
+        # El reporte no depende del rango: se comparte entre rangos
+        desde = hasta = None
+    sello = sello_datos(tipo_reporte, desde, hasta)
+    parametros = [
+        tipo_reporte,
+        formato,
+        desde.isoformat() if desde else None,
+        hasta.isoformat() if hasta else None,
+        sello,
+    ]
+    if DEPENDENCIAS.get(tipo_reporte, DEPENDENCIAS['completo'])['stock']:
+        # El umbral de bajo stock depende de la estación
+        parametros.append(estacion_del_mes(timezone.localtime().month))
+    return hashlib.sha256(json.dumps(parametros).encode()).hexdigest()
+
+
+def _respuesta(contenido, formato):
+    response = contenido
+    response['Content-Type'] = CONTENT_TYPES[formato]
+    response['Content-Disposition'] = f'attachment; filename=reporte.{EXTENSIONES[formato]}'
+    return response
+
+
+def obtener_o_generar(tipo_reporte, formato, fecha_inicio, fecha_fin, generar):
+    """
+    Devuelve el reporte desde la caché si existe para los datos actuales; si
+    no, llama a generar() y guarda lo que se envía al cliente mientras se envía.
+    """
+    desde, hasta = timezone.localdate(fecha_inicio), timezone.localdate(fecha_fin)
+    ruta = directorio() / f'{_clave_archivo(tipo_reporte, formato, desde, hasta)}.{EXTENSIONES[formato]}'
+
+    if ruta.exists():
+        return _respuesta(FileResponse(open(ruta, 'rb')), formato)
+
+    response = generar()
+    partes = response.streaming_content if response.streaming else [response.content]
+    return _respuesta(StreamingHttpResponse(_guardar_mientras_envia(partes, response, ruta)), formato)
+
+
+def _guardar_mientras_envia(partes, response, ruta):
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.parcial')
+    completo = False
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            for parte in partes:
+                parte = parte if isinstance(parte, bytes) else parte.encode()
+                archivo.write(parte)
+                yield parte
+        completo = True
+    finally:
+        response.close()
+        if completo:
+            # os.replace es atómico: nadie lee un archivo a medio escribir
+            os.replace(temporal, ruta)
+            _limpiar(ruta.parent)
+        else:
+            os.remove(temporal)
+
+
+def _limpiar(carpeta):
+    maximo = configuracion()['MAXIMO_ARCHIVOS']
+    archivos = sorted(
+        (ruta for ruta in carpeta.iterdir() if ruta.suffix != '.parcial'),
+        key=lambda ruta: ruta.stat().st_mtime,
+        reverse=True,
+    )
+    for ruta in archivos[maximo:]:
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,214 @@
+"""
+Tablas de hechos diarias (HechoDiario y HechoDiarioProducto).
+
+registrar_venta y registrar_compra las actualizan dentro de la misma
+transacción que guarda el movimiento, con un par de UPDATE por tabla sin
+importar el tamaño del carrito. reconstruir_hechos las recalcula desde los
+detalles (comando reconstruir_hechos_diarios). Los resúmenes de reportes y
+del inicio leen estas tablas en vez de recorrer todos los detalles.
+
+Editar o eliminar un movimiento, una compra o sus detalles fuera de esas
+vistas (p. ej. desde el admin) recalcula su día al confirmar la
+transacción (recalcular_dias, llamado desde reportes.signals).
+
+El día de un movimiento es su fecha en hora local (America/Santiago).
+"""
+import threading
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.apps import apps as apps_globales
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, PositiveIntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventario.models import LOTE_ACTUALIZACION
+
+# Campos de HechoDiarioProducto y HechoDiario que suma cada tipo de movimiento
+CAMPOS_POR_TIPO = {
+    'venta': {
+        'producto': ('unidades_vendidas', 'ingresos', 'lineas_venta'),
+        'dia': ('num_ventas', 'total_ventas'),
+    },
+    'compra': {
+        'producto': ('unidades_compradas', 'costo_compras', 'lineas_compra'),
+        'dia': ('num_compras', 'total_compras'),
+    },
+}
+
+
+def _modelos(apps=None):
+    apps = apps or apps_globales
+    return {
+        'HechoDiario': apps.get_model('reportes', 'HechoDiario'),
+        'HechoDiarioProducto': apps.get_model('reportes', 'HechoDiarioProducto'),
+        'Movimiento': apps.get_model('ventas', 'Movimiento'),
+        'Detalle': apps.get_model('ventas', 'Detalle'),
+        'Compra': apps.get_model('compras', 'Compra'),
+        'DetalleCompra': apps.get_model('compras', 'DetalleCompra'),
+    }
+
+
+def registrar_venta(movimiento, detalles):
+    """Suma una venta ya guardada y sus detalles a los hechos de su día."""
+    _acumular('venta', movimiento.fecha, movimiento.total, detalles)
+
+
+def registrar_compra(compra, detalles):
+    """Suma una compra ya guardada y sus detalles a los hechos de su día."""
+    _acumular('compra', compra.fecha, compra.total, detalles)
+
+
+def _decimal(valor):
+    # Los precios del carrito llegan como float desde el JSON: Decimal(str())
+    # evita guardar los artefactos binarios (Decimal(0.1) != Decimal('0.1'))
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _acumular(tipo, fecha_hora, total, detalles):
+    modelos = _modelos()
+    HechoDiario = modelos['HechoDiario']
+    HechoDiarioProducto = modelos['HechoDiarioProducto']
+    campo_unidades, campo_monto, campo_lineas = CAMPOS_POR_TIPO[tipo]['producto']
+    campo_num, campo_total = CAMPOS_POR_TIPO[tipo]['dia']
+    fecha = timezone.localdate(fecha_hora)
+
+    por_producto = {}
+    for detalle in detalles:
+        acumulado = por_producto.setdefault(detalle.id_prod_id, [0, Decimal('0'), 0])
+        acumulado[0] += detalle.cantidad
+        acumulado[1] += _decimal(detalle.precio_uni) * detalle.cantidad
+        acumulado[2] += 1
+
+    with transaction.atomic():
+        HechoDiario.objects.bulk_create([HechoDiario(fecha=fecha)], ignore_conflicts=True)
+        HechoDiario.objects.filter(fecha=fecha).update(**{
+            campo_num: F(campo_num) + 1,
+            campo_total: F(campo_total) + Value(_decimal(total), output_field=DecimalField()),
+        })
+
+        HechoDiarioProducto.objects.bulk_create(
+            [HechoDiarioProducto(fecha=fecha, producto_id=producto_id) for producto_id in por_producto],
+            ignore_conflicts=True,
+        )
+        ids = list(por_producto)
+        for inicio in range(0, len(ids), LOTE_ACTUALIZACION):
+            lote = ids[inicio:inicio + LOTE_ACTUALIZACION]
+
+            def suma(posicion, output_field):
+                return Case(
+                    *[When(producto_id=producto_id, then=Value(por_producto[producto_id][posicion]))
+                      for producto_id in lote],
+                    output_field=output_field,
+                )
+
+            HechoDiarioProducto.objects.filter(fecha=fecha, producto_id__in=lote).update(**{
+                campo_unidades: F(campo_unidades) + suma(0, PositiveIntegerField()),
+                campo_monto: F(campo_monto) + suma(1, DecimalField()),
+                campo_lineas: F(campo_lineas) + suma(2, PositiveIntegerField()),
+            })
+
+
+# Días con un recálculo pendiente en este hilo: eliminar una venta dispara
+# post_delete por cada detalle, pero el día se recalcula una sola vez
+_pendientes = threading.local()
+
+
+def _dias_pendientes():
+    if not hasattr(_pendientes, 'dias'):
+        _pendientes.dias = set()
+    return _pendientes.dias
+
+
+def recalcular_dias(fechas):
+    """Recalcula los hechos de esos días (fechas locales) al confirmar la transacción."""
+    for fecha in set(fechas):
+        _dias_pendientes().add(fecha)
+        transaction.on_commit(partial(_recalcular_dia, fecha))
+
+
+def _recalcular_dia(fecha):
+    # Solo el primer callback del día hace el trabajo. Si la transacción se
+    # revirtió, el día queda en el conjunto y lo recalcula el próximo cambio.
+    dias = _dias_pendientes()
+    if fecha in dias:
+        dias.discard(fecha)
+        reconstruir_hechos(desde=fecha, hasta=fecha)
+
+
+def _rango(desde, hasta):
+    filtros = {}
+    if desde is not None:
+        filtros['gte'] = timezone.make_aware(datetime.combine(desde, time.min))
+    if hasta is not None:
+        filtros['lt'] = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return filtros
+
+
+def reconstruir_hechos(desde=None, hasta=None, apps=None):
+    """
+    Recalcula los hechos de los días entre desde y hasta (fechas, ambos
+    incluidos; None = sin límite) desde los movimientos y sus detalles.
+    Devuelve (días, filas por producto) creados.
+    """
+    modelos = _modelos(apps)
+    HechoDiario = modelos['HechoDiario']
+    HechoDiarioProducto = modelos['HechoDiarioProducto']
+    rango = _rango(desde, hasta)
+
+    def en_rango(campo):
+        return {f'{campo}__{operador}': valor for operador, valor in rango.items()}
+
+    dias = {}
+    productos = {}
+    fuentes = (
+        ('venta', modelos['Movimiento'].objects.filter(**en_rango('fecha')), 'id_mov',
+         modelos['Detalle'].objects.filter(**en_rango('id_mov__fecha')), 'id_mov__fecha'),
+        ('compra', modelos['Compra'].objects.filter(**en_rango('fecha')), 'id_compra',
+         modelos['DetalleCompra'].objects.filter(**en_rango('id_compra__fecha')), 'id_compra__fecha'),
+    )
+    for tipo, movimientos, pk, detalles, campo_fecha in fuentes:
+        campo_num, campo_total = CAMPOS_POR_TIPO[tipo]['dia']
+        por_dia = movimientos.annotate(dia=TruncDate('fecha')).values('dia').annotate(
+            num=Count(pk), total=Sum('total')
+        )
+        for fila in por_dia:
+            hecho = dias.setdefault(fila['dia'], HechoDiario(fecha=fila['dia']))
+            setattr(hecho, campo_num, fila['num'])
+            setattr(hecho, campo_total, fila['total'] or 0)
+
+        campo_unidades, campo_monto, campo_lineas = CAMPOS_POR_TIPO[tipo]['producto']
+        por_producto = detalles.annotate(dia=TruncDate(campo_fecha)).values('dia', 'id_prod').annotate(
+            unidades=Sum('cantidad'),
+            monto=Sum(F('precio_uni') * F('cantidad')),
+            lineas=Count('num_transac'),
+        )
+        for fila in por_producto.iterator(chunk_size=2000):
+            clave = (fila['dia'], fila['id_prod'])
+            hecho = productos.setdefault(clave, HechoDiarioProducto(fecha=fila['dia'], producto_id=fila['id_prod']))
+            setattr(hecho, campo_unidades, fila['unidades'])
+            setattr(hecho, campo_monto, fila['monto'])
+            setattr(hecho, campo_lineas, fila['lineas'])
+
+    with transaction.atomic():
+        filtro_dias = {f'fecha__{operador}': valor for operador, valor in
+                       (('gte', desde), ('lte', hasta)) if valor is not None}
+        HechoDiario.objects.filter(**filtro_dias).delete()
+        HechoDiarioProducto.objects.filter(**filtro_dias).delete()
+        HechoDiario.objects.bulk_create(dias.values(), batch_size=1000)
+        HechoDiarioProducto.objects.bulk_create(productos.values(), batch_size=1000)
+    return len(dias), len(productos)
+
+
+def resumen_periodo(desde, hasta):
+    """Totales de ventas y compras entre dos fechas (ambas incluidas)."""
+    HechoDiario = _modelos()['HechoDiario']
+    resumen = HechoDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta).aggregate(
+        total_ventas=Sum('total_ventas'),
+        num_ventas=Sum('num_ventas'),
+        total_compras=Sum('total_compras'),
+        num_compras=Sum('num_compras'),
+    )
+    return resumen
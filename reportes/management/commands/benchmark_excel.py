@@ -0,0 +1,120 @@
+import json
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from inventario.models import Producto
+from usuario.models import Usuario
+from ventas.models import Movimiento, Detalle
+from reportes import views
+
+# Detalles por venta sintética
+DETALLES_POR_VENTA = 5
+
+
+class _Revertir(Exception):
+    pass
+
+
+def _rss_maximo_kb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    if sys.platform == 'darwin':
+        rss //= 1024
+    return rss
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide tiempo y memoria máxima (RSS) de generar_excel según el número de filas de detalle, '
+        'con y sin constant_memory (no deja datos; solo Linux/macOS)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            nargs='+',
+            type=int,
+            default=[10000, 100000, 500000],
+            help='Filas de detalle de ventas a exportar (por defecto 10000 100000 500000)',
+        )
+        parser.add_argument(
+            '--modo',
+            nargs='+',
+            choices=['constante', 'memoria'],
+            default=['memoria', 'constante'],
+            help='constante: constant_memory de xlsxwriter; memoria: libro completo en memoria',
+        )
+        # Uso interno: cada medición corre en un proceso aparte para que el
+        # RSS máximo de una no contamine la siguiente
+        parser.add_argument('--una', action='store_true', help='Mide un solo tamaño y modo, en JSON')
+
+    def handle(self, *args, **options):
+        if options['una']:
+            resultado = self._medir(options['filas'][0], options['modo'][0])
+            self.stdout.write(json.dumps(resultado))
+            return
+
+        self.stdout.write(f"{'Filas':>9} {'Modo':>10} {'Tiempo (s)':>11} {'RSS máx. (MB)':>14} {'Aumento (MB)':>13}")
+        for filas in options['filas']:
+            for modo in options['modo']:
+                proceso = subprocess.run(
+                    [sys.executable, sys.argv[0], 'benchmark_excel', '--una', '--filas', str(filas), '--modo', modo],
+                    capture_output=True,
+                    text=True,
+                )
+                if proceso.returncode != 0:
+                    raise CommandError(proceso.stderr)
+                resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+                self.stdout.write(
+                    f"{filas:>9} {modo:>10} {resultado['segundos']:>11.2f} "
+                    f"{resultado['rss_maximo_kb'] / 1024:>14.1f} {resultado['aumento_kb'] / 1024:>13.1f}"
+                )
+
+    def _medir(self, filas, modo):
+        resultado = {}
+        try:
+            # Todo se hace dentro de una transacción que se revierte al final
+            with transaction.atomic():
+                self._crear_datos(filas)
+                ahora = timezone.now()
+                data = views.obtener_datos_reporte('ventas', ahora - timedelta(days=1), ahora + timedelta(days=1))
+
+                views.EXCEL_MEMORIA_CONSTANTE = modo == 'constante'
+                rss_inicial = _rss_maximo_kb()
+                inicio = time.perf_counter()
+                response = views.generar_excel(data)
+                tamano = sum(len(parte) for parte in response.streaming_content)
+                response.close()
+                resultado = {
+                    'segundos': time.perf_counter() - inicio,
+                    'rss_maximo_kb': _rss_maximo_kb(),
+                    'aumento_kb': _rss_maximo_kb() - rss_inicial,
+                    'bytes': tamano,
+                }
+                raise _Revertir()
+        except _Revertir:
+            pass
+        return resultado
+
+    def _crear_datos(self, filas):
+        usuario = Usuario.objects.create(RutUsuua='benchmark-excel', Nombre='Benchmark', ApePa='Excel', Telefono='0')
+        producto = Producto.objects.create(nombre='Benchmark Excel', categoria='Otros', precio=Decimal('1000'), stock=0)
+        ventas = Movimiento.objects.bulk_create([
+            Movimiento(rut_usu=usuario, tipo='VENTA', total=Decimal('5000'))
+            for _ in range((filas + DETALLES_POR_VENTA - 1) // DETALLES_POR_VENTA)
+        ], batch_size=1000)
+        ids = [venta.id_mov for venta in ventas]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {Detalle._meta.db_table} (id_mov_id, id_prod_id, precio_uni, cantidad) "
+                "VALUES (%s, %s, 1000, 1)",
+                ((ids[i // DETALLES_POR_VENTA], producto.id) for i in range(filas)),
+            )
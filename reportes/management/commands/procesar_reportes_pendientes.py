@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reportes.trabajos import procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera en este proceso los reportes que quedaron en cola y marca como fallidos '
+        'los que quedaron en proceso (por ejemplo, tras reiniciar el servidor)'
+    )
+
+    def handle(self, *args, **options):
+        total, interrumpidos = procesar_pendientes()
+        if interrumpidos:
+            self.stdout.write(f'{interrumpidos} reporte(s) interrumpido(s) marcado(s) como fallido(s)')
+        self.stdout.write(self.style.SUCCESS(f'{total} reporte(s) pendiente(s) procesado(s)'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_hechos(apps, schema_editor):
+    # Carga inicial; luego las tablas se mantienen al registrar ventas y compras
+    from reportes.hechos import reconstruir_hechos
+    reconstruir_hechos(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_stockalerta'),
+        ('reportes', '0001_initial'),
+        ('ventas', '0002_movimiento_tipo_fecha_idx'),
+        ('compras', '0002_compra_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HechoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('num_ventas', models.PositiveIntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('num_compras', models.PositiveIntegerField(default=0)),
+                ('total_compras', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HechoDiarioProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades_vendidas', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lineas_venta', models.PositiveIntegerField(default=0)),
+                ('unidades_compradas', models.PositiveIntegerField(default=0)),
+                ('costo_compras', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lineas_compra', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hechos_diarios', to='inventario.producto')),
+            ],
+            options={
+                'ordering': ['fecha', 'producto'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='reportes_hecho_fecha_producto_uniq')],
+            },
+        ),
+        migrations.RunPython(poblar_hechos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.3 on 2026-10-17 23:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_hechos_diarios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_reporte', models.CharField(choices=[('completo', 'Reporte Completo'), ('ventas', 'Solo Ventas'), ('compras', 'Solo Compras'), ('productos_bajo_stock', 'Solo Productos Bajo Stock')], max_length=30)),
+                ('formato', models.CharField(choices=[('pdf', 'PDF'), ('excel', 'Excel'), ('csv', 'CSV')], max_length=10)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('clave', models.CharField(db_index=True, max_length=64)),
+                ('estado', models.CharField(choices=[('en_cola', 'En cola'), ('en_proceso', 'En proceso'), ('listo', 'Listo'), ('fallido', 'Fallido')], default='en_cola', max_length=20)),
+                ('archivo', models.FileField(blank=True, upload_to='reportes')),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-creado'],
+            },
+        ),
+    ]
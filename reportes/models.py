@@ -1,4 +1,6 @@
 from django.db import models
+from inventario.models import Producto
+from usuario.models import Usuario
 
 class ConfiguracionReporte(models.Model):
     nombre = models.CharField(max_length=100)
@@ -9,4 +11,99 @@ class ConfiguracionReporte(models.Model):
     fecha_fin = models.DateField()
     
     def __str__(self):
-        return self.nombre
\ No newline at end of file
+        return self.nombre
+
+class HechoDiario(models.Model):
+    """Totales de ventas y compras de un día (hora de Santiago). Ver reportes.hechos."""
+    fecha = models.DateField(unique=True)
+    num_ventas = models.PositiveIntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    num_compras = models.PositiveIntegerField(default=0)
+    total_compras = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['fecha']
+
+    def __str__(self):
+        return f"{self.fecha}: {self.num_ventas} ventas, {self.num_compras} compras"
+
+
+class HechoDiarioProducto(models.Model):
+    """Unidades y montos vendidos y comprados de un producto en un día."""
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='hechos_diarios')
+    unidades_vendidas = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lineas_venta = models.PositiveIntegerField(default=0)
+    unidades_compradas = models.PositiveIntegerField(default=0)
+    costo_compras = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lineas_compra = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['fecha', 'producto']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='reportes_hecho_fecha_producto_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.producto_id}"
+
+
+class ReportJob(models.Model):
+    """Reporte generado en segundo plano (ver reportes.trabajos)."""
+    EN_COLA = 'en_cola'
+    EN_PROCESO = 'en_proceso'
+    LISTO = 'listo'
+    FALLIDO = 'fallido'
+    ESTADO_CHOICES = [
+        (EN_COLA, 'En cola'),
+        (EN_PROCESO, 'En proceso'),
+        (LISTO, 'Listo'),
+        (FALLIDO, 'Fallido'),
+    ]
+    TIPO_CHOICES = [
+        ('completo', 'Reporte Completo'),
+        ('ventas', 'Solo Ventas'),
+        ('compras', 'Solo Compras'),
+        ('productos_bajo_stock', 'Solo Productos Bajo Stock'),
+    ]
+    FORMATO_CHOICES = [
+        ('pdf', 'PDF'),
+        ('excel', 'Excel'),
+        ('csv', 'CSV'),
+    ]
+
+    tipo_reporte = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    # Hash de los parámetros, para no repetir trabajos idénticos en curso
+    clave = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=EN_COLA)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    archivo = models.FileField(upload_to='reportes', blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creado']
+
+    def __str__(self):
+        return f"Reporte {self.tipo_reporte} ({self.formato}) #{self.pk} - {self.get_estado_display()}"
+
+
+class VersionDatos(models.Model):
+    """
+    Contador que aumenta con cada escritura que afecta a los reportes; la
+    suma de los contadores relevantes es el sello de la caché de reportes.
+    clave es 'catalogo', 'stock' o un día 'AAAA-MM-DD' (hora de Santiago).
+    Las claves 'catalogo:<categoria>' son las versiones de la caché del
+    catálogo de inventario (inventario.catalogo).
+    """
+    clave = models.CharField(max_length=20, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.clave}: {self.version}"
@@ -0,0 +1,20 @@
+"""
+Funciones que corren en los procesos del pool de reportes.
+
+Los procesos se inician con 'spawn' y cargan este módulo antes de
+django.setup(), por eso aquí no se importan modelos a nivel de módulo.
+"""
+
+
+def iniciar():
+    import django
+    django.setup()
+
+
+def ejecutar(trabajo_id):
+    from django.db import close_old_connections
+    from .trabajos import ejecutar as ejecutar_trabajo
+    try:
+        ejecutar_trabajo(trabajo_id)
+    finally:
+        close_old_connections()
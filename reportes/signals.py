@@ -0,0 +1,54 @@
+"""
+Incrementa los contadores de VersionDatos con cada escritura que afecta a
+un reporte, y recalcula los hechos diarios de los días editados.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from compras.models import Compra, DetalleCompra
+from inventario.models import Producto
+from inventario.signals import stock_actualizado
+from ventas.models import Movimiento, Detalle
+from .cache_archivos import incrementar_versiones, clave_dia
+from .hechos import recalcular_dias
+
+
+@receiver(post_save, sender=Movimiento)
+@receiver(post_delete, sender=Movimiento)
+@receiver(post_save, sender=Compra)
+@receiver(post_delete, sender=Compra)
+def movimiento_modificado(sender, instance, created=False, **kwargs):
+    incrementar_versiones([clave_dia(instance.fecha)])
+    # Las altas las suman registrar_venta / registrar_compra en su vista
+    if not created:
+        recalcular_dias([timezone.localdate(instance.fecha)])
+
+
+# Las vistas crean los detalles con bulk_create (sin señales): cualquier
+# detalle guardado o eliminado por otra vía recalcula su día
+@receiver(post_save, sender=Detalle)
+@receiver(post_delete, sender=Detalle)
+def detalle_venta_modificado(sender, instance, **kwargs):
+    fechas = Movimiento.objects.filter(pk=instance.id_mov_id).values_list('fecha', flat=True)
+    incrementar_versiones([clave_dia(fecha) for fecha in fechas])
+    recalcular_dias([timezone.localdate(fecha) for fecha in fechas])
+
+
+@receiver(post_save, sender=DetalleCompra)
+@receiver(post_delete, sender=DetalleCompra)
+def detalle_compra_modificado(sender, instance, **kwargs):
+    fechas = Compra.objects.filter(pk=instance.id_compra_id).values_list('fecha', flat=True)
+    incrementar_versiones([clave_dia(fecha) for fecha in fechas])
+    recalcular_dias([timezone.localdate(fecha) for fecha in fechas])
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def producto_modificado(sender, instance, **kwargs):
+    incrementar_versiones(['catalogo', 'stock'])
+
+
+@receiver(stock_actualizado)
+def stock_modificado(sender, producto_ids, **kwargs):
+    incrementar_versiones(['stock'])
@@ -1,9 +1,17 @@
-from django.test import TestCase, Client
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta, date
 from decimal import Decimal
-from .models import ConfiguracionReporte
+from django.db import connection
+from django.http import FileResponse
+from django.test.utils import CaptureQueriesContext
+from .models import ConfiguracionReporte, HechoDiario, HechoDiarioProducto, ReportJob
+from .hechos import reconstruir_hechos
 from inventario.models import Producto
 from ventas.models import Movimiento, Detalle as DetalleVenta
 from compras.models import Compra, DetalleCompra
@@ -12,10 +20,22 @@ from usuario.models import Usuario
 # Tests para el módulo reportes: configuración de reportes, generación de reportes,
 # filtrado por fechas y formatos de exportación (PDF, Excel)
 class ReportesTests(TestCase):
+    databases = {'default', 'logs'}
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
         cls._setup_message_shown = False
+        # La caché de archivos de reportes se escribe en un directorio temporal
+        cls._directorio_cache = tempfile.mkdtemp()
+        cls._cache_reportes = override_settings(REPORTES_CACHE={'DIRECTORIO': cls._directorio_cache})
+        cls._cache_reportes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._cache_reportes.disable()
+        shutil.rmtree(cls._directorio_cache, ignore_errors=True)
+        super().tearDownClass()
 
     def get_status_description(self, status_code):
         """Retorna una descripción amigable del código de estado HTTP"""
@@ -382,10 +402,13 @@ class ReportesTests(TestCase):
         print("-"*50)
 
     def test_producto_bajo_stock(self):
+        from inventario.alertas import reconstruir_alertas
+        from inventario.models import estacion_del_mes
+        from .views import obtener_datos_reporte
         print("\n" + "="*50)
         print("TEST: PRODUCTO BAJO STOCK EN REPORTE")
         print("="*50)
-        print("• Creando producto con stock bajo...")
+        print("• Creando productos con stock bajo...")
         
         producto_bajo = Producto.objects.create(
             nombre="Producto Bajo Stock",
@@ -394,16 +417,375 @@ class ReportesTests(TestCase):
             stock=2,
             umbral_stock_invierno=10
         )
+        # Bajo el umbral de verano pero no el de invierno
+        Producto.objects.create(
+            nombre="Producto Estacional",
+            categoria="Madera",
+            precio=Decimal("1000"),
+            stock=8,
+            umbral_stock_invierno=5,
+            umbral_stock_verano=10
+        )
+        reconstruir_alertas()
         
         print(f"  → Nombre: {producto_bajo.nombre}")
         print(f"  → Stock: {producto_bajo.stock}")
         print(f"  → Umbral: {producto_bajo.umbral_stock_invierno}")
-        
-        # Verificar que está bajo mínimo
-        bajo_minimo = producto_bajo.stock <= producto_bajo.umbral_stock_invierno
-        print(f"  → ¿Está bajo mínimo?: {bajo_minimo}")
-        
-        self.assertTrue(bajo_minimo)
+
+        estacion = estacion_del_mes(timezone.localtime().month)
+        data = obtener_datos_reporte('productos_bajo_stock', timezone.now(), timezone.now())
+        nombres = [producto['nombre'] for producto in data['productos']]
+        print(f"  → Estación actual: {estacion}")
+        print(f"  → Productos en el reporte: {nombres}")
+
+        # El producto bajo stock está bajo ambos umbrales; el estacional
+        # solo aparece en verano
+        self.assertIn("Producto Bajo Stock", nombres)
+        self.assertEqual("Producto Estacional" in nombres, estacion == 'verano')
+        for producto in data['productos']:
+            self.assertLessEqual(producto['stock'], producto['umbral'])
+
+        print("\n• Un producto sin umbral (como los de registrar_producto) se informa aparte...")
+        Producto.objects.create(
+            nombre="Producto Sin Umbral", categoria="Otros", precio=Decimal("500"), stock=0,
+            umbral_stock_invierno=0, umbral_stock_verano=0
+        )
+        data = obtener_datos_reporte('productos_bajo_stock', timezone.now(), timezone.now())
+        print(f"  → Sin umbral: {data['productos_sin_umbral']}")
+        self.assertNotIn("Producto Sin Umbral", [producto['nombre'] for producto in data['productos']])
+        self.assertEqual(data['productos_sin_umbral'], 1)
+        response = self.client.get(reverse('reportes:generar'), {
+            'tipo': 'productos_bajo_stock', 'formato': 'csv',
+            'fecha_inicio': timezone.localdate().isoformat(), 'fecha_fin': timezone.localdate().isoformat(),
+        })
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn("1 producto(s) sin umbral configurado", contenido)
+        print("-"*50)
+
+    def test_hechos_con_precios_float_del_carrito(self):
+        import json
+        print("\n" + "="*50)
+        print("TEST: HECHOS CON PRECIOS FLOAT DEL CARRITO")
+        print("="*50)
+        print("• Registrando una venta con precio 0.1 (float en el JSON)...")
+        self.client.post(reverse('ventas:registrar_venta'), {
+            'carrito': json.dumps([{'id': str(self.producto.id), 'cantidad': 7, 'precio_uni': 0.1}]),
+        })
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT CAST(ingresos AS TEXT) FROM {HechoDiarioProducto._meta.db_table} WHERE producto_id = %s",
+                [self.producto.id]
+            )
+            guardado = cursor.fetchone()[0]
+            cursor.execute(f"SELECT CAST(total_ventas AS TEXT) FROM {HechoDiario._meta.db_table}")
+            total = cursor.fetchone()[0]
+        print(f"  → Ingresos guardados: {guardado}, total del día: {total}")
+        self.assertEqual(Decimal(guardado), Decimal('0.7'))
+        self.assertEqual(Decimal(total), Decimal('0.7'))
+        print("-"*50)
+
+    def test_hechos_diarios_se_actualizan_con_ventas_y_compras(self):
+        import json
+        print("\n" + "="*50)
+        print("TEST: HECHOS DIARIOS DE VENTAS Y COMPRAS")
+        print("="*50)
+        print("• Registrando una compra y dos ventas...")
+        self.client.post(reverse('compras:registrar_compra'), {
+            'proveedor': 'Proveedor Hechos',
+            'carrito': json.dumps([{'id': str(self.producto.id), 'cantidad': 10, 'precio_uni': 800}]),
+        })
+        for cantidad in (2, 3):
+            self.client.post(reverse('ventas:registrar_venta'), {
+                'carrito': json.dumps([{'id': str(self.producto.id), 'cantidad': cantidad, 'precio_uni': 1000}]),
+            })
+
+        hoy = timezone.localdate()
+        dia = HechoDiario.objects.get(fecha=hoy)
+        hecho = HechoDiarioProducto.objects.get(fecha=hoy, producto=self.producto)
+        print(f"  → Día: {dia.num_ventas} ventas por ${dia.total_ventas}, {dia.num_compras} compras por ${dia.total_compras}")
+        print(f"  → Producto: {hecho.unidades_vendidas} vendidas, {hecho.unidades_compradas} compradas")
+        self.assertEqual((dia.num_ventas, dia.total_ventas), (2, Decimal('5000')))
+        self.assertEqual((dia.num_compras, dia.total_compras), (1, Decimal('8000')))
+        self.assertEqual((hecho.unidades_vendidas, hecho.ingresos, hecho.lineas_venta), (5, Decimal('5000'), 2))
+        self.assertEqual((hecho.unidades_compradas, hecho.costo_compras, hecho.lineas_compra), (10, Decimal('8000'), 1))
+
+        print("• Reconstruyendo los hechos desde los detalles...")
+        esperado = list(HechoDiarioProducto.objects.values(
+            'fecha', 'producto', 'unidades_vendidas', 'ingresos', 'unidades_compradas', 'costo_compras'
+        ))
+        self.assertEqual(reconstruir_hechos(), (1, 1))
+        self.assertEqual(list(HechoDiarioProducto.objects.values(
+            'fecha', 'producto', 'unidades_vendidas', 'ingresos', 'unidades_compradas', 'costo_compras'
+        )), esperado)
+        self.assertEqual(HechoDiario.objects.get(fecha=hoy).total_ventas, Decimal('5000'))
+        print("  → La reconstrucción coincide con lo acumulado")
+        print("-"*50)
+
+    def test_hechos_diarios_al_eliminar_o_editar_una_venta(self):
+        import json
+        print("\n" + "="*50)
+        print("TEST: HECHOS DIARIOS AL ELIMINAR O EDITAR UNA VENTA")
+        print("="*50)
+        print("• Registrando dos ventas...")
+        for cantidad in (2, 3):
+            self.client.post(reverse('ventas:registrar_venta'), {
+                'carrito': json.dumps([{'id': str(self.producto.id), 'cantidad': cantidad, 'precio_uni': 1000}]),
+            })
+        hoy = timezone.localdate()
+        self.assertEqual(HechoDiario.objects.get(fecha=hoy).num_ventas, 2)
+
+        print("\n• Eliminando la primera (como desde el admin)...")
+        with self.captureOnCommitCallbacks(execute=True):
+            Movimiento.objects.order_by('id_mov').first().delete()
+        dia = HechoDiario.objects.get(fecha=hoy)
+        hecho = HechoDiarioProducto.objects.get(fecha=hoy, producto=self.producto)
+        print(f"  → Día: {dia.num_ventas} venta(s) por ${dia.total_ventas}; producto: {hecho.unidades_vendidas} vendidas")
+        self.assertEqual((dia.num_ventas, dia.total_ventas), (1, Decimal('3000')))
+        self.assertEqual((hecho.unidades_vendidas, hecho.ingresos, hecho.lineas_venta), (3, Decimal('3000'), 1))
+
+        print("\n• Editando la cantidad de un detalle...")
+        detalle = DetalleVenta.objects.get()
+        detalle.cantidad = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            detalle.save()
+        hecho = HechoDiarioProducto.objects.get(fecha=hoy, producto=self.producto)
+        print(f"  → Producto: {hecho.unidades_vendidas} vendidas por ${hecho.ingresos}")
+        self.assertEqual((hecho.unidades_vendidas, hecho.ingresos), (4, Decimal('4000')))
+        print("-"*50)
+
+    def test_generador_reporte_csv(self):
+        print("\n" + "="*50)
+        print("TEST: GENERAR REPORTE CSV EN STREAMING")
+        print("="*50)
+        venta = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal('3000'))
+        DetalleVenta.objects.create(id_mov=venta, id_prod=self.producto, precio_uni=Decimal('1000'), cantidad=3)
+        compra = Compra.objects.create(rut_usu=self.usuario, proveedor="Proveedor CSV", total=Decimal('800'))
+        DetalleCompra.objects.create(id_compra=compra, id_prod=self.producto, precio_uni=Decimal('800'), cantidad=1)
+
+        response = self.client.get(reverse('reportes:generar'), {
+            'formato': 'csv',
+            'tipo': 'completo',
+            'fecha_inicio': (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'fecha_fin': timezone.now().strftime('%Y-%m-%d'),
+        })
+        print(f"  → Status: {self.get_status_description(response.status_code)}")
+        print(f"  → Content-Type: {response.get('Content-Type')}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        lineas = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        print(f"  → Líneas generadas: {len(lineas)}")
+        self.assertIn('Reporte de Ventas', lineas)
+        self.assertTrue(any(linea.startswith('Número de Compras;') for linea in lineas))
+        self.assertTrue(any(';Producto Test;3;1000.00;3000' in linea for linea in lineas))
+        self.assertTrue(any(linea.endswith(';Proveedor CSV') for linea in lineas))
+        print("-"*50)
+
+    def test_reporte_excel_memoria_constante(self):
+        import io
+        import zipfile
+        print("\n" + "="*50)
+        print("TEST: EXCEL EN MEMORIA CONSTANTE")
+        print("="*50)
+        venta = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal('2000'))
+        DetalleVenta.objects.create(id_mov=venta, id_prod=self.producto, precio_uni=Decimal('1000'), cantidad=2)
+
+        response = self.client.get(reverse('reportes:generar'), {
+            'formato': 'excel',
+            'tipo': 'ventas',
+            'fecha_inicio': (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'fecha_fin': timezone.now().strftime('%Y-%m-%d'),
+        })
+        print(f"  → Status: {self.get_status_description(response.status_code)}")
+        print(f"  → Content-Disposition: {response['Content-Disposition']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('reporte.xlsx', response['Content-Disposition'])
+
+        libro = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+        print(f"  → Hojas: {[n for n in libro.namelist() if n.startswith('xl/worksheets/')]}")
+        self.assertIn('Producto Test', hoja)
+        print("-"*50)
+
+    def test_trabajos_interrumpidos_y_de_otros_usuarios(self):
+        from io import StringIO
+        from django.core.management import call_command
+        print("\n" + "="*50)
+        print("TEST: TRABAJOS INTERRUMPIDOS Y DE OTROS USUARIOS")
+        print("="*50)
+        parametros = {
+            'formato': 'pdf',
+            'tipo': 'ventas',
+            'fecha_inicio': (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'fecha_fin': timezone.now().strftime('%Y-%m-%d'),
+        }
+        print("• Un trabajo quedó en proceso hace dos horas (proceso caído)...")
+        self.client.post(reverse('reportes:solicitar'), parametros)
+        colgado = ReportJob.objects.get()
+        ReportJob.objects.filter(pk=colgado.pk).update(
+            estado=ReportJob.EN_PROCESO, iniciado=timezone.now() - timedelta(hours=2)
+        )
+        response = self.client.post(reverse('reportes:solicitar'), parametros)
+        nuevo = ReportJob.objects.exclude(pk=colgado.pk).get()
+        print(f"  → La nueva solicitud crea el trabajo #{nuevo.pk} en vez de reutilizar #{colgado.pk}")
+        self.assertRedirects(response, reverse('reportes:trabajo', args=[nuevo.pk]), fetch_redirect_response=False)
+
+        print("• La página del trabajo colgado deja de esperarlo...")
+        estado = self.client.get(reverse('reportes:trabajo', args=[colgado.pk]), {'formato': 'json'}).json()
+        print(f"  → Estado: {estado['estado']} ({estado['error']})")
+        self.assertEqual(estado['estado'], ReportJob.FALLIDO)
+
+        print("• El comando marca los interrumpidos y genera los pendientes...")
+        ReportJob.objects.filter(pk=nuevo.pk).update(
+            estado=ReportJob.EN_PROCESO, iniciado=timezone.now() - timedelta(hours=2)
+        )
+        salida = StringIO()
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            call_command('procesar_reportes_pendientes', stdout=salida)
+        print(f"  → {salida.getvalue().strip()}")
+        self.assertIn('1 reporte(s) interrumpido(s)', salida.getvalue())
+        self.assertEqual(ReportJob.objects.get(pk=nuevo.pk).estado, ReportJob.FALLIDO)
+
+        print("• Otro usuario no puede ver ni descargar el trabajo...")
+        ReportJob.objects.filter(pk=nuevo.pk).update(estado=ReportJob.LISTO)
+        otro = Usuario.objects.create(RutUsuua="98765432-1", Nombre="Otro", ApePa="Usuario", Telefono="1")
+        otro.set_password("otra123")
+        otro.save()
+        cliente = Client()
+        cliente.login(username=otro.RutUsuua, password="otra123")
+        estado = cliente.get(reverse('reportes:trabajo', args=[nuevo.pk]))
+        descarga = cliente.get(reverse('reportes:descargar', args=[nuevo.pk]))
+        print(f"  → Estado: {estado.status_code}, descarga: {descarga.status_code}")
+        self.assertEqual(estado.status_code, 404)
+        self.assertEqual(descarga.status_code, 404)
+        print("-"*50)
+
+    def test_reporte_en_segundo_plano(self):
+        print("\n" + "="*50)
+        print("TEST: REPORTE EN SEGUNDO PLANO")
+        print("="*50)
+        parametros = {
+            'formato': 'csv',
+            'tipo': 'ventas',
+            'fecha_inicio': (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'fecha_fin': timezone.now().strftime('%Y-%m-%d'),
+        }
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media,
+            REPORTES_TRABAJOS={'MODO': 'sincrono', 'PROCESOS': 1, 'DEDUPLICAR': True}
+        ):
+            print("• Solicitando el reporte...")
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('reportes:solicitar'), parametros)
+            trabajo = ReportJob.objects.get()
+            print(f"  → Redirección: {response.url}")
+            self.assertRedirects(response, reverse('reportes:trabajo', args=[trabajo.pk]))
+
+            estado = self.client.get(reverse('reportes:trabajo', args=[trabajo.pk]), {'formato': 'json'}).json()
+            print(f"  → Estado: {estado['estado']}")
+            self.assertEqual(estado['estado'], ReportJob.LISTO)
+            self.assertEqual(estado['descarga'], reverse('reportes:descargar', args=[trabajo.pk]))
+
+            descarga = self.client.get(estado['descarga'])
+            contenido = b''.join(descarga.streaming_content).decode('utf-8-sig')
+            print(f"  → Descarga: {descarga['Content-Disposition']}")
+            self.assertIn('reporte.csv', descarga['Content-Disposition'])
+            self.assertIn('Reporte de Ventas', contenido)
+            descarga.close()
+
+        print("• Solicitando dos veces el mismo reporte mientras está en cola...")
+        primero = self.client.post(reverse('reportes:solicitar'), dict(parametros, formato='pdf'))
+        segundo = self.client.post(reverse('reportes:solicitar'), dict(parametros, formato='pdf'))
+        print(f"  → Trabajos en cola: {ReportJob.objects.filter(estado=ReportJob.EN_COLA).count()}")
+        self.assertEqual(primero.url, segundo.url)
+        self.assertEqual(ReportJob.objects.filter(estado=ReportJob.EN_COLA).count(), 1)
+
+        print("• Un error al generar el reporte mantiene la lista de trabajos...")
+        response = self.client.get(reverse('reportes:generar'), dict(parametros, fecha_inicio='no-es-fecha'))
+        print(f"  → Trabajos mostrados: {len(response.context['trabajos'])}")
+        self.assertContains(response, 'Error al generar el reporte')
+        self.assertEqual(len(response.context['trabajos']), ReportJob.objects.count())
+        print("-"*50)
+
+    def test_cache_de_archivos_de_reportes(self):
+        print("\n" + "="*50)
+        print("TEST: CACHÉ DE ARCHIVOS DE REPORTES")
+        print("="*50)
+        parametros = {
+            'formato': 'csv',
+            'tipo': 'ventas',
+            'fecha_inicio': (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d'),
+            'fecha_fin': timezone.now().strftime('%Y-%m-%d'),
+        }
+        venta = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal('2000'))
+        DetalleVenta.objects.create(id_mov=venta, id_prod=self.producto, cantidad=2, precio_uni=Decimal('1000'))
+
+        print("• Generando el reporte por primera vez...")
+        primera = self.client.get(reverse('reportes:generar'), parametros)
+        contenido_primera = b''.join(primera.streaming_content)
+        print(f"  → Archivos en caché: {len(os.listdir(self._directorio_cache))}")
+        self.assertEqual(len(os.listdir(self._directorio_cache)), 1)
+
+        print("• Repitiendo la misma solicitud...")
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.client.get(reverse('reportes:generar'), parametros)
+        contenido_segunda = b''.join(segunda.streaming_content)
+        segunda.close()
+        print(f"  → Consultas: {len(consultas)}")
+        self.assertIsInstance(segunda, FileResponse)
+        self.assertEqual(contenido_primera, contenido_segunda)
+        self.assertIn('reporte.csv', segunda['Content-Disposition'])
+
+        print("• Registrando otra venta en el rango...")
+        otra = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal('5000'))
+        DetalleVenta.objects.create(id_mov=otra, id_prod=self.producto, cantidad=5, precio_uni=Decimal('1000'))
+        tercera = self.client.get(reverse('reportes:generar'), parametros)
+        contenido_tercera = b''.join(tercera.streaming_content)
+        print(f"  → Contenido distinto: {contenido_tercera != contenido_primera}")
+        self.assertNotIsInstance(tercera, FileResponse)
+        self.assertNotEqual(contenido_primera, contenido_tercera)
+        print("-"*50)
+
+    def test_pdf_con_detalle_por_tramos_y_maximo_de_filas(self):
+        from unittest import mock
+        from reportlab import rl_config
+        from . import views
+        print("\n" + "="*50)
+        print("TEST: PDF CON DETALLE POR TRAMOS")
+        print("="*50)
+        venta = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal('5000'))
+        for _ in range(5):
+            DetalleVenta.objects.create(id_mov=venta, id_prod=self.producto, precio_uni=Decimal('1000'), cantidad=1)
+        data = views.obtener_datos_reporte(
+            'ventas', timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        )
+
+        def generar():
+            response = views.generar_pdf(data)
+            contenido = b''.join(response.streaming_content)
+            response.close()
+            return contenido
+
+        # Sin compresión el texto de las celdas queda legible en el PDF
+        with mock.patch.object(rl_config, 'pageCompression', 0):
+            print("• Generando el detalle en tramos de 2 filas...")
+            with mock.patch.object(views, 'FILAS_POR_TABLA_PDF', 2):
+                contenido = generar()
+            print(f"  → Filas de detalle: {contenido.count(b'(Producto Test)')}")
+            print(f"  → Encabezados: {contenido.count(b'(Producto)')}")
+            self.assertEqual(contenido.count(b'(Producto Test)'), 5)
+            self.assertEqual(contenido.count(b'(Producto)'), 3)
+            self.assertIn(b'($5,000)', contenido)
+
+            print("• Generando con un máximo de 3 filas...")
+            with mock.patch.object(views, 'MAXIMO_FILAS_PDF', 3):
+                contenido = generar()
+            print(f"  → Filas de detalle: {contenido.count(b'(Producto Test)')}")
+            self.assertEqual(contenido.count(b'(Producto Test)'), 0)
+            self.assertIn(b'Excel o CSV', contenido)
+            self.assertIn(b'($5,000)', contenido)
         print("-"*50)
 
     def tearDown(self):
@@ -0,0 +1,189 @@
+"""
+Reportes en segundo plano.
+
+solicitar_reporte crea un ReportJob y, al confirmar la transacción, lo
+entrega a un pool local de procesos que escribe el archivo en MEDIA_ROOT.
+La página del trabajo consulta su estado hasta que se puede descargar.
+
+Se configura con settings.REPORTES_TRABAJOS:
+    MODO: 'procesos' (pool local) o 'sincrono' (en el mismo proceso; tests)
+    PROCESOS: reportes generándose a la vez como máximo
+    DEDUPLICAR: reutiliza un trabajo en cola o en proceso del mismo usuario
+        con los mismos parámetros
+    TIEMPO_MAXIMO: segundos que puede estar un trabajo en proceso; pasado
+        ese tiempo se da por interrumpido (proceso caído o servidor reiniciado)
+
+Si el servidor se reinicia con trabajos en cola, el comando
+procesar_reportes_pendientes los genera y marca como fallidos los que
+quedaron en proceso más de TIEMPO_MAXIMO.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from logger import buffer
+from .models import ReportJob
+from .cache_archivos import EXTENSIONES
+from . import proceso_trabajos
+
+log = logging.getLogger(__name__)
+
+CONFIGURACION_POR_DEFECTO = {
+    'MODO': 'procesos',
+    'PROCESOS': 2,
+    'DEDUPLICAR': True,
+    'TIEMPO_MAXIMO': 30 * 60,
+}
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'REPORTES_TRABAJOS', {})}
+
+
+def clave_parametros(tipo_reporte, formato, fecha_inicio, fecha_fin):
+    parametros = [tipo_reporte, formato, fecha_inicio.isoformat(), fecha_fin.isoformat()]
+    return hashlib.sha256(json.dumps(parametros).encode()).hexdigest()
+
+
+def _limite_en_proceso():
+    return timezone.now() - timedelta(seconds=configuracion()['TIEMPO_MAXIMO'])
+
+
+def interrumpidos():
+    """Trabajos en proceso desde hace más de TIEMPO_MAXIMO."""
+    return ReportJob.objects.filter(estado=ReportJob.EN_PROCESO, iniciado__lt=_limite_en_proceso())
+
+
+def marcar_interrumpidos():
+    """Marca como fallidos los trabajos interrumpidos. Devuelve cuántos."""
+    return interrumpidos().update(
+        estado=ReportJob.FALLIDO,
+        error='La generación se interrumpió (tiempo máximo excedido). Solicite el reporte nuevamente.',
+        terminado=timezone.now(),
+    )
+
+
+def solicitar_reporte(usuario, tipo_reporte, formato, fecha_inicio, fecha_fin):
+    """
+    Crea el trabajo del reporte (o reutiliza uno idéntico en curso del mismo
+    usuario) y lo encola al confirmar la transacción. Devuelve (trabajo, creado).
+    """
+    clave = clave_parametros(tipo_reporte, formato, fecha_inicio, fecha_fin)
+    usuario = usuario if getattr(usuario, 'is_authenticated', False) else None
+    if configuracion()['DEDUPLICAR']:
+        # Un trabajo en proceso más allá del tiempo máximo no se reutiliza
+        existente = ReportJob.objects.filter(
+            Q(estado=ReportJob.EN_COLA) | Q(estado=ReportJob.EN_PROCESO, iniciado__gte=_limite_en_proceso()),
+            clave=clave,
+            usuario=usuario,
+        ).first()
+        if existente is not None:
+            return existente, False
+
+    trabajo = ReportJob.objects.create(
+        tipo_reporte=tipo_reporte,
+        formato=formato,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        clave=clave,
+        usuario=usuario,
+    )
+    transaction.on_commit(lambda: _encolar(trabajo.pk))
+    return trabajo, True
+
+
+def _encolar(trabajo_id):
+    if configuracion()['MODO'] == 'sincrono':
+        ejecutar(trabajo_id)
+    else:
+        _pool().submit(proceso_trabajos.ejecutar, trabajo_id)
+
+
+def ejecutar(trabajo_id):
+    """Genera el archivo del trabajo si sigue en cola. Corre en un proceso del pool."""
+    from .views import generar_archivo, rango_reporte
+
+    # Tomar el trabajo de forma atómica: otro proceso pudo haberlo tomado
+    tomado = ReportJob.objects.filter(pk=trabajo_id, estado=ReportJob.EN_COLA).update(
+        estado=ReportJob.EN_PROCESO,
+        iniciado=timezone.now()
+    )
+    if not tomado:
+        return
+    trabajo = ReportJob.objects.get(pk=trabajo_id)
+
+    try:
+        fecha_inicio, fecha_fin = rango_reporte(trabajo.fecha_inicio.isoformat(), trabajo.fecha_fin.isoformat())
+        response = generar_archivo(trabajo.tipo_reporte, trabajo.formato, fecha_inicio, fecha_fin)
+        partes = response.streaming_content if response.streaming else [response.content]
+        with tempfile.TemporaryFile() as temporal:
+            for parte in partes:
+                temporal.write(parte if isinstance(parte, bytes) else parte.encode())
+            response.close()
+            temporal.seek(0)
+            nombre = f'reporte_{trabajo.pk}.{EXTENSIONES[trabajo.formato]}'
+            trabajo.archivo.save(nombre, File(temporal), save=False)
+        trabajo.estado = ReportJob.LISTO
+    except Exception as e:
+        log.exception('No se pudo generar el reporte %s', trabajo_id)
+        trabajo.estado = ReportJob.FALLIDO
+        trabajo.error = str(e)
+        buffer.registrar(
+            message=f"Error al generar el reporte #{trabajo_id}: {e}",
+            level='error',
+            app='sistema',
+            user=trabajo.usuario
+        )
+    trabajo.terminado = timezone.now()
+    trabajo.save(update_fields=['estado', 'archivo', 'error', 'terminado'])
+
+
+def procesar_pendientes():
+    """
+    Marca como fallidos los trabajos interrumpidos y genera en este proceso
+    los que quedaron en cola. Devuelve (generados, interrumpidos).
+    """
+    fallidos = marcar_interrumpidos()
+    pendientes = list(
+        ReportJob.objects.filter(estado=ReportJob.EN_COLA).order_by('creado').values_list('pk', flat=True)
+    )
+    for trabajo_id in pendientes:
+        ejecutar(trabajo_id)
+    return len(pendientes), fallidos
+
+
+_pool_actual = None
+_bloqueo_pool = threading.Lock()
+
+
+def _pool():
+    global _pool_actual
+    with _bloqueo_pool:
+        if _pool_actual is None:
+            _pool_actual = ProcessPoolExecutor(
+                max_workers=configuracion()['PROCESOS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=proceso_trabajos.iniciar,
+            )
+            atexit.register(detener_pool)
+        return _pool_actual
+
+
+def detener_pool():
+    """Espera los reportes en curso y cierra el pool, si está activo."""
+    global _pool_actual
+    with _bloqueo_pool:
+        pool, _pool_actual = _pool_actual, None
+    if pool is not None:
+        pool.shutdown(wait=True)
@@ -5,4 +5,7 @@ app_name = 'reportes'
 
 urlpatterns = [
     path('generar/', views.generar_reporte, name='generar'),
+    path('solicitar/', views.solicitar_reporte, name='solicitar'),
+    path('trabajos/<int:trabajo_id>/', views.trabajo_reporte, name='trabajo'),
+    path('trabajos/<int:trabajo_id>/descargar/', views.descargar_reporte, name='descargar'),
 ] 
\ No newline at end of file
@@ -1,140 +1,332 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import StreamingHttpResponse, FileResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from datetime import datetime, timedelta
-from django.db.models import Sum, Count, F
+from django.db.models import F, Sum, Count
 from django.utils import timezone
-from django.conf import settings
 import xlsxwriter
-import io
-from reportlab.pdfgen import canvas
+import csv
+import tempfile
+from itertools import islice
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Flowable
 import pytz
 
-from ventas.models import Movimiento, Detalle
-from compras.models import Compra, DetalleCompra
+from ventas.models import Detalle
+from compras.models import DetalleCompra
 from inventario.models import Producto
+from .hechos import resumen_periodo
+from .models import ReportJob
+from .cache_archivos import obtener_o_generar
+from . import trabajos
+
+def texto_sin_umbral(cantidad):
+    return f"{cantidad} producto(s) sin umbral configurado para la estación actual (no se incluyen)"
+
+def obtener_datos_reporte(tipo_reporte, fecha_inicio, fecha_fin):
+    """Datos del reporte; los detalles quedan como querysets sin evaluar."""
+    # Datos base
+    data = {
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+        'tipo_reporte': tipo_reporte
+    }
+
+    # Los resúmenes se leen de los hechos diarios (un registro por día)
+    resumen = resumen_periodo(timezone.localdate(fecha_inicio), timezone.localdate(fecha_fin))
+
+    # Agregar datos según el tipo de reporte
+    if tipo_reporte in ['completo', 'ventas']:
+        data.update({
+            'ventas': {
+                'total_ventas': resumen['total_ventas'],
+                'num_ventas': resumen['num_ventas']
+            },
+            'detalles_ventas': Detalle.objects.filter(
+                id_mov__fecha__range=[fecha_inicio, fecha_fin]
+            ).select_related('id_mov', 'id_prod').values(
+                'id_mov__fecha',
+                'id_prod__nombre',
+                'cantidad',
+                'precio_uni'
+            ).annotate(
+                fecha=F('id_mov__fecha'),
+                producto=F('id_prod__nombre'),
+                subtotal=F('precio_uni') * F('cantidad')
+            )
+        })
+
+    if tipo_reporte in ['completo', 'compras']:
+        data.update({
+            'compras': {
+                'total_compras': resumen['total_compras'],
+                'num_compras': resumen['num_compras']
+            },
+            'detalles_compras': DetalleCompra.objects.filter(
+                id_compra__fecha__range=[fecha_inicio, fecha_fin]
+            ).select_related('id_compra', 'id_prod').values(
+                'id_compra__fecha',
+                'id_prod__nombre',
+                'cantidad',
+                'precio_uni',
+                'id_compra__proveedor'
+            ).annotate(
+                fecha=F('id_compra__fecha'),
+                producto=F('id_prod__nombre'),
+                proveedor=F('id_compra__proveedor'),
+                subtotal=F('precio_uni') * F('cantidad')
+            )
+        })
+
+    if tipo_reporte in ['completo', 'productos_bajo_stock']:
+        data.update({
+            # Umbral de la estación actual calculado en la base; solo se
+            # revisan los productos del índice StockAlerta
+            'productos': Producto.objects.bajo_umbral(
+                timezone.localtime().month
+            ).values(
+                'nombre', 
+                'stock', 
+                'precio',
+                'umbral'
+            ).order_by('stock'),
+            # Sin umbral no se puede decidir si están bajo stock: se informa
+            # cuántos quedan fuera del reporte
+            'productos_sin_umbral': Producto.objects.sin_umbral(timezone.localtime().month).count(),
+        })
+
+    return data
 
 @login_required
 def generar_reporte(request):
     # Si es una petición GET sin parámetros, mostrar el formulario
     if not request.GET.get('formato'):
-        return render(request, 'reportes/generar_reporte.html')
+        return render(request, 'reportes/generar_reporte.html', {
+            'trabajos': _trabajos_recientes(request.user)
+        })
 
     # Si hay parámetros, generar el reporte
     try:
-        # Configurar zona horaria de Chile
-        chile_tz = pytz.timezone('America/Santiago')
-        
-        # Convertir fechas
-        fecha_inicio = request.GET.get('fecha_inicio')
-        fecha_fin = request.GET.get('fecha_fin')
-        
-        if fecha_inicio:
-            # Convertir a datetime y agregar hora inicial del día
-            fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-            fecha_inicio = fecha_inicio.replace(hour=0, minute=0, second=0)
-            fecha_inicio = chile_tz.localize(fecha_inicio)
-        else:
-            # Usar fecha actual menos 30 días
-            fecha_inicio = timezone.localtime(timezone.now(), timezone=chile_tz) - timedelta(days=30)
-            fecha_inicio = fecha_inicio.replace(hour=0, minute=0, second=0)
-
-        if fecha_fin:
-            # Convertir a datetime y agregar hora final del día
-            fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d')
-            fecha_fin = fecha_fin.replace(hour=23, minute=59, second=59)
-            fecha_fin = chile_tz.localize(fecha_fin)
-        else:
-            # Usar fecha actual
-            fecha_fin = timezone.localtime(timezone.now(), timezone=chile_tz)
-            fecha_fin = fecha_fin.replace(hour=23, minute=59, second=59)
-
+        fecha_inicio, fecha_fin = rango_reporte(
+            request.GET.get('fecha_inicio'),
+            request.GET.get('fecha_fin')
+        )
         tipo_reporte = request.GET.get('tipo', 'completo')
         formato = request.GET.get('formato', 'pdf')
 
-        # Datos base
-        data = {
-            'fecha_inicio': fecha_inicio,
-            'fecha_fin': fecha_fin,
-            'tipo_reporte': tipo_reporte
-        }
-
-        # Agregar datos según el tipo de reporte
-        if tipo_reporte in ['completo', 'ventas']:
-            data.update({
-                'ventas': Movimiento.objects.filter(
-                    fecha__range=[fecha_inicio, fecha_fin]
-                ).aggregate(
-                    total_ventas=Sum('total'),
-                    num_ventas=Count('id_mov')
-                ),
-                'detalles_ventas': Detalle.objects.filter(
-                    id_mov__fecha__range=[fecha_inicio, fecha_fin]
-                ).select_related('id_mov', 'id_prod').values(
-                    'id_mov__fecha',
-                    'id_prod__nombre',
-                    'cantidad',
-                    'precio_uni'
-                ).annotate(
-                    fecha=F('id_mov__fecha'),
-                    producto=F('id_prod__nombre'),
-                    subtotal=F('precio_uni') * F('cantidad')
-                )
-            })
-
-        if tipo_reporte in ['completo', 'compras']:
-            data.update({
-                'compras': Compra.objects.filter(
-                    fecha__range=[fecha_inicio, fecha_fin]
-                ).aggregate(
-                    total_compras=Sum('total'),
-                    num_compras=Count('id_compra')
-                ),
-                'detalles_compras': DetalleCompra.objects.filter(
-                    id_compra__fecha__range=[fecha_inicio, fecha_fin]
-                ).select_related('id_compra', 'id_prod').values(
-                    'id_compra__fecha',
-                    'id_prod__nombre',
-                    'cantidad',
-                    'precio_uni',
-                    'id_compra__proveedor'
-                ).annotate(
-                    fecha=F('id_compra__fecha'),
-                    producto=F('id_prod__nombre'),
-                    proveedor=F('id_compra__proveedor'),
-                    subtotal=F('precio_uni') * F('cantidad')
-                )
-            })
-
-        if tipo_reporte in ['completo', 'productos_bajo_stock']:
-            data.update({
-                'productos': Producto.objects.filter(
-                    stock__lte=F('umbral_stock_invierno')
-                ).values(
-                    'nombre', 
-                    'stock', 
-                    'precio',
-                    'umbral_stock_invierno'
-                ).order_by('stock')
-            })
+        return generar_archivo(tipo_reporte, formato, fecha_inicio, fecha_fin)
+
+    except Exception as e:
+        return render(request, 'reportes/generar_reporte.html', {
+            'error': f'Error al generar el reporte: {str(e)}',
+            'trabajos': _trabajos_recientes(request.user)
+        })
+
+@login_required
+@require_POST
+def solicitar_reporte(request):
+    tipo_reporte = request.POST.get('tipo', 'completo')
+    formato = request.POST.get('formato', 'pdf')
+    if tipo_reporte not in dict(ReportJob.TIPO_CHOICES) or formato not in dict(ReportJob.FORMATO_CHOICES):
+        return render(request, 'reportes/generar_reporte.html', {
+            'error': 'Tipo o formato de reporte inválido',
+            'trabajos': _trabajos_recientes(request.user)
+        })
+    try:
+        fecha_inicio, fecha_fin = rango_reporte(
+            request.POST.get('fecha_inicio'),
+            request.POST.get('fecha_fin')
+        )
+    except ValueError:
+        return render(request, 'reportes/generar_reporte.html', {
+            'error': 'Fechas inválidas',
+            'trabajos': _trabajos_recientes(request.user)
+        })
+
+    trabajo, _ = trabajos.solicitar_reporte(
+        request.user, tipo_reporte, formato,
+        timezone.localdate(fecha_inicio), timezone.localdate(fecha_fin)
+    )
+    return redirect('reportes:trabajo', trabajo_id=trabajo.pk)
+
+@login_required
+def trabajo_reporte(request, trabajo_id):
+    trabajo = get_object_or_404(ReportJob, pk=trabajo_id, usuario=request.user)
+    # Si quedó en proceso más del tiempo máximo, la página deja de esperarlo
+    if trabajo.estado == ReportJob.EN_PROCESO and trabajos.marcar_interrumpidos():
+        trabajo.refresh_from_db()
+    # La página consulta esta misma vista con ?formato=json hasta que termina
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'id': trabajo.pk,
+            'estado': trabajo.estado,
+            'estado_display': trabajo.get_estado_display(),
+            'error': trabajo.error,
+            'descarga': (
+                reverse('reportes:descargar', args=[trabajo.pk])
+                if trabajo.estado == ReportJob.LISTO else None
+            ),
+        })
+    return render(request, 'reportes/trabajo_reporte.html', {'trabajo': trabajo})
+
+@login_required
+def descargar_reporte(request, trabajo_id):
+    trabajo = get_object_or_404(ReportJob, pk=trabajo_id, usuario=request.user, estado=ReportJob.LISTO)
+    return FileResponse(
+        trabajo.archivo.open('rb'),
+        as_attachment=True,
+        filename=f'reporte.{trabajos.EXTENSIONES[trabajo.formato]}'
+    )
+
+def _trabajos_recientes(usuario):
+    return ReportJob.objects.filter(usuario=usuario)[:10]
+
+def rango_reporte(fecha_inicio, fecha_fin):
+    """
+    Convierte las fechas del formulario ('AAAA-MM-DD' o vacías) en el rango
+    de datetimes del reporte: por defecto, los últimos 30 días hasta hoy.
+    """
+    # Configurar zona horaria de Chile
+    chile_tz = pytz.timezone('America/Santiago')
+
+    if fecha_inicio:
+        # Convertir a datetime y agregar hora inicial del día
+        fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d')
+        fecha_inicio = fecha_inicio.replace(hour=0, minute=0, second=0)
+        fecha_inicio = chile_tz.localize(fecha_inicio)
+    else:
+        # Usar fecha actual menos 30 días
+        fecha_inicio = timezone.localtime(timezone.now(), timezone=chile_tz) - timedelta(days=30)
+        fecha_inicio = fecha_inicio.replace(hour=0, minute=0, second=0)
 
+    if fecha_fin:
+        # Convertir a datetime y agregar hora final del día
+        fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d')
+        fecha_fin = fecha_fin.replace(hour=23, minute=59, second=59)
+        fecha_fin = chile_tz.localize(fecha_fin)
+    else:
+        # Usar fecha actual
+        fecha_fin = timezone.localtime(timezone.now(), timezone=chile_tz)
+        fecha_fin = fecha_fin.replace(hour=23, minute=59, second=59)
+
+    return fecha_inicio, fecha_fin
+
+def generar_archivo(tipo_reporte, formato, fecha_inicio, fecha_fin):
+    """
+    Respuesta con el archivo del reporte en el formato pedido (pdf, excel o
+    csv), desde la caché en disco si los datos del rango no cambiaron.
+    """
+    if formato not in ('excel', 'csv'):
+        formato = 'pdf'
+
+    def generar():
+        data = obtener_datos_reporte(tipo_reporte, fecha_inicio, fecha_fin)
         if formato == 'excel':
             return generar_excel(data)
+        elif formato == 'csv':
+            return generar_csv(data)
         else:
             return generar_pdf(data)
 
-    except Exception as e:
-        return render(request, 'reportes/generar_reporte.html', {
-            'error': f'Error al generar el reporte: {str(e)}'
-        })
+    return obtener_o_generar(tipo_reporte, formato, fecha_inicio, fecha_fin, generar)
+
+class _Eco:
+    """Pseudo archivo para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+# Filas leídas de la base por vez al exportar CSV
+FILAS_POR_LOTE_CSV = 2000
+
+
+def _filas_csv(data):
+    chile_tz = pytz.timezone('America/Santiago')
+
+    def fecha_local(valor):
+        return valor.astimezone(chile_tz).strftime("%d/%m/%Y %H:%M")
+
+    if data['tipo_reporte'] != 'productos_bajo_stock':
+        yield ['Período', fecha_local(data['fecha_inicio']), fecha_local(data['fecha_fin'])]
+        yield []
+
+    if data['tipo_reporte'] in ['completo', 'ventas'] and 'ventas' in data:
+        yield ['Reporte de Ventas']
+        yield ['Total de Ventas', data['ventas']['total_ventas'] or 0]
+        yield ['Número de Ventas', data['ventas']['num_ventas'] or 0]
+        yield ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal']
+        for detalle in data['detalles_ventas'].iterator(chunk_size=FILAS_POR_LOTE_CSV):
+            yield [
+                fecha_local(detalle['fecha']),
+                detalle['producto'],
+                detalle['cantidad'],
+                detalle['precio_uni'],
+                detalle['subtotal']
+            ]
+        yield []
+
+    if data['tipo_reporte'] in ['completo', 'compras'] and 'compras' in data:
+        yield ['Reporte de Compras']
+        yield ['Total de Compras', data['compras']['total_compras'] or 0]
+        yield ['Número de Compras', data['compras']['num_compras'] or 0]
+        yield ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal', 'Proveedor']
+        for detalle in data['detalles_compras'].iterator(chunk_size=FILAS_POR_LOTE_CSV):
+            yield [
+                fecha_local(detalle['fecha']),
+                detalle['producto'],
+                detalle['cantidad'],
+                detalle['precio_uni'],
+                detalle['subtotal'],
+                detalle['proveedor']
+            ]
+        yield []
+
+    if data['tipo_reporte'] in ['completo', 'productos_bajo_stock'] and 'productos' in data:
+        yield ['Productos Bajo Stock Mínimo']
+        yield ['Nombre', 'Stock Actual', 'Stock Mínimo', 'Precio']
+        for producto in data['productos'].iterator(chunk_size=FILAS_POR_LOTE_CSV):
+            yield [
+                producto['nombre'],
+                producto['stock'],
+                producto['umbral'],
+                producto['precio']
+            ]
+        if data.get('productos_sin_umbral'):
+            yield []
+            yield [texto_sin_umbral(data['productos_sin_umbral'])]
+
+
+def generar_csv(data):
+    # Las filas se generan y envían a medida que se leen de la base, así la
+    # memoria no depende del rango de fechas. Separador ';' y BOM para que
+    # Excel en español abra el archivo con columnas y acentos correctos.
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def contenido():
+        yield '\ufeff'
+        for fila in _filas_csv(data):
+            yield escritor.writerow(fila)
+
+    response = StreamingHttpResponse(contenido(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename=reporte.csv'
+    return response
+
+# Con constant_memory xlsxwriter escribe cada fila a disco al pasar a la
+# siguiente, así la memoria no depende del número de filas
+EXCEL_MEMORIA_CONSTANTE = True
+# Filas leídas de la base por vez al generar el Excel
+FILAS_POR_LOTE_EXCEL = 2000
+
 
 def generar_excel(data):
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
+    # El libro se escribe en un archivo temporal que FileResponse envía y
+    # cierra al terminar (se borra solo al cerrarse)
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': EXCEL_MEMORIA_CONSTANTE})
     
     # Formatos
     titulo_formato = workbook.add_format({
@@ -171,13 +363,13 @@ def generar_excel(data):
         worksheet_ventas.write('B4', data['ventas']['num_ventas'] or 0, celda_formato)
         
         # Detalle de Ventas
-        if data['detalles_ventas']:
+        if data['detalles_ventas'].exists():
             headers = ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal']
             for col, header in enumerate(headers):
                 worksheet_ventas.write(5, col, header, header_formato)
             
             row = 6
-            for detalle in data['detalles_ventas']:
+            for detalle in data['detalles_ventas'].iterator(chunk_size=FILAS_POR_LOTE_EXCEL):
                 worksheet_ventas.write(row, 0, detalle['fecha'].astimezone(pytz.timezone("America/Santiago")).strftime("%d/%m/%Y %H:%M"), celda_formato)
                 worksheet_ventas.write(row, 1, detalle['producto'], celda_formato)
                 worksheet_ventas.write(row, 2, detalle['cantidad'], celda_formato)
@@ -199,13 +391,13 @@ def generar_excel(data):
         worksheet_compras.write('B4', data['compras']['num_compras'] or 0, celda_formato)
         
         # Detalle de Compras
-        if data['detalles_compras']:
+        if data['detalles_compras'].exists():
             headers = ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal', 'Proveedor']
             for col, header in enumerate(headers):
                 worksheet_compras.write(5, col, header, header_formato)
             
             row = 6
-            for detalle in data['detalles_compras']:
+            for detalle in data['detalles_compras'].iterator(chunk_size=FILAS_POR_LOTE_EXCEL):
                 worksheet_compras.write(row, 0, detalle['fecha'].astimezone(pytz.timezone("America/Santiago")).strftime("%d/%m/%Y %H:%M"), celda_formato)
                 worksheet_compras.write(row, 1, detalle['producto'], celda_formato)
                 worksheet_compras.write(row, 2, detalle['cantidad'], celda_formato)
@@ -229,30 +421,137 @@ def generar_excel(data):
             worksheet_productos.write(2, col, header, header_formato)
         
         row = 3
-        for producto in data['productos']:
+        for producto in data['productos'].iterator(chunk_size=FILAS_POR_LOTE_EXCEL):
             worksheet_productos.write(row, 0, producto['nombre'], celda_formato)
             worksheet_productos.write(row, 1, producto['stock'], celda_formato)
-            worksheet_productos.write(row, 2, producto['umbral_stock_invierno'], celda_formato)
+            worksheet_productos.write(row, 2, producto['umbral'], celda_formato)
             worksheet_productos.write(row, 3, producto['precio'], numero_formato)
             row += 1
         
+        if data.get('productos_sin_umbral'):
+            worksheet_productos.write(row + 1, 0, texto_sin_umbral(data['productos_sin_umbral']))
+
         worksheet_productos.set_column('A:A', 30)
         worksheet_productos.set_column('B:D', 15)
 
     workbook.close()
     output.seek(0)
 
-    response = HttpResponse(
-        output.read(),
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename='reporte.xlsx',
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = 'attachment; filename=reporte.xlsx'
-    return response
+
+# Filas por tabla del detalle en el PDF: reportlab calcula el diseño de cada
+# tabla completa, así tablas cortas (con el encabezado repetido) mantienen el
+# costo lineal en el número de filas
+FILAS_POR_TABLA_PDF = 500
+# Sobre este número de líneas el PDF muestra solo el resumen del detalle
+# (el detalle completo queda para Excel o CSV)
+MAXIMO_FILAS_PDF = 100000
+# Filas leídas de la base por vez al generar el PDF
+FILAS_POR_LOTE_PDF = 2000
+
+ESTILO_DETALLE_PDF = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('ALIGN', (2, 1), (-1, -1), 'RIGHT')
+])
+
+
+class TablaPorTramos(Flowable):
+    """
+    Tabla del detalle que se arma por tramos de FILAS_POR_TABLA_PDF filas a
+    medida que reportlab llena las páginas: solo el tramo actual está en
+    memoria y cada tramo repite el encabezado.
+    """
+
+    def __init__(self, filas, encabezados, anchos, estilo=ESTILO_DETALLE_PDF):
+        super().__init__()
+        self.filas = iter(filas)
+        self.encabezados = encabezados
+        self.anchos = anchos
+        self.estilo = estilo
+        self.tabla = self._siguiente_tabla()
+
+    def _siguiente_tabla(self):
+        bloque = list(islice(self.filas, FILAS_POR_TABLA_PDF))
+        if not bloque:
+            return None
+        return LongTable([self.encabezados] + bloque, colWidths=self.anchos, repeatRows=1, style=self.estilo)
+
+    def vacia(self):
+        return self.tabla is None
+
+    def wrap(self, availWidth, availHeight):
+        if self.tabla is None:
+            return 0, 0
+        # Nunca cabe completa: reportlab siempre la divide con split
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        if self.tabla is None:
+            return []
+        _, alto = self.tabla.wrap(availWidth, availHeight)
+        partes = [self.tabla] if alto <= availHeight else self.tabla.split(availWidth, availHeight)
+        if not partes:
+            return []
+        # El resto va en un objeto nuevo (reportlab marca los que posterga)
+        resto = TablaPorTramos(self.filas, self.encabezados, self.anchos, self.estilo)
+        if resto.tabla is None:
+            return partes
+        return partes + [resto]
+
+    def draw(self):
+        pass
+
+
+def _detalle_pdf(elements, styles, detalles, encabezados, convertir, anchos, nombre):
+    """
+    Agrega al PDF el detalle de ventas o compras con su fila de totales,
+    calculada en la base. Si el detalle supera MAXIMO_FILAS_PDF se muestra
+    solo el resumen con una nota.
+    """
+    totales = detalles.aggregate(
+        lineas=Count('pk'),
+        unidades=Sum('cantidad'),
+        total=Sum('subtotal')
+    )
+    if not totales['lineas']:
+        elements.append(Paragraph(f'No hay {nombre} en este período', styles['Normal']))
+        return
+
+    resumen = Table([
+        ['Líneas', 'Unidades', 'Total del detalle'],
+        [f"{totales['lineas']:,}", f"{totales['unidades'] or 0:,}", f"${totales['total'] or 0:,.0f}"]
+    ], colWidths=[150, 150, 200])
+    resumen.setStyle(ESTILO_DETALLE_PDF)
+    elements.append(resumen)
+    elements.append(Paragraph('<br/>', styles['Normal']))
+
+    if totales['lineas'] > MAXIMO_FILAS_PDF:
+        elements.append(Paragraph(
+            f'El detalle tiene {totales["lineas"]:,} líneas y supera el máximo de '
+            f'{MAXIMO_FILAS_PDF:,} para PDF. Genere el reporte en Excel o CSV para ver el detalle completo.',
+            styles['Italic']
+        ))
+        return
+
+    filas = (convertir(detalle) for detalle in detalles.iterator(chunk_size=FILAS_POR_LOTE_PDF))
+    elements.append(TablaPorTramos(filas, encabezados, anchos))
+
 
 def generar_pdf(data):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    # Igual que el Excel, el PDF se escribe en un archivo temporal
+    output = tempfile.TemporaryFile(suffix='.pdf')
+    doc = SimpleDocTemplate(output, pagesize=letter)
     elements = []
+    chile_tz = pytz.timezone("America/Santiago")
     
     # Estilos
     styles = getSampleStyleSheet()
@@ -270,8 +569,8 @@ def generar_pdf(data):
     # Fechas (excepto para reporte de productos bajo stock)
     if data['tipo_reporte'] != 'productos_bajo_stock':
         elements.append(Paragraph(
-            f'Período: {data["fecha_inicio"].astimezone(pytz.timezone("America/Santiago")).strftime("%d/%m/%Y %H:%M")} - '
-            f'{data["fecha_fin"].astimezone(pytz.timezone("America/Santiago")).strftime("%d/%m/%Y %H:%M")}',
+            f'Período: {data["fecha_inicio"].astimezone(chile_tz).strftime("%d/%m/%Y %H:%M")} - '
+            f'{data["fecha_fin"].astimezone(chile_tz).strftime("%d/%m/%Y %H:%M")}',
             styles['Normal']
         ))
     elements.append(Paragraph('<br/>', styles['Normal']))
@@ -296,29 +595,19 @@ def generar_pdf(data):
 
         # Detalle de Ventas
         elements.append(Paragraph('Detalle de Ventas', styles['Heading2']))
-        if data['detalles_ventas']:
-            ventas_headers = ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal']
-            detalles_ventas_data = [ventas_headers]
-            for detalle in data['detalles_ventas']:
-                detalles_ventas_data.append([
-                    detalle['fecha'].astimezone(pytz.timezone("America/Santiago")).strftime("%d/%m/%Y %H:%M"),
-                    detalle['producto'],
-                    str(detalle['cantidad']),
-                    f"${detalle['precio_uni']:,.0f}",
-                    f"${detalle['subtotal']:,.0f}"
-                ])
-            detalles_ventas_table = Table(detalles_ventas_data, colWidths=[80, 200, 70, 70, 80])
-            detalles_ventas_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ALIGN', (2, 1), (-1, -1), 'RIGHT')
-            ]))
-            elements.append(detalles_ventas_table)
-        else:
-            elements.append(Paragraph('No hay ventas en este período', styles['Normal']))
+        _detalle_pdf(
+            elements, styles, data['detalles_ventas'],
+            ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal'],
+            lambda detalle: [
+                detalle['fecha'].astimezone(chile_tz).strftime("%d/%m/%Y %H:%M"),
+                detalle['producto'],
+                str(detalle['cantidad']),
+                f"${detalle['precio_uni']:,.0f}",
+                f"${detalle['subtotal']:,.0f}"
+            ],
+            [80, 200, 70, 70, 80],
+            'ventas'
+        )
         elements.append(Paragraph('<br/><br/>', styles['Normal']))
     
     # Sección de Compras
@@ -341,64 +630,60 @@ def generar_pdf(data):
 
         # Detalle de Compras
         elements.append(Paragraph('Detalle de Compras', styles['Heading2']))
-        if data['detalles_compras']:
-            compras_headers = ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal', 'Proveedor']
-            detalles_compras_data = [compras_headers]
-            for detalle in data['detalles_compras']:
-                detalles_compras_data.append([
-                    detalle['fecha'].astimezone(pytz.timezone("America/Santiago")).strftime("%d/%m/%Y %H:%M"),
-                    detalle['producto'],
-                    str(detalle['cantidad']),
-                    f"${detalle['precio_uni']:,.0f}",
-                    f"${detalle['subtotal']:,.0f}",
-                    detalle['proveedor']
-                ])
-            detalles_compras_table = Table(detalles_compras_data, colWidths=[80, 150, 70, 70, 80, 100])
-            detalles_compras_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ALIGN', (2, 1), (-1, -1), 'RIGHT')
-            ]))
-            elements.append(detalles_compras_table)
-        else:
-            elements.append(Paragraph('No hay compras en este período', styles['Normal']))
+        _detalle_pdf(
+            elements, styles, data['detalles_compras'],
+            ['Fecha', 'Producto', 'Cantidad', 'Precio Unit.', 'Subtotal', 'Proveedor'],
+            lambda detalle: [
+                detalle['fecha'].astimezone(chile_tz).strftime("%d/%m/%Y %H:%M"),
+                detalle['producto'],
+                str(detalle['cantidad']),
+                f"${detalle['precio_uni']:,.0f}",
+                f"${detalle['subtotal']:,.0f}",
+                detalle['proveedor']
+            ],
+            [80, 150, 70, 70, 80, 100],
+            'compras'
+        )
         elements.append(Paragraph('<br/><br/>', styles['Normal']))
 
     # Sección de Productos Bajo Stock
     if data['tipo_reporte'] in ['completo', 'productos_bajo_stock'] and 'productos' in data:
         elements.append(Paragraph('Productos Bajo Stock Mínimo', styles['Heading1']))
-        if data['productos']:
-            productos_headers = ['Nombre', 'Stock Actual', 'Stock Mínimo', 'Precio']
-            productos_data = [productos_headers]
-            for producto in data['productos']:
-                productos_data.append([
+        productos = TablaPorTramos(
+            (
+                [
                     producto['nombre'],
                     str(producto['stock']),
-                    str(producto['umbral_stock_invierno']),
+                    str(producto['umbral']),
                     f"${producto['precio']:,.0f}"
-                ])
-            productos_table = Table(productos_data, colWidths=[200, 100, 100, 100])
-            productos_table.setStyle(TableStyle([
+                ]
+                for producto in data['productos'].iterator(chunk_size=FILAS_POR_LOTE_PDF)
+            ),
+            ['Nombre', 'Stock Actual', 'Stock Mínimo', 'Precio'],
+            [200, 100, 100, 100],
+            TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
                 ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black),
                 ('ALIGN', (1, 1), (-1, -1), 'RIGHT')
-            ]))
-            elements.append(productos_table)
+            ])
+        )
+        if not productos.vacia():
+            elements.append(productos)
         else:
             elements.append(Paragraph('No hay productos bajo stock mínimo', styles['Normal']))
+        if data.get('productos_sin_umbral'):
+            elements.append(Paragraph(texto_sin_umbral(data['productos_sin_umbral']), styles['Normal']))
 
     # Construir el PDF
     doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename=reporte.pdf'
-    response.write(pdf)
-    return response
\ No newline at end of file
+    output.seek(0)
+
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename='reporte.pdf',
+        content_type='application/pdf'
+    )
@@ -4,6 +4,8 @@ from usuario.models import Usuario
 #pruebas de login, se prueba el login con credenciales correctas, 
 # con contraseña incorrecta, con rut incorrecto, con campos vacíos y la carga de la página de login
 class LoginTests(TestCase):
+    databases = {'default', 'logs'}
+
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
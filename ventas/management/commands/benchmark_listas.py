@@ -0,0 +1,137 @@
+import statistics
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from compras.models import Compra
+from compras.views import lista_compras
+from usuario.models import Usuario
+from ventas.models import Movimiento
+from ventas.views import lista_ventas
+from OptiStock_IA.periodos import rango_periodo
+
+# Movimientos del mes consultado; el resto del historial queda fuera del rango
+FILAS_DEL_MES = 200
+# Años de historial sintético anteriores al mes consultado
+AÑOS_DE_HISTORIAL = 10
+REPETICIONES = 5
+
+
+class _Revertir(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide lista_ventas y lista_compras sobre historiales sintéticos de distinto tamaño '
+        '(no deja datos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            nargs='+',
+            type=int,
+            default=[10000, 100000, 1000000],
+            help='Tamaños de historial a medir, en orden creciente (por defecto 10000 100000 1000000)',
+        )
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        inicio, fin = rango_periodo(hoy.year, hoy.month)
+        self.stdout.write(f"Mes consultado: {hoy.month}/{hoy.year} ({FILAS_DEL_MES} movimientos)")
+        self.stdout.write('Tiempos en ms (mediana). Vista: respuesta completa; Rango: filtro por rango '
+                          'de fechas; Año/mes: filtro anterior con fecha__year/fecha__month')
+        self.stdout.write(
+            f"{'Historial':>10} {'Vista V':>8} {'Vista C':>8} {'Rango V':>8} {'Rango C':>8} "
+            f"{'Año/mes V':>10} {'Año/mes C':>10}"
+        )
+        try:
+            # Todo se hace dentro de una transacción que se revierte al final
+            with transaction.atomic():
+                usuario = Usuario.objects.create(
+                    RutUsuua='benchmark-listas',
+                    Nombre='Benchmark',
+                    ApePa='Listas',
+                    Telefono='0'
+                )
+                self._insertar(usuario, [inicio + (fin - inicio) * i / FILAS_DEL_MES for i in range(FILAS_DEL_MES)])
+
+                insertadas = 0
+                for filas in sorted(options['filas']):
+                    self._insertar(usuario, self._historial(inicio, insertadas, filas, max(options['filas'])))
+                    insertadas = filas
+                    tiempos = [
+                        self._medir_vista(lista_ventas, '/ventas/lista/', usuario, hoy),
+                        self._medir_vista(lista_compras, '/compras/lista/', usuario, hoy),
+                        self._medir(lambda: list(Movimiento.objects.filter(
+                            tipo='VENTA', fecha__gte=inicio, fecha__lt=fin
+                        ))),
+                        self._medir(lambda: list(Compra.objects.filter(fecha__gte=inicio, fecha__lt=fin))),
+                        self._medir(lambda: list(Movimiento.objects.filter(
+                            tipo='VENTA', fecha__year=hoy.year, fecha__month=hoy.month
+                        ))),
+                        self._medir(lambda: list(Compra.objects.filter(
+                            fecha__year=hoy.year, fecha__month=hoy.month
+                        ))),
+                    ]
+                    self.stdout.write(
+                        f"{filas:>10} " + ' '.join(f"{tiempo:>8.1f}" for tiempo in tiempos[:4])
+                        + ' ' + ' '.join(f"{tiempo:>10.1f}" for tiempo in tiempos[4:])
+                    )
+
+                self._plan(Movimiento.objects.filter(tipo='VENTA', fecha__gte=inicio, fecha__lt=fin))
+                self._plan(Compra.objects.filter(fecha__gte=inicio, fecha__lt=fin))
+                raise _Revertir()
+        except _Revertir:
+            pass
+
+    def _historial(self, inicio, desde, hasta, total):
+        # Las filas se reparten en los años previos al mes consultado, siempre
+        # con el mismo paso, así cada tamaño extiende el historial hacia atrás
+        paso = timedelta(days=365 * AÑOS_DE_HISTORIAL) / total
+        return [inicio - paso * (i + 1) for i in range(desde, hasta)]
+
+    def _insertar(self, usuario, fechas):
+        filas = [
+            (usuario.pk, fecha.astimezone(dt_timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f'))
+            for fecha in fechas
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {Movimiento._meta.db_table} (rut_usu_id, tipo, fecha, total) "
+                "VALUES (%s, 'VENTA', %s, 1000)",
+                filas,
+            )
+            cursor.executemany(
+                f"INSERT INTO {Compra._meta.db_table} (rut_usu_id, fecha, total, proveedor) "
+                "VALUES (%s, %s, 1000, 'Benchmark')",
+                filas,
+            )
+
+    def _medir_vista(self, vista, ruta, usuario, hoy):
+        def llamar():
+            request = RequestFactory().get(ruta, {'mes': hoy.month, 'año': hoy.year})
+            request.user = usuario
+            request.session = {}
+            vista(request)
+        return self._medir(llamar)
+
+    def _medir(self, funcion):
+        tiempos = []
+        for _ in range(REPETICIONES):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' / '.join(fila[-1] for fila in cursor.fetchall())
+        self.stdout.write(f"Plan {queryset.model.__name__}: {plan}")
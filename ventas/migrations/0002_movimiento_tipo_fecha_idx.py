@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 22:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['tipo', 'fecha'], name='ventas_mov_tipo_fecha_idx'),
+        ),
+    ]
@@ -14,6 +14,12 @@ class Movimiento(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # lista_ventas filtra por tipo y un rango de fechas
+            models.Index(fields=['tipo', 'fecha'], name='ventas_mov_tipo_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Movimiento {self.id_mov} - {self.tipo}"
 
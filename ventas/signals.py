@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from OptiStock_IA.periodos import registrar_año, olvidar_años
+from .models import Movimiento
+
+
+@receiver(post_save, sender=Movimiento)
+def extender_años_ventas(sender, instance, created, **kwargs):
+    if created and instance.tipo == 'VENTA':
+        transaction.on_commit(lambda: registrar_año('ventas', instance.fecha))
+
+
+@receiver(post_delete, sender=Movimiento)
+def olvidar_años_ventas(sender, instance, **kwargs):
+    # Puede haber sido el último movimiento de su año
+    transaction.on_commit(lambda: olvidar_años('ventas'))
@@ -1,6 +1,8 @@
 from django.test import TestCase, Client
 from django.urls import reverse
+from django.core.cache import cache
 from decimal import Decimal
+import json
 from .models import Movimiento, Detalle
 from inventario.models import Producto
 from usuario.models import Usuario
@@ -9,6 +11,8 @@ from .forms import DetalleForm
 #ventas test hace pruebas de la creación de ventas, la creación de ventas sin stock suficiente, 
 # el cálculo del total de una venta y la vista de detalle de una venta
 class VentaTests(TestCase):
+    databases = {'default', 'logs'}
+
     #get_status_description retorna una descripción amigable del código de estado HTTP
     def get_status_description(self, status_code):
         """Retorna una descripción amigable del código de estado HTTP"""
@@ -38,6 +42,8 @@ class VentaTests(TestCase):
             print("="*65)
             print("="*65)
             self.__class__._setup_message_shown = True
+        # Los años disponibles de los listados quedan en caché entre tests
+        cache.clear()
         # Crear usuario de prueba
         self.usuario = Usuario.objects.create(
             RutUsuua="12345678-9",
@@ -182,4 +188,260 @@ class VentaTests(TestCase):
         print(f"  → Status: {self.get_status_description(response.status_code)}")
         print(f"  → Template usado: {response.templates[0].name if response.templates else 'No template'}")
         print(f"  → Contiene nombre del producto: {self.producto.nombre in str(response.content)}")
-        print("-"*50)
\ No newline at end of file
+        print("-"*50)
+#test_venta_carrito_descuenta_stock prueba que el carrito descuente el stock con un UPDATE condicional
+    def test_venta_carrito_descuenta_stock(self):
+        print("\n" + "="*50)
+        print("TEST: VENTA DESDE EL CARRITO")
+        print("="*50)
+        carrito = [{'id': self.producto.id, 'cantidad': 4, 'precio_uni': 1000}]
+        response = self.client.post(reverse('ventas:registrar_venta'), {'carrito': json.dumps(carrito)})
+        self.producto.refresh_from_db()
+        print(f"• Status: {self.get_status_description(response.status_code)}")
+        print(f"• Stock final del producto: {self.producto.stock}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.producto.stock, 6)
+        self.assertEqual(Movimiento.objects.get().total, Decimal('4000'))
+        print("-"*50)
+#test_venta_carrito_sin_stock_revierte prueba que una línea sin stock revierta toda la venta
+    def test_venta_carrito_sin_stock_revierte(self):
+        print("\n" + "="*50)
+        print("TEST: VENTA DESDE EL CARRITO SIN STOCK SUFICIENTE")
+        print("="*50)
+        otro = Producto.objects.create(
+            nombre="Producto Escaso",
+            categoria="Madera",
+            precio=Decimal("500"),
+            stock=1
+        )
+        carrito = [
+            {'id': self.producto.id, 'cantidad': 3, 'precio_uni': 1000},
+            {'id': otro.id, 'cantidad': 2, 'precio_uni': 500},
+        ]
+        response = self.client.post(reverse('ventas:registrar_venta'), {'carrito': json.dumps(carrito)})
+        self.producto.refresh_from_db()
+        otro.refresh_from_db()
+        print(f"• Error mostrado: {response.context['error']}")
+        print(f"• Stock primer producto: {self.producto.stock}")
+        print(f"• Stock segundo producto: {otro.stock}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Stock insuficiente', response.context['error'])
+        self.assertEqual(self.producto.stock, 10)
+        self.assertEqual(otro.stock, 1)
+        self.assertFalse(Movimiento.objects.exists())
+        print("-"*50)
+#test_venta_carrito_stock_cambia_antes_del_descuento prueba la carrera entre la verificación y el UPDATE condicional
+    def test_venta_carrito_stock_cambia_antes_del_descuento(self):
+        from unittest import mock
+        from inventario.models import ProductoQuerySet
+        print("\n" + "="*50)
+        print("TEST: STOCK CAMBIA ENTRE LA VERIFICACIÓN Y EL DESCUENTO")
+        print("="*50)
+        otro = Producto.objects.create(
+            nombre="Producto Disputado",
+            categoria="Madera",
+            precio=Decimal("500"),
+            stock=5
+        )
+        descontar_original = ProductoQuerySet.descontar_stock
+
+        def venta_concurrente(queryset, cantidades):
+            # Otra venta deja "Producto Disputado" en 1 después de la
+            # verificación en Python; el UPDATE condicional afecta 1 de 2 filas
+            Producto.objects.filter(pk=otro.pk).update(stock=1)
+            return descontar_original(queryset, cantidades)
+
+        carrito = [
+            {'id': self.producto.id, 'cantidad': 4, 'precio_uni': 1000},
+            {'id': otro.id, 'cantidad': 3, 'precio_uni': 500},
+        ]
+        with mock.patch.object(ProductoQuerySet, 'descontar_stock', autospec=True, side_effect=venta_concurrente):
+            response = self.client.post(reverse('ventas:registrar_venta'), {'carrito': json.dumps(carrito)})
+        self.producto.refresh_from_db()
+        print(f"• Error mostrado: {response.context['error']}")
+        print(f"• Stock del producto con stock suficiente: {self.producto.stock}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('el stock de uno o más productos cambió', response.context['error'])
+        # El descuento parcial del primer producto se revierte con la venta
+        self.assertEqual(self.producto.stock, 10)
+        self.assertFalse(Movimiento.objects.exists())
+        self.assertFalse(Detalle.objects.exists())
+        print("-"*50)
+#test_venta_revertida_no_registra_mensajes_de_exito prueba que una venta revertida no deje mensajes de éxito en el log
+    def test_venta_revertida_no_registra_mensajes_de_exito(self):
+        from unittest import mock
+        from django.core.exceptions import ValidationError
+        from logger.models import SystemMessage
+        print("\n" + "="*50)
+        print("TEST: VENTA REVERTIDA SIN MENSAJES DE ÉXITO")
+        print("="*50)
+        carrito = [{'id': self.producto.id, 'cantidad': 4, 'precio_uni': 1000}]
+        # Falla después de descontar el stock y preparar los detalles
+        with mock.patch('ventas.views.hechos.registrar_venta', side_effect=ValidationError("Fallo simulado")):
+            response = self.client.post(reverse('ventas:registrar_venta'), {'carrito': json.dumps(carrito)})
+        self.producto.refresh_from_db()
+        mensajes = list(SystemMessage.objects.filter(app='ventas').values_list('message', flat=True))
+        print(f"• Error mostrado: {response.context['error']}")
+        print(f"• Mensajes de ventas: {mensajes}")
+        self.assertEqual(self.producto.stock, 10)
+        self.assertFalse(Movimiento.objects.exists())
+        self.assertFalse([m for m in mensajes if m.startswith(("Stock actualizado", "Venta registrada"))])
+
+        print("\n• Venta confirmada: los mensajes sí se registran...")
+        self.client.post(reverse('ventas:registrar_venta'), {'carrito': json.dumps(carrito)})
+        mensajes = list(SystemMessage.objects.filter(app='ventas').values_list('message', flat=True))
+        print(f"• Mensajes de ventas: {mensajes}")
+        self.assertIn("Stock actualizado para Producto Prueba. Nuevo stock: 6", mensajes)
+        self.assertTrue(any(m.startswith("Venta registrada") for m in mensajes))
+        print("-"*50)
+#test_venta_carrito_consultas_constantes prueba que el número de consultas no dependa del tamaño del carrito
+    def test_venta_carrito_consultas_constantes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        print("\n" + "="*50)
+        print("TEST: CONSULTAS CONSTANTES SEGÚN TAMAÑO DEL CARRITO")
+        print("="*50)
+        productos = [
+            Producto.objects.create(
+                nombre=f"Producto Lote {i}",
+                categoria="Otros",
+                precio=Decimal("100"),
+                stock=100
+            )
+            for i in range(40)
+        ]
+
+        def consultas(carrito):
+            with CaptureQueriesContext(connection) as contexto:
+                response = self.client.post(reverse('ventas:registrar_venta'), {'carrito': json.dumps(carrito)})
+            self.assertEqual(response.status_code, 302)
+            return len(contexto)
+
+        pequeno = consultas([{'id': str(productos[0].id), 'cantidad': 1, 'precio_uni': 100}])
+        grande = consultas([{'id': str(p.id), 'cantidad': 2, 'precio_uni': 100} for p in productos])
+        print(f"• Consultas con 1 línea: {pequeno}")
+        print(f"• Consultas con 40 líneas: {grande}")
+        self.assertEqual(pequeno, grande)
+
+        productos[0].refresh_from_db()
+        productos[1].refresh_from_db()
+        self.assertEqual(productos[0].stock, 97)
+        self.assertEqual(productos[1].stock, 98)
+        print("-"*50)
+#test_lista_ventas_filtra_por_mes_local prueba que el filtro por mes use la hora de Santiago
+    def test_lista_ventas_filtra_por_mes_local(self):
+        from datetime import datetime
+        from django.utils import timezone
+        print("\n" + "="*50)
+        print("TEST: FILTRO DE VENTAS POR MES EN HORA LOCAL")
+        print("="*50)
+        fin_de_marzo = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal("1000"))
+        inicio_de_abril = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal("2000"))
+        antigua = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal("3000"))
+        Movimiento.objects.filter(pk=fin_de_marzo.pk).update(
+            fecha=timezone.make_aware(datetime(2024, 3, 31, 23, 30))
+        )
+        Movimiento.objects.filter(pk=inicio_de_abril.pk).update(
+            fecha=timezone.make_aware(datetime(2024, 4, 1, 0, 30))
+        )
+        Movimiento.objects.filter(pk=antigua.pk).update(
+            fecha=timezone.make_aware(datetime(2021, 6, 15, 12, 0))
+        )
+
+        response = self.client.get(reverse('ventas:lista_ventas'), {'mes': 3, 'año': 2024})
+        ventas_marzo = [venta.id_mov for venta in response.context['ventas']]
+        print(f"• Ventas de marzo 2024: {ventas_marzo}")
+        self.assertEqual(ventas_marzo, [fin_de_marzo.id_mov])
+
+        response = self.client.get(reverse('ventas:lista_ventas'), {'mes': 'todos', 'año': 2024})
+        print(f"• Ventas de todo 2024: {len(response.context['ventas'])}")
+        self.assertEqual(len(response.context['ventas']), 2)
+
+        print(f"• Años disponibles: {response.context['años_disponibles']}")
+        self.assertEqual(response.context['años_disponibles'], [2024, 2021])
+        print("-"*50)
+#test_lista_ventas_mes_o_año_invalidos prueba que un mes o año inválido muestre el periodo actual en vez de un error
+    def test_lista_ventas_mes_o_año_invalidos(self):
+        from django.utils import timezone
+        print("\n" + "="*50)
+        print("TEST: LISTA DE VENTAS CON MES O AÑO INVÁLIDOS")
+        print("="*50)
+        venta = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal("1000"))
+        hoy = timezone.localdate()
+        for parametros in ({'mes': 13}, {'mes': 'abc'}, {'mes': 0}, {'año': 'x'}, {'año': 99999}, {'mes': 'todos', 'año': ''}):
+            response = self.client.get(reverse('ventas:lista_ventas'), parametros)
+            print(f"• {parametros} → {response.status_code}, mes {response.context['mes_seleccionado']}, "
+                  f"año {response.context['año_seleccionado']}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['año_seleccionado'], hoy.year)
+            self.assertIn(response.context['mes_seleccionado'], (hoy.month, 'todos'))
+            self.assertEqual([v.id_mov for v in response.context['ventas']], [venta.id_mov])
+        print("-"*50)
+#test_lista_ventas_paginacion_por_cursor prueba que las páginas por cursor recorran todas las ventas sin repetir
+    def test_lista_ventas_paginacion_por_cursor(self):
+        from django.utils import timezone
+        print("\n" + "="*50)
+        print("TEST: PAGINACIÓN POR CURSOR DE VENTAS")
+        print("="*50)
+        ahora = timezone.now()
+        Movimiento.objects.bulk_create([
+            Movimiento(rut_usu=self.usuario, tipo='VENTA', total=Decimal("1000"))
+            for _ in range(120)
+        ])
+        # Fechas repetidas: el id desempata el orden dentro de la misma fecha
+        Movimiento.objects.update(fecha=ahora)
+        hoy = timezone.localdate(ahora)
+        filtros = {'mes': hoy.month, 'año': hoy.year}
+
+        response = self.client.get(reverse('ventas:lista_ventas'), filtros)
+        print(f"• Ventas en la primera página HTML: {len(response.context['ventas'])}")
+        self.assertEqual(len(response.context['ventas']), 50)
+        self.assertIsNotNone(response.context['siguiente'])
+
+        vistas = []
+        cursor = None
+        paginas = 0
+        while True:
+            parametros = dict(filtros, formato='json')
+            if cursor:
+                parametros['cursor'] = cursor
+            datos = self.client.get(reverse('ventas:lista_ventas'), parametros).json()
+            vistas.extend(venta['id'] for venta in datos['ventas'])
+            paginas += 1
+            cursor = datos['siguiente']
+            if not cursor:
+                break
+        print(f"  → Páginas JSON recorridas: {paginas}")
+        print(f"  → Ventas recibidas: {len(vistas)} (distintas: {len(set(vistas))})")
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistas, sorted(Movimiento.objects.values_list('id_mov', flat=True), reverse=True))
+
+        print("• Cursor inválido: vuelve a la primera página")
+        datos = self.client.get(reverse('ventas:lista_ventas'), dict(filtros, formato='json', cursor='xx')).json()
+        self.assertEqual(datos['ventas'][0]['id'], vistas[0])
+        print("-"*50)
+#test_años_disponibles_en_cache prueba que los años del filtro se lean de la caché y se extiendan con ventas de un año nuevo
+    def test_años_disponibles_en_cache(self):
+        from datetime import datetime
+        from django.utils import timezone
+        print("\n" + "="*50)
+        print("TEST: AÑOS DISPONIBLES EN CACHÉ")
+        print("="*50)
+        antigua = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal("1000"))
+        Movimiento.objects.filter(pk=antigua.pk).update(fecha=timezone.make_aware(datetime(2021, 6, 15, 12, 0)))
+
+        response = self.client.get(reverse('ventas:lista_ventas'))
+        print(f"• Años en la primera consulta: {response.context['años_disponibles']}")
+        self.assertEqual(response.context['años_disponibles'], [2021])
+
+        print("• Registrando una venta en el año actual...")
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = Movimiento.objects.create(rut_usu=self.usuario, tipo='VENTA', total=Decimal("2000"))
+        año_actual = timezone.localtime(nueva.fecha).year
+
+        from OptiStock_IA.periodos import años_con_datos_en_cache
+        with self.assertNumQueries(0):
+            años = años_con_datos_en_cache('ventas', Movimiento.objects.filter(tipo='VENTA'))
+        print(f"  → Años desde la caché, sin consultas: {años}")
+        self.assertEqual(años, [año_actual, 2021])
+        print("-"*50)
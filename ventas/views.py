@@ -3,42 +3,51 @@ from urllib.parse import urlencode
 
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse
+from django.http import JsonResponse
 from django.db import transaction
-from django.forms import modelformset_factory
 from django.core.exceptions import ValidationError
-from django.contrib import messages
-from django.db.models import Q
+from django.utils import timezone
 
-from .forms import MovimientoForm, DetalleForm
 from .models import Movimiento, Detalle
 from inventario.models import Producto
-from logger.models import SystemMessage
-from datetime import datetime
+from reportes import hechos
+from logger import buffer
+from OptiStock_IA.periodos import periodo_solicitado, rango_periodo, años_con_datos_en_cache
+from OptiStock_IA.paginacion import pagina_por_cursor
 
 
 
+# Ventas por página en la lista (paginación por cursor)
+VENTAS_POR_PAGINA = 50
+
 def lista_ventas(request):
-    # Obtener mes y año actuales por defecto
-    today = datetime.now()
-    mes = request.GET.get('mes', str(today.month))
-    año = int(request.GET.get('año', today.year))
+    # Mes y año pedidos; los actuales por defecto o si no son válidos
+    today = timezone.localdate()
+    año, mes = periodo_solicitado(request.GET)
     
-    # Filtrar ventas por mes y año
+    # Filtrar ventas por mes y año con un rango de fechas (usa el índice)
     if mes == 'todos':
         # Mostrar todos los meses del año
-        ventas = Movimiento.objects.filter(
-            tipo='VENTA',
-            fecha__year=año
-        ).order_by('-fecha')
+        inicio, fin = rango_periodo(año)
     else:
         # Mostrar solo el mes especificado
-        mes = int(mes)
-        ventas = Movimiento.objects.filter(
-            tipo='VENTA',
-            fecha__month=mes,
-            fecha__year=año
-        ).order_by('-fecha')
+        inicio, fin = rango_periodo(año, mes)
+    ventas = Movimiento.objects.filter(
+        tipo='VENTA',
+        fecha__gte=inicio,
+        fecha__lt=fin
+    )
+    ventas, siguiente = pagina_por_cursor(ventas, request.GET.get('cursor'), VENTAS_POR_PAGINA)
+
+    # Variante JSON del mismo listado (?formato=json)
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'ventas': [
+                {'id': venta.id_mov, 'fecha': venta.fecha.isoformat(), 'total': str(venta.total)}
+                for venta in ventas
+            ],
+            'siguiente': siguiente,
+        })
     
     mostrar_mensaje = request.session.pop('mostrar_mensaje', False)
     
@@ -50,17 +59,16 @@ def lista_ventas(request):
         (9, 'Septiembre'), (10, 'Octubre'), (11, 'Noviembre'), (12, 'Diciembre')
     ]
     
-    # Obtener años disponibles en la base de datos
-    años_disponibles = set()
-    for venta in Movimiento.objects.filter(tipo='VENTA').values_list('fecha__year', flat=True).distinct():
-        años_disponibles.add(venta)
-    años_disponibles = sorted(list(años_disponibles), reverse=True)
+    # Años con datos (desde la caché; se extiende al registrar en un año nuevo)
+    años_disponibles = años_con_datos_en_cache('ventas', Movimiento.objects.filter(tipo='VENTA'))
     # Si no hay años, agregar el año actual
     if not años_disponibles:
         años_disponibles = [today.year]
     
     return render(request, 'ventas/lista_ventas.html', {
         'ventas': ventas,
+        'siguiente': siguiente,
+        'cursor': request.GET.get('cursor', ''),
         'mostrar_mensaje': mostrar_mensaje,
         'mes_seleccionado': mes,
         'año_seleccionado': año,
@@ -71,7 +79,7 @@ def lista_ventas(request):
 def detalle_venta(request, id_mov):
     venta = get_object_or_404(Movimiento, pk=id_mov, tipo='VENTA')
     detalles = venta.detalles.all().select_related('id_prod')
-    SystemMessage.objects.create(
+    buffer.registrar(
         message=f"Usuario {request.user} consultó el detalle de la venta #{id_mov}",
         level='info',
         app='ventas',
@@ -86,11 +94,7 @@ def registrar_venta(request):
     # Obtener filtro de categoría desde la URL (?categoria=...)
     categoria = request.GET.get('categoria', '')
 
-    # Filtrar productos
-    if categoria:
-        productos_queryset = Producto.objects.filter(categoria=categoria).order_by('nombre')
-    else:
-        productos_queryset = Producto.objects.all().order_by('nombre')
+    # Los productos se cargan desde inventario:autocompletar_productos
 
     # Si viene ?ok=1 en la URL, mostramos el mensaje de éxito
     mostrar_mensaje = request.GET.get('ok') == '1'
@@ -104,6 +108,22 @@ def registrar_venta(request):
                 error = 'El carrito está vacío'
                 raise ValidationError(error)
 
+            # Validar las líneas y agrupar cantidades por producto
+            lineas = []
+            cantidades = {}
+            for item in carrito:
+                try:
+                    producto_id = int(item['id'])
+                except (TypeError, ValueError):
+                    raise ValidationError(f"Producto con ID {item['id']} no encontrado")
+                cantidad = item['cantidad']
+                if not isinstance(cantidad, int) or cantidad <= 0:
+                    raise ValidationError(f"Cantidad inválida para el producto con ID {producto_id}")
+                lineas.append((producto_id, cantidad, item['precio_uni']))
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+
+            # Mensajes de éxito: se registran solo si la transacción se confirma
+            mensajes = []
             with transaction.atomic():
                 movimiento = Movimiento()
                 movimiento.tipo = 'VENTA'
@@ -111,59 +131,65 @@ def registrar_venta(request):
                 total = 0
                 detalles = []
 
-                for item in carrito:
-                    try:
-                        producto = Producto.objects.get(id=item['id'])
-                        cantidad = item['cantidad']
-                        precio_unitario = item['precio_uni']
-
-                        if producto.stock < cantidad:
-                            error_msg = (
-                                f"Stock insuficiente para {producto.nombre}. "
-                                f"Stock disponible: {producto.stock}, requerido: {cantidad}."
-                            )
-                            SystemMessage.objects.create(
-                                message=error_msg,
-                                level='error',
-                                app='ventas',
-                                user=request.user
-                            )
-                            raise ValidationError(error_msg)
-
-                        subtotal = precio_unitario * cantidad
-                        total += subtotal
-
-                        producto.stock -= cantidad
-                        producto.save()
-
-                        SystemMessage.objects.create(
-                            message=f"Stock actualizado para {producto.nombre}. Nuevo stock: {producto.stock}",
-                            level='info',
+                # Una sola consulta para todos los productos del carrito
+                productos = Producto.objects.in_bulk(list(cantidades))
+
+                for producto_id, cantidad in cantidades.items():
+                    producto = productos.get(producto_id)
+                    if producto is None:
+                        raise ValidationError(f"Producto con ID {producto_id} no encontrado")
+
+                    if producto.stock < cantidad:
+                        error_msg = (
+                            f"Stock insuficiente para {producto.nombre}. "
+                            f"Stock disponible: {producto.stock}, requerido: {cantidad}."
+                        )
+                        buffer.registrar(
+                            message=error_msg,
+                            level='error',
                             app='ventas',
                             user=request.user
                         )
+                        raise ValidationError(error_msg)
+
+                # Descuento atómico por lotes: el UPDATE solo afecta las filas
+                # que todavía tienen stock suficiente, así dos ventas
+                # simultáneas no pueden dejar el stock negativo.
+                if Producto.objects.descontar_stock(cantidades) != len(cantidades):
+                    raise ValidationError(
+                        "Stock insuficiente: el stock de uno o más productos cambió "
+                        "mientras se registraba la venta. Intente nuevamente."
+                    )
+
+                nuevo_stock = dict(
+                    Producto.objects.filter(id__in=list(cantidades)).values_list('id', 'stock')
+                )
 
-                        detalle = Detalle(
-                            id_mov=movimiento,
-                            id_prod=producto,
-                            cantidad=cantidad,
-                            precio_uni=precio_unitario
-                        )
-                        detalles.append(detalle)
+                for producto_id, cantidad, precio_unitario in lineas:
+                    producto = productos[producto_id]
+
+                    subtotal = precio_unitario * cantidad
+                    total += subtotal
 
-                    except Producto.DoesNotExist:
-                        raise ValidationError(f"Producto con ID {item['id']} no encontrado")
+                    mensajes.append(f"Stock actualizado para {producto.nombre}. Nuevo stock: {nuevo_stock[producto.id]}")
+
+                    detalle = Detalle(
+                        id_mov=movimiento,
+                        id_prod=producto,
+                        cantidad=cantidad,
+                        precio_uni=precio_unitario
+                    )
+                    detalles.append(detalle)
 
                 movimiento.total = total
                 movimiento.save()
                 Detalle.objects.bulk_create(detalles)
+                hechos.registrar_venta(movimiento, detalles)
 
-                SystemMessage.objects.create(
-                    message=f"Venta registrada exitosamente. Total: ${total:.2f}",
-                    level='info',
-                    app='ventas',
-                    user=request.user
-                )
+                mensajes.append(f"Venta registrada exitosamente. Total: ${total:.2f}")
+
+            for mensaje in mensajes:
+                buffer.registrar(message=mensaje, level='info', app='ventas', user=request.user)
 
             # 🔴 PRG: redirigir después de un POST exitoso, SIN usar reverse
             params = {'ok': '1'}
@@ -182,6 +208,5 @@ def registrar_venta(request):
     return render(request, 'ventas/registrar_venta.html', {
         'mostrar_mensaje': mostrar_mensaje,
         'categoria_seleccionada': categoria,
-        'productos_filtrados': productos_queryset,
         'error': error
     })